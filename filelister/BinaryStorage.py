@@ -0,0 +1,207 @@
+"""
+BinaryStorage class and writer for the binary indexed filelist format
+
+Layout, little-endian, with every table aligned to 8 bytes:
+    header     magic, version, flags, table itemsize, count, prefix and blob sizes
+    prefix     utf-8 prefix shared by every entry, as written
+    offsets    count + 1 uint64 offsets of each suffix into the blob
+    blob       utf-8 suffixes, back to back
+    index      optional HashIndex table for membership tests
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .DataStorage import ENCODING, ERRORS, DataStorage, empty_prefixes, unpack_header
+from .HashIndex import HashIndex
+
+MAGIC = b"\x00FLB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHQQQQ")
+FLAG_HASH_INDEX = 1
+
+
+def _pad(size):
+    return -size % 8
+
+
+def _file_size(prefix_size, count, blob_size, index_size, flags):
+    """Returns the size of a binary filelist with the sizes in its header"""
+    size = HEADER.size + prefix_size + _pad(HEADER.size + prefix_size)
+    size += 8 * (count + 1) + blob_size
+    if flags & FLAG_HASH_INDEX:
+        size += _pad(blob_size) + index_size
+    return size
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def is_binary(infile):
+    """Returns True if infile starts with the binary filelist magic"""
+    with open(infile, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_binary(outfile, prefix, suffixes, count, hash_index=True):
+    """
+    Writes count suffixes sharing prefix to outfile in the binary format.
+    The blob is streamed, and only the offsets and hashes are held in memory.
+    """
+    prefix = prefix.encode(ENCODING, ERRORS)
+    offsets = array("Q", [0])
+    hashes = array("I")
+    blob_start = HEADER.size + len(prefix) + _pad(HEADER.size + len(prefix))
+    blob_start += 8 * (count + 1)
+
+    with open(outfile, "wb") as f:
+        f.seek(blob_start)
+        for suffix in suffixes:
+            suffix = suffix.encode(ENCODING, ERRORS)
+            f.write(suffix)
+            offsets.append(offsets[-1] + len(suffix))
+            if hash_index:
+                hashes.append(HashIndex.hash_key(suffix))
+        if len(offsets) != count + 1:
+            raise ValueError("suffix count does not match the expected count")
+        blob_size = offsets[-1]
+
+        index = None
+        if hash_index:
+            index = HashIndex.empty(count)
+            for idx, key_hash in enumerate(hashes):
+                index.insert_hash(key_hash, idx)
+            f.write(bytes(_pad(blob_size)))
+            f.write(_to_little_endian(index.table))
+
+        f.seek(0)
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                FLAG_HASH_INDEX if index else 0,
+                index.table.itemsize if index else 0,
+                count,
+                len(prefix),
+                blob_size,
+                len(index.table) if index else 0,
+            )
+        )
+        f.write(prefix)
+        f.write(bytes(_pad(HEADER.size + len(prefix))))
+        f.write(_to_little_endian(offsets))
+
+
+class BinaryStorage(DataStorage):
+    """
+    Class to read Filelist data from a binary filelist without loading it.
+
+    The file is memory-mapped and entries are decoded straight from the map,
+    so indexing is O(1) and membership uses the on-disk hash index if present.
+    """
+
+    in_memory = False
+    lookup = None
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, infile, prefixes=None):
+        self.prefixes = prefixes if prefixes is not None else empty_prefixes()
+        self._views = []
+
+        with open(infile, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (flags, itemsize, self.counter, prefix_size, blob_size, slots,) = unpack_header(
+            HEADER,
+            self.buffer,
+            (MAGIC, VERSION),
+            self.buffer.close,
+            f"{infile} is not a version {VERSION} binary filelist",
+        )
+        size = _file_size(prefix_size, self.counter, blob_size, itemsize * slots, flags)
+        if size > len(self.buffer):
+            self.buffer.close()
+            raise TypeError(f"{infile} is truncated")
+
+        pos = HEADER.size
+        self.line_prefix = self.buffer[pos : pos + prefix_size].decode(ENCODING, ERRORS)
+        pos += prefix_size + _pad(HEADER.size + prefix_size)
+        self.offsets = self._view(pos, "Q", self.counter + 1)
+        self._blob = pos + 8 * (self.counter + 1)
+        pos = self._blob + blob_size + _pad(blob_size)
+
+        self.hash_index = None
+        if flags & FLAG_HASH_INDEX:
+            typecode = "I" if itemsize == 4 else "Q"
+            self.hash_index = HashIndex(self._view(pos, typecode, slots))
+
+    def _view(self, start, typecode, length):
+        size = array(typecode).itemsize * length
+        if sys.byteorder == "big":
+            values = array(typecode, self.buffer[start : start + size])
+            values.byteswap()
+            return values
+        base = memoryview(self.buffer)
+        sliced = base[start : start + size]
+        view = sliced.cast(typecode)
+        self._views.extend([view, sliced, base])
+        return view
+
+    @property
+    def has_index(self):
+        return self.hash_index is not None
+
+    def is_abs(self):
+        """Returns true if the stored prefix is absolute"""
+        return self.line_prefix.startswith(os.sep)
+
+    def _raw(self, slot):
+        start = self._blob + self.offsets[slot]
+        return self.buffer[start : self._blob + self.offsets[slot + 1]]
+
+    def suffix(self, idx):
+        return self._raw(self._check_index(idx)).decode(ENCODING, ERRORS)
+
+    def suffixes(self):
+        for idx in range(self.counter):
+            yield self._raw(idx).decode(ENCODING, ERRORS)
+
+    def to_data_storage(self, prefixes=None):
+        """
+        Returns an in-memory DataStorage of the entries, copying the blob and
+        offsets in bulk instead of decoding and re-encoding every suffix
+        """
+        end = self._blob + self.offsets[self.counter]
+        return DataStorage.from_buffer(
+            bytearray(self.buffer[self._blob : end]), array("Q", self.offsets), prefixes
+        )
+
+    def contains_suffixes(self, suffixes):
+        if self.hash_index is None:
+            return super().contains_suffixes(suffixes)
+        return self._probe(self.hash_index, suffixes)
+
+    def _find(self, value):
+        """Returns the index of value, or -1 if it is not stored"""
+        suffix = self.query_suffix(value)
+        if suffix is None:
+            return -1
+        key = suffix.encode(ENCODING, ERRORS)
+        if self.hash_index is not None:
+            return self.hash_index.find(key, self._raw)
+        for idx in range(self.counter):
+            if self._raw(idx) == key:
+                return idx
+        return -1
+
+    def close(self):
+        """Releases the memory map"""
+        for view in self._views:
+            view.release()
+        self._views = []
+        self.buffer.close()
@@ -0,0 +1,146 @@
+"""BlockStorage class"""
+import os
+import sys
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .compression import (
+    BLOCK_HEADER,
+    BLOCK_MAGIC,
+    BLOCK_VERSION,
+    FLAG_FRONT_CODED,
+    decompress_block,
+    get_codec,
+)
+from .DataStorage import ENCODING, ERRORS, DataStorage, empty_prefixes, unpack_header
+
+CACHED_BLOCKS = 8
+
+
+class BlockStorage(DataStorage):
+    """
+    Class to read Filelist data from a block-compressed filelist on demand.
+
+    Only the header and block index are read up front. Accessing an entry
+    decompresses the block holding it, and recently used blocks are cached,
+    so a slice only touches the blocks it spans. Full reads decompress blocks
+    on a thread pool, since the codecs release the GIL. Blocks may be front-coded.
+    """
+
+    in_memory = False
+    lookup = None
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, infile, prefixes=None, workers=None):
+        self.prefixes = prefixes if prefixes is not None else empty_prefixes()
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self._cache = OrderedDict()
+
+        self._file = open(infile, "rb")  # pylint: disable=consider-using-with
+        (
+            self.codec,
+            flags,
+            self.block_size,
+            self.counter,
+            prefix_size,
+            index_offset,
+        ) = unpack_header(
+            BLOCK_HEADER,
+            self._file.read(BLOCK_HEADER.size),
+            (BLOCK_MAGIC, BLOCK_VERSION),
+            self._file.close,
+            f"{infile} is not a version {BLOCK_VERSION} block-compressed filelist",
+        )
+        try:
+            codec = get_codec(self.codec)
+        except ValueError:
+            self._file.close()
+            raise
+        zdict = self._file.read(prefix_size)
+        self.line_prefix = zdict.decode(ENCODING, ERRORS)
+        self._decompress = partial(
+            decompress_block,
+            zdict=zdict,
+            codec=codec,
+            front_coded=bool(flags & FLAG_FRONT_CODED),
+        )
+
+        self._file.seek(index_offset)
+        self.block_offsets = array("Q")
+        self.block_offsets.frombytes(self._file.read())
+        if sys.byteorder == "big":
+            self.block_offsets.byteswap()
+
+    @property
+    def num_blocks(self):
+        """Returns the number of compressed blocks"""
+        return len(self.block_offsets) - 1
+
+    def is_abs(self):
+        """Returns true if the stored prefix is absolute"""
+        return self.line_prefix.startswith(os.sep)
+
+    def _read_block(self, block):
+        start, end = self.block_offsets[block], self.block_offsets[block + 1]
+        self._file.seek(start)
+        return self._file.read(end - start)
+
+    def _block(self, block):
+        """Returns the encoded suffixes of block, through the cache"""
+        if block in self._cache:
+            self._cache.move_to_end(block)
+            return self._cache[block]
+        entries = self._decompress(self._read_block(block))
+        self._cache[block] = entries
+        if len(self._cache) > CACHED_BLOCKS:
+            self._cache.popitem(last=False)
+        return entries
+
+    def suffix(self, idx):
+        idx = self._check_index(idx)
+        block, pos = divmod(idx, self.block_size)
+        return self._block(block)[pos].decode(ENCODING, ERRORS)
+
+    def iter_blocks(self, blocks=None):
+        """
+        Yields the encoded suffixes of each block in order.
+        Blocks are decompressed ahead of time on a pool of self.workers threads.
+        """
+        if blocks is None:
+            blocks = range(self.num_blocks)
+        if self.workers <= 1:
+            for block in blocks:
+                yield self._block(block)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for block in blocks:
+                pending.append(pool.submit(self._decompress, self._read_block(block)))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def suffixes(self):
+        for entries in self.iter_blocks():
+            for entry in entries:
+                yield entry.decode(ENCODING, ERRORS)
+
+    def _find(self, value):
+        """Returns the index of value, or -1 if it is not stored"""
+        suffix = self.query_suffix(value)
+        if suffix is None:
+            return -1
+        key = suffix.encode(ENCODING, ERRORS)
+        for block, entries in enumerate(self.iter_blocks()):
+            if key in entries:
+                return block * self.block_size + entries.index(key)
+        return -1
+
+    def close(self):
+        """Closes the underlying file"""
+        self._cache.clear()
+        self._file.close()
@@ -0,0 +1,136 @@
+"""
+BloomFilter class and sidecar files for probabilistic membership tests
+
+A Bloom filter answers "definitely not stored" or "maybe stored" for a path
+using a few bits per path, so most negative membership tests against a lazily
+read filelist never search the file. It is saved next to the filelist it
+describes, keyed on the lines as they are written in that file.
+
+Layout of the sidecar, little-endian:
+    header     magic, version, number of hashes, number of bits, count,
+               and the size of the filelist it was built for
+    bits       the bit array, num_bits / 8 bytes
+"""
+import hashlib
+import math
+import os
+import struct
+
+from .DataStorage import ENCODING, ERRORS
+
+MAGIC = b"\x00FLM"
+VERSION = 1
+HEADER = struct.Struct("<4sBxHQQQ")
+SUFFIX = ".bloom"
+ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """
+    Bit array with num_hashes positions set for every added key.
+
+    Positions come from double hashing one 128 bit blake2b digest, so a
+    lookup costs one hash and num_hashes bit tests. There are no false
+    negatives; false positives occur at about the rate it was sized for.
+    """
+
+    def __init__(self, bits, num_bits, num_hashes, count=0):
+        self.bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, count, error_rate=ERROR_RATE):
+        """Returns an empty filter sized for count keys at error_rate false positives"""
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        count = max(count, 1)
+        num_bits = math.ceil(-count * math.log(error_rate) / math.log(2) ** 2)
+        num_bits = max(64, num_bits + -num_bits % 8)
+        num_hashes = max(1, round(num_bits / count * math.log(2)))
+        return cls(bytearray(num_bits // 8), num_bits, num_hashes)
+
+    @staticmethod
+    def _hashes(key):
+        """Returns the first position and the step between positions of a key"""
+        digest = int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), "big")
+        return digest >> 64, digest | 1
+
+    def add(self, key):
+        """Adds an encoded key"""
+        pos, step = self._hashes(key)
+        bits, num_bits = self.bits, self.num_bits
+        for _ in range(self.num_hashes):
+            pos %= num_bits
+            bits[pos >> 3] |= 1 << (pos & 7)
+            pos += step
+        self.count += 1
+
+    def __contains__(self, key):
+        pos, step = self._hashes(key)
+        bits, num_bits = self.bits, self.num_bits
+        for _ in range(self.num_hashes):
+            pos %= num_bits
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+            pos += step
+        return True
+
+    def to_bytes(self, source_size=0):
+        """Returns the filter in the sidecar format"""
+        header = HEADER.pack(
+            MAGIC, VERSION, self.num_hashes, self.num_bits, self.count, source_size
+        )
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Returns the filter stored in data and the source size it records.
+        Raises ValueError if data is not a version VERSION Bloom filter.
+        """
+        if len(data) < HEADER.size:
+            raise ValueError("data is too short for a Bloom filter")
+        magic, version, num_hashes, num_bits, count, source_size = HEADER.unpack_from(
+            data
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"data is not a version {VERSION} Bloom filter")
+        bits = data[HEADER.size :]
+        if len(bits) != num_bits // 8:
+            raise ValueError("Bloom filter bits are truncated")
+        return cls(bits, num_bits, num_hashes, count), source_size
+
+
+def bloom_path(outfile):
+    """Returns the path of the Bloom filter saved next to outfile"""
+    return outfile + SUFFIX
+
+
+def save_bloom(outfile, lines, count, error_rate=ERROR_RATE):
+    """
+    Saves a Bloom filter of the count lines written to outfile next to it.
+    outfile must already be written, since its size is recorded.
+    """
+    bloom = BloomFilter.for_capacity(count, error_rate)
+    for line in lines:
+        bloom.add(line.encode(ENCODING, ERRORS))
+    with open(bloom_path(outfile), "wb") as f:
+        f.write(bloom.to_bytes(os.path.getsize(outfile)))
+    return bloom
+
+
+def load_bloom(infile, count):
+    """
+    Returns the Bloom filter saved next to infile, or None if there is none
+    or it was not built for the count lines currently in infile.
+    """
+    try:
+        with open(bloom_path(infile), "rb") as f:
+            bloom, source_size = BloomFilter.from_bytes(f.read())
+    except (OSError, ValueError):
+        return None
+    if bloom.count != count or source_size != os.path.getsize(infile):
+        return None
+    return bloom
@@ -1,68 +1,540 @@
 """DataStorage class"""
-from termcolor import colored
+import os
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate, islice
+
+from .Diagnostics import Diagnostics
+from .HashIndex import HashIndex
+from .metadata import append_rows, stat_path
+from .StorageView import StorageView
+
+ENCODING = "utf-8"
+ERRORS = "surrogateescape"
+# compact once this share of the stored entries are tombstones
+COMPACT_RATIO = 0.25
+MIN_COMPACT = 1024
+# contains_many scans every stored suffix for batches of at least 1 / BATCH_RATIO
+BATCH_RATIO = 8
+
+
+def join_prefix(prefix, suffix):
+    """Joins a stored suffix onto a Filelist prefix"""
+    if not prefix:
+        return suffix
+    if prefix.endswith(os.sep):
+        return prefix + suffix
+    return prefix + os.sep + suffix
+
+
+def empty_prefixes():
+    """Returns the prefixes of a storage whose paths are stored whole"""
+    return {"abs": "", "rel": "", "curr": ""}
+
+
+def unpack_header(header, data, signature, close, error):
+    """
+    Returns the fields of the struct header at the start of data after its
+    magic and version, which must match signature. Otherwise calls close to
+    release the file data was read from and raises a TypeError of error.
+    """
+    if len(data) >= header.size:
+        magic, version, *fields = header.unpack_from(data)
+        if (magic, version) == signature:
+            return fields
+    close()
+    raise TypeError(error)
 
 
 class DataStorage:
-    """Class to store Filelist data"""
+    """
+    Class to store Filelist data.
+
+    Each path is stored once, as its unique suffix below the Filelist's common
+    prefix, in a contiguous utf-8 buffer indexed by an offsets array. Absolute
+    and relative paths are built from the shared prefixes when requested.
+    lookup is a HashIndex from each encoded suffix to its slot, checked
+    against the buffer, so membership and index() are O(1) without holding
+    a str per path. It is rebuilt on first use after the buffer is replaced.
 
-    def __init__(self, loader):
-        self.paths = {"abs": [], "rel": []}
-        self.lookup = {}
+    Appending grows the buffer and offsets in place. Removing leaves a
+    tombstone, the sorted slot index of the removed entry, so lookup indices
+    stay valid; the buffer is compacted once tombstones pile up.
+    Duplicates left out are counted in diagnostics. metadata optionally holds
+    stat columns parallel to the slots, kept in step with them, and digests
+    the content hashes of the entries, dropped once an entry is appended.
+    """
+
+    in_memory = True
+    diagnostics = None
+    metadata = None
+    digests = None
+    digest_algo = None
+    tombstones = ()
+    _lookup = None
+    bloom = None
+    line_prefix = ""
+
+    def __init__(self, loader, prefixes=None, diagnostics=None, metadata=None):
+        if diagnostics is None:
+            diagnostics = Diagnostics()
+        self.prefixes = prefixes if prefixes is not None else empty_prefixes()
+        self.diagnostics = diagnostics
+        # columns the loader fills with a row per suffix it yields
+        self.metadata = metadata
+        self.buffer = bytearray()
+        self.offsets = array("Q", [0])
+        self.tombstones = []
         self.counter = 0
-        self.curr_idx = 0
 
-        for abs_path, rel_path in loader:
-            if abs_path in self.lookup or rel_path in self.lookup:
-                print(colored("WARN: Path is already stored. Skipping.", "red"))
-                continue
+        for suffix in loader:
+            self.buffer += suffix.encode(ENCODING, ERRORS)
+            self.offsets.append(len(self.buffer))
+
+        self.reindex()
+        for slot in self.tombstones:
+            diagnostics.record("duplicate", self._raw(slot).decode(ENCODING, ERRORS))
+        self.compact()
+        diagnostics.report()
+
+    @classmethod
+    def from_buffer(cls, buffer, offsets, prefixes=None):
+        """
+        Builds a DataStorage straight from an encoded buffer and its
+        array("Q") of offsets, which must hold unique suffixes.
+        """
+        storage = cls(iter(()), prefixes)
+        storage.reset(
+            buffer if isinstance(buffer, bytearray) else bytearray(buffer), offsets
+        )
+        return storage
+
+    def reset(self, buffer, offsets):
+        """
+        Replaces the suffixes with those of an encoded bytearray and its
+        array("Q") of offsets, which must hold unique suffixes. The index is
+        rebuilt when next needed.
+        """
+        self.buffer = buffer
+        self.offsets = offsets
+        self.counter = len(offsets) - 1
+        self.tombstones = []
+        self._lookup = None
+
+    @property
+    def has_index(self):
+        """Whether single values are found through a hash index"""
+        return self.in_memory
+
+    @property
+    def lookup(self):
+        """HashIndex from each encoded suffix to its slot"""
+        if self._lookup is None:
+            self.reindex()
+        return self._lookup
+
+    def reindex(self):
+        """
+        Rebuilds lookup and the count from the buffer and offsets.
+        Repeated suffixes are left out of lookup and marked as tombstones.
+        """
+        keys = map(self._raw, range(len(self.offsets) - 1))
+        self._lookup, self.tombstones = HashIndex.build(keys, self._raw)
+        self.counter = len(self.offsets) - 1 - len(self.tombstones)
+
+    def _raw(self, slot):
+        """Returns the encoded suffix stored in slot"""
+        return self.buffer[self.offsets[slot] : self.offsets[slot + 1]]
+
+    def subset(self, mask, invert=False, prefixes=None):
+        """
+        Returns a new DataStorage of the suffixes whose flag in mask, an
+        iterable parallel to the entries, is true, or false if invert, in order.
+        """
+        encoded = [
+            suffix.encode(ENCODING, ERRORS)
+            for suffix, flag in zip(self.suffixes(), mask)
+            if bool(flag) != invert
+        ]
+        offsets = array("Q", [0])
+        offsets.extend(accumulate(len(suffix) for suffix in encoded))
+        return DataStorage.from_buffer(bytearray().join(encoded), offsets, prefixes)
+
+    @classmethod
+    def concat(cls, storages, prefixes=None):
+        """
+        Returns a new DataStorage of the in-memory storages back to back,
+        which must not share suffixes.
+        """
+        buffer = bytearray()
+        offsets = array("Q", [0])
+        for storage in storages:
+            storage.compact()
+            base = len(buffer)
+            buffer += storage.buffer
+            offsets.extend(map(base.__add__, storage.offsets[1:]))
+        return cls.from_buffer(buffer, offsets, prefixes)
+
+    def append(self, suffix):
+        """Stores suffix after every other entry, unless it is already stored"""
+        self._append(suffix)
+        self.diagnostics.report()
+
+    def extend(self, suffixes):
+        """Appends every suffix of an iterable"""
+        for suffix in suffixes:
+            self._append(suffix)
+        self.diagnostics.report()
+
+    def _append(self, suffix):
+        """Appends suffix, counting it as a duplicate if it is already stored"""
+        key = suffix.encode(ENCODING, ERRORS)
+        slot = len(self.offsets) - 1
+        if self.lookup.insert(key, slot, self._raw) != slot:
+            self.diagnostics.record("duplicate", suffix)
+            return
+        self.buffer += key
+        self.offsets.append(len(self.buffer))
+        self.counter += 1
+        self.digests = None
+        if self.metadata is not None:
+            path = join_prefix(self.prefixes["abs"], suffix)
+            append_rows(self.metadata, [stat_path(path)])
 
-            self.paths["abs"].append(abs_path)
-            self.paths["rel"].append(rel_path)
+    def remove(self, value):
+        """
+        Removes value, an absolute path, relative path or suffix.
+        Its slot is marked with a tombstone and reclaimed by compact().
+        """
+        suffix = self.query_suffix(value)
+        slot = -1
+        if suffix is not None:
+            slot = self.lookup.delete(suffix.encode(ENCODING, ERRORS), self._raw)
+        if slot == -1:
+            raise ValueError(f"{value} is not in DataStorage")
+        insort(self.tombstones, slot)
+        self.counter -= 1
+        if len(self.tombstones) >= max(MIN_COMPACT, COMPACT_RATIO * len(self.offsets)):
+            self.compact()
 
-            self.lookup[abs_path] = self.counter
-            self.lookup[rel_path] = self.counter
+    def compact(self):
+        """Drops the slots of removed entries from the buffer and offsets"""
+        if not self.tombstones:
+            return
+        buffer = bytearray()
+        offsets = array("Q", [0])
+        with memoryview(self.buffer) as view:
+            start = 0
+            for stop in self.tombstones + [len(self.offsets) - 1]:
+                if start < stop:
+                    shift = len(buffer) - self.offsets[start]
+                    buffer += view[self.offsets[start] : self.offsets[stop]]
+                    ends = self.offsets[start + 1 : stop + 1]
+                    offsets.extend(map(shift.__add__, ends))
+                start = stop + 1
+        if self.metadata is not None:
+            self.metadata = {
+                name: array(values.typecode, self._live(values))
+                for name, values in self.metadata.items()
+            }
+        if self.digests is not None:
+            self.digests = list(self._live(self.digests))
+        self.buffer = buffer
+        self.offsets = offsets
+        self.tombstones = []
+        self._lookup = None
 
-            self.counter += 1
+    def _live(self, values):
+        """Yields the values of a column parallel to the slots that are not removed"""
+        if not self.tombstones:
+            return iter(values)
+        dead = set(self.tombstones)
+        return (value for slot, value in enumerate(values) if slot not in dead)
 
-        assert self.counter == len(self.paths["abs"]) == len(self.paths["rel"])
+    def column(self, name):
+        """
+        Returns the metadata column name, or the digests for "digest", one
+        value per entry in order. Raises a ValueError if there is no metadata.
+        """
+        if name == "digest":
+            if self.digests is None:
+                raise ValueError("DataStorage has no digests")
+            return list(self._live(self.digests))
+        if self.metadata is None:
+            raise ValueError("DataStorage has no metadata")
+        values = self.metadata[name]
+        if not self.tombstones:
+            return values
+        return array(values.typecode, self._live(values))
+
+    def select(self, indices, prefixes=None):
+        """
+        Returns a new DataStorage of the entries at indices, in that order,
+        with their metadata and digests. Indices must not repeat.
+        """
+        slots = [self._check_index(idx) for idx in indices]
+        offsets = array("Q", [0])
+        if self.in_memory:
+            with memoryview(self.buffer) as view:
+                buffer = bytearray().join(
+                    view[self.offsets[slot] : self.offsets[slot + 1]] for slot in slots
+                )
+            offsets.extend(
+                accumulate(
+                    self.offsets[slot + 1] - self.offsets[slot] for slot in slots
+                )
+            )
+        else:
+            # lazy storages lay out their buffer and offsets differently
+            encoded = [self.suffix(slot).encode(ENCODING, ERRORS) for slot in slots]
+            buffer = bytearray().join(encoded)
+            offsets.extend(accumulate(map(len, encoded)))
+        storage = DataStorage.from_buffer(buffer, offsets, prefixes)
+        if self.metadata is not None:
+            storage.metadata = {
+                name: array(values.typecode, (values[slot] for slot in slots))
+                for name, values in self.metadata.items()
+            }
+        if self.digests is not None:
+            storage.digests = [self.digests[slot] for slot in slots]
+            storage.digest_algo = self.digest_algo
+        return storage
 
     def __len__(self):
         return self.counter
 
+    def _check_index(self, idx):
+        """Returns the slot holding entry idx, counting from the end if negative"""
+        if idx < 0:
+            idx += self.counter
+        if not 0 <= idx < self.counter:
+            raise IndexError("DataStorage index out of range")
+        skipped = 0
+        while self.tombstones:
+            found = bisect_right(self.tombstones, idx + skipped)
+            if found == skipped:
+                break
+            skipped = found
+        return idx + skipped
+
+    def suffix(self, idx):
+        """Returns the stored suffix at idx"""
+        return self._raw(self._check_index(idx)).decode(ENCODING, ERRORS)
+
+    def suffixes(self):
+        """Yields every stored suffix in order"""
+        return self._decode_slots(0, len(self.offsets) - 1, set(self.tombstones))
+
+    def suffix_range(self, indices):
+        """Yields the suffixes at a range of indices"""
+        if not self.in_memory or indices.step != 1 or not indices:
+            return map(self.suffix, indices)
+        first = self._check_index(indices.start)
+        last = self._check_index(indices.stop - 1) + 1
+        tombstones = self.tombstones
+        dead = tombstones[
+            bisect_left(tombstones, first) : bisect_left(tombstones, last)
+        ]
+        return self._decode_slots(first, last, set(dead))
+
+    def _decode_slots(self, first, last, dead=()):
+        """
+        Yields the suffixes in slots first to last, skipping slots in dead,
+        decoding their bytes in one call
+        """
+        offsets = self.offsets
+        if first or last < len(offsets) - 1:
+            offsets = offsets[first : last + 1]
+        spans = zip(offsets, islice(offsets, 1, None))
+        if dead:
+            spans = (span for slot, span in enumerate(spans, first) if slot not in dead)
+        base, end = offsets[0], offsets[-1]
+        chunk = self.buffer if end - base == len(self.buffer) else self.buffer[base:end]
+        text = chunk.decode(ENCODING, ERRORS)
+        if len(text) == len(chunk):
+            # every byte decoded to one character, so offsets index text too
+            for start, stop in spans:
+                yield text[start - base : stop - base]
+        else:
+            buffer = self.buffer
+            for start, stop in spans:
+                yield buffer[start:stop].decode(ENCODING, ERRORS)
+
+    def iter_paths(self, key, indices=None):
+        """
+        Yields the absolute or relative paths, by key, at a range of indices,
+        or of every entry. Each call returns an independent iterator.
+        """
+        suffixes = self.suffixes() if indices is None else self.suffix_range(indices)
+        head = join_prefix(self.prefixes[key], "")
+        if not head:
+            return suffixes
+        return (head + suffix for suffix in suffixes)
+
+    def iter_chunks(self, size, key="abs"):
+        """Yields lists of up to size absolute or relative paths, by key, in order"""
+        if size < 1:
+            raise ValueError("chunk size must be positive")
+        count = self.counter
+        for start in range(0, count, size):
+            yield list(self.iter_paths(key, range(start, min(start + size, count))))
+
+    def abs_path(self, idx):
+        """Returns the absolute path at idx"""
+        return join_prefix(self.prefixes["abs"], self.suffix(idx))
+
+    def rel_path(self, idx):
+        """Returns the relative path at idx"""
+        return join_prefix(self.prefixes["rel"], self.suffix(idx))
+
+    def abs_paths(self):
+        """Returns a list of every absolute path"""
+        return list(self.iter_paths("abs"))
+
+    def rel_paths(self):
+        """Returns a list of every relative path"""
+        return list(self.iter_paths("rel"))
+
     def __getitem__(self, key):
         if isinstance(key, int):
-            return self.paths["abs"][key], self.paths["rel"][key]
+            suffix = self.suffix(key)
+            return (
+                join_prefix(self.prefixes["abs"], suffix),
+                join_prefix(self.prefixes["rel"], suffix),
+            )
         if isinstance(key, slice):
-            start, stop, step = key.indices(self.counter)
-            ret_abs = []
-            ret_rel = []
-            for idx in range(start, stop, step):
-                abs_path, rel_path = self.paths["abs"][idx], self.paths["rel"][idx]
-                ret_abs.append(abs_path)
-                ret_rel.append(rel_path)
-            return ret_abs, ret_rel
+            indices = range(*key.indices(self.counter))
+            return StorageView(self, indices, "abs"), StorageView(self, indices, "rel")
         raise TypeError(f"indices must be integers or slices, not {type(key)}")
 
+    def to_suffix(self, value):
+        """
+        Strips the absolute or relative prefix from value.
+        Returns None if value is not below either prefix.
+        """
+        for key in ("abs", "rel"):
+            prefix = self.prefixes[key]
+            if prefix and value.startswith(prefix):
+                rest = value[len(prefix) :]
+                if prefix.endswith(os.sep):
+                    return rest
+                if rest.startswith(os.sep):
+                    return rest[1:]
+        if not self.prefixes["rel"]:
+            return value
+        return None
+
+    def query_suffix(self, value):
+        """
+        Returns the suffix an absolute path, relative path or bare suffix
+        refers to, or None if it cannot be stored: value is an absolute path
+        outside the prefix, or bloom, a BloomFilter of the lines as written
+        below line_prefix, rules it out.
+        """
+        suffix = self.to_suffix(value)
+        if suffix is None and not os.path.isabs(value):
+            suffix = value
+        if suffix is not None and self.bloom is not None:
+            line = join_prefix(self.line_prefix, suffix)
+            if line.encode(ENCODING, ERRORS) not in self.bloom:
+                return None
+        return suffix
+
+    def query_suffixes(self, values):
+        """
+        Yields query_suffix(value) for each value of an iterable, with the
+        prefixes resolved once for the batch
+        """
+        if self.bloom is not None:
+            yield from map(self.query_suffix, values)
+            return
+        heads = [
+            prefix if prefix.endswith(os.sep) else prefix + os.sep
+            for prefix in (self.prefixes["abs"], self.prefixes["rel"])
+            if prefix
+        ]
+        bare = not self.prefixes["rel"]
+        isabs = os.path.isabs
+        for value in values:
+            for head in heads:
+                if value.startswith(head):
+                    yield value[len(head) :]
+                    break
+            else:
+                yield value if bare or not isabs(value) else None
+
+    def contains_many(self, values):
+        """
+        Returns a list of whether each value of an iterable is stored.
+        Batches of at least 1 / BATCH_RATIO of the stored entries, and every
+        batch against a storage without a hash index, are answered in one pass
+        over the stored suffixes; smaller ones are looked up a value at a time.
+        """
+        values = list(values)
+        if self.has_index and len(values) * BATCH_RATIO < self.counter:
+            if self.lookup is None:
+                find = self._find
+                return [find(value) != -1 for value in values]
+            keys = (
+                None if suffix is None else suffix.encode(ENCODING, ERRORS)
+                for suffix in self.query_suffixes(values)
+            )
+            return [slot != -1 for slot in self.lookup.find_many(keys, self._raw)]
+        queries = list(self.query_suffixes(values))
+        stored = set(queries).intersection(self.suffixes())
+        return [query in stored for query in queries]
+
+    def contains_suffixes(self, suffixes):
+        """
+        Returns a list of whether each bare suffix of an iterable is stored,
+        None counting as not stored, by probing lookup. Lazy storages without
+        an index of their own probe an in-memory copy of their entries.
+        """
+        if not self.in_memory:
+            return self.to_data_storage().contains_suffixes(suffixes)
+        return self._probe(self.lookup, suffixes)
+
+    def _probe(self, index, suffixes):
+        """Returns whether each of suffixes is found in index, a HashIndex"""
+        keys = (
+            None if suffix is None else suffix.encode(ENCODING, ERRORS)
+            for suffix in suffixes
+        )
+        return [idx != -1 for idx in index.find_many(keys, self._raw)]
+
+    def to_data_storage(self, prefixes=None):
+        """Returns an in-memory DataStorage of the entries"""
+        return DataStorage(self.suffixes(), prefixes)
+
+    def _find(self, value):
+        """Returns the slot of value, or -1 if it is not stored"""
+        suffix = self.query_suffix(value)
+        if suffix is None:
+            return -1
+        return self.lookup.find(suffix.encode(ENCODING, ERRORS), self._raw)
+
     def __contains__(self, value):
-        return value in self.lookup
+        return self._find(value) != -1
 
     def __iter__(self):
-        self.curr_idx = 0
-        return self
-
-    def __next__(self):
-        if self.curr_idx < self.counter:
-            result = self[self.curr_idx]
-            self.curr_idx += 1
-            return result
-        raise StopIteration
+        abs_head = join_prefix(self.prefixes["abs"], "")
+        rel_head = join_prefix(self.prefixes["rel"], "")
+        for suffix in self.suffixes():
+            yield abs_head + suffix, rel_head + suffix
 
     def index(self, value):
         """Returns the index of value in DataStorage"""
-        if value in self.lookup:
-            return self.lookup[value][1]
-        raise ValueError(f"{value} is not in DataStorage")
+        slot = self._find(value)
+        if slot == -1:
+            raise ValueError(f"{value} is not in DataStorage")
+        if not self.in_memory:
+            # lazy storages have no tombstones, their slots are indices
+            return slot
+        return slot - bisect_left(self.tombstones, slot)
 
     def count(self, value):
         """Returns the number of occurrences of value in DataStorage"""
-        return 1 if value in self.lookup else 0
+        return 1 if value in self else 0
+
+    def close(self):
+        """Releases the file behind a lazy storage; in-memory ones hold none"""
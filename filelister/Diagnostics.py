@@ -0,0 +1,56 @@
+"""
+Diagnostics class for counting the paths left out of a Filelist
+
+Building a Filelist can leave out millions of paths: duplicates, files whose
+extension is not accepted, directories that cannot be read. Instead of a
+line of terminal output per path, each is counted by reason, a bounded
+sample is kept, and one summary per reason is logged to the "filelister"
+logger once the whole batch is done.
+"""
+import logging
+
+REASONS = ("duplicate", "rejected", "skipped")
+SAMPLE_SIZE = 5
+
+logger = logging.getLogger("filelister")
+
+
+class Diagnostics:
+    """
+    Counts of left out paths by reason, with the first sample_size paths of
+    each. report() logs what was counted since the last report.
+    """
+
+    def __init__(self, sample_size=None):
+        self.sample_size = SAMPLE_SIZE if sample_size is None else sample_size
+        self.counts = dict.fromkeys(REASONS, 0)
+        self.samples = {reason: [] for reason in REASONS}
+        self._reported = dict(self.counts)
+
+    def record(self, reason, path):
+        """Counts path as left out for reason"""
+        self.counts[reason] += 1
+        sample = self.samples[reason]
+        if len(sample) < self.sample_size:
+            sample.append(path)
+
+    def report(self):
+        """Logs one warning per reason with paths counted since the last report"""
+        for reason, count in self.counts.items():
+            new = count - self._reported[reason]
+            if new:
+                logger.warning(
+                    "Left out %d %s path(s), %d in total, e.g. %s",
+                    new,
+                    reason,
+                    count,
+                    self.samples[reason],
+                )
+        self._reported = dict(self.counts)
+
+    def to_dict(self):
+        """Returns the count and sample of paths for every reason"""
+        return {
+            reason: {"count": self.counts[reason], "sample": list(self.samples[reason])}
+            for reason in REASONS
+        }
@@ -2,11 +2,51 @@
 Class to handle Filelists
 """
 import os
-import zlib
+from itertools import repeat
 
 from termcolor import colored
 
-from .DataStorage import DataStorage
+from .BinaryStorage import BinaryStorage, write_binary
+from .BloomFilter import ERROR_RATE, bloom_path, save_bloom
+from .compression import BLOCK_SIZE, parse_codec, write_blocks, write_compressed
+from .crawler import crawl_dirs, root_prefix
+from .DataStorage import DataStorage, join_prefix
+from .Diagnostics import Diagnostics
+from .hashing import DEFAULT_ALGO, check_algo, hash_files
+from .metadata import (
+    COLUMNS,
+    append_rows,
+    metadata_path,
+    new_columns,
+    newer_indices,
+    load_metadata,
+    save_metadata,
+    stable_order,
+    stat_path,
+    storage_column,
+)
+from .PathArray import HAS_NUMPY, PathArray, write_lines
+from .PathFilter import PathFilter, build_filter
+from .scan_state import (
+    load_scan_state,
+    new_scan_state,
+    record_dirs,
+    rescan,
+    save_scan_state,
+    scan_state_path,
+)
+from .ScanCache import ScanCache
+from .sharding import part_key, partition_storage, write_parts
+from .StorageView import StorageView
+
+
+def _strip_head(key, head):
+    """Returns key relative to head, or None if it is not below head"""
+    if not head:
+        return key
+    if key.startswith(head + os.sep):
+        return key[len(head) + 1 :]
+    return None
 
 
 class Filelist:
@@ -14,12 +54,22 @@ class Filelist:
     Filelist class for creating, manipulating, comparing, and exporting filelists.
     """
 
-    def __init__(self, input_data, accepted_exts=None):
+    def __init__(
+        self,
+        input_data,
+        accepted_exts=None,
+        prune=None,
+        workers=None,
+        path_filter=None,
+        metadata=False,
+        cache=None,
+    ):
         self._state = None  # abs, rel, or na
         self._prefixes = {"abs": "", "rel": "", "curr": ""}
         self._data_storage = None
-        if accepted_exts is None:
-            accepted_exts = False
+        self._scan = None
+        self._diagnostics = Diagnostics()
+        self._hash_cache = {}
 
         # get location of caller
         # self._caller_loc = os.path.dirname(
@@ -29,11 +79,18 @@ class Filelist:
         if isinstance(input_data, Filelist):
             raise TypeError(colored(f"{input_data} is already a Filelist", "red"))
 
-        if not isinstance(input_data, (list, set, tuple, str)):  # add iterables
+        if not isinstance(input_data, (list, set, tuple, StorageView, str)):
             raise TypeError(colored(f"Invalid input type: {type(input_data)}", "red"))
 
-        if isinstance(input_data, (list, set, tuple)):
-            self._build_internal(list(input_data), accepted_exts)
+        if cache is not None and not isinstance(input_data, str):
+            raise ValueError(
+                colored("Only Filelists crawled from a directory can be cached", "red")
+            )
+
+        if isinstance(input_data, (list, set, tuple, StorageView)):
+            self._build_internal(
+                list(input_data), build_filter(accepted_exts, path_filter), metadata
+            )
 
         if isinstance(input_data, str):
             try:
@@ -41,16 +98,52 @@ class Filelist:
                     raise FileNotFoundError(
                         colored(f"{input_data} is not a directory", "red")
                     )
-                tmp = []
-                for path, _, files in os.walk(input_data):
-                    for filename in files:
-                        tmp.append(path + os.sep + filename)
-                self._build_internal(tmp, accepted_exts)
+                if cache is not None:
+                    self._build_cached(
+                        input_data,
+                        accepted_exts,
+                        path_filter,
+                        prune,
+                        workers,
+                        metadata,
+                        ScanCache(cache) if isinstance(cache, str) else cache,
+                    )
+                else:
+                    self._build_from_dir(
+                        input_data, accepted_exts, path_filter, prune, workers, metadata
+                    )
             except Exception as e:
                 raise e
 
-    def _build_internal(self, input_data, accepted_exts):
-        self._prefixes["curr"] = os.path.dirname(os.path.commonprefix(input_data))
+    @classmethod
+    def from_storage(cls, storage, curr, scan=None):
+        """
+        Wraps an already built storage in a Filelist whose current prefix is curr.
+        The storage's prefixes are shared with the new Filelist, and scan is the
+        scan state refresh() starts from, if any.
+        """
+        flist = cls.__new__(cls)
+        flist._state = None
+        flist._prefixes = storage.prefixes
+        flist._set_prefixes(curr)
+        flist._data_storage = storage
+        flist._scan = scan
+        flist._diagnostics = storage.diagnostics or Diagnostics()
+        flist._hash_cache = {}
+        return flist
+
+    @property
+    def storage(self):
+        """The DataStorage holding the suffixes of the Filelist"""
+        return self._data_storage
+
+    @property
+    def prefix(self):
+        """The absolute directory the suffixes of the Filelist are stored below"""
+        return self._prefixes["abs"]
+
+    def _set_prefixes(self, curr):
+        self._prefixes["curr"] = curr
 
         if self._prefixes["curr"].startswith(os.sep):
             self._state = "abs"
@@ -65,56 +158,180 @@ class Filelist:
             if not self.is_na()
             else ""
         )
-        self._data_storage = DataStorage(self._loader(input_data, accepted_exts))
 
-    def _loader(self, input_data, accepted_exts):
-        for value in input_data:
-            if accepted_exts:
-                if os.path.splitext(value)[1] in accepted_exts:
-                    yield self._get_abs_path(value), self._get_rel_path(value)
-                else:
-                    print(colored(f"Invalid exception found. Skipping {value}.", "red"))
-            else:
-                yield self._get_abs_path(value), self._get_rel_path(value)
+    def _build_internal(self, input_data, path_filter, metadata):
+        self._set_prefixes(os.path.dirname(os.path.commonprefix(input_data)))
+        columns = new_columns() if metadata else None
+        self._data_storage = DataStorage(
+            self._loader(input_data, path_filter, columns),
+            self._prefixes,
+            self._diagnostics,
+            columns,
+        )
 
-    def _get_abs_path(self, path):
-        unique_path = path[len(self._prefixes["curr"]) :]
-        if not unique_path.startswith("/"):
-            unique_path = "/" + unique_path
+    def _build_from_dir(
+        self, root, accepted_exts, path_filter, prune, workers, metadata
+    ):
+        """
+        Streams the files below root straight into DataStorage.
+        The root is the common prefix, so crawled paths are already suffixes.
+        Each directory's mtime is recorded so the Filelist can be refreshed.
+        With metadata, the size, mtime and inode of each file are taken from
+        the DirEntry objects of the crawl.
+        """
+        columns = new_columns() if metadata else None
+        self._set_prefixes(root_prefix(root))
+        self._scan = new_scan_state(
+            root_prefix(root), accepted_exts, prune, path_filter
+        )
+        path_filter = build_filter(accepted_exts, path_filter)
+        self._data_storage = DataStorage(
+            record_dirs(
+                crawl_dirs(root, prune, workers, stat=metadata),
+                self._scan["dirs"],
+                lambda files: self._filter(files, path_filter, root),
+                self._diagnostics,
+                columns,
+            ),
+            self._prefixes,
+            self._diagnostics,
+            columns,
+        )
 
-        return self._prefixes["abs"] + unique_path
+    def _build_cached(
+        self, root, accepted_exts, path_filter, prune, workers, metadata, cache
+    ):
+        """
+        Loads the crawl of root from cache, a ScanCache, refreshing it unless
+        the cache trusts its entries, or crawls root and caches the result.
+        """
+        if callable(prune):
+            raise ValueError(
+                colored("A cached crawl can only prune a list of names", "red")
+            )
+        state = new_scan_state(root_prefix(root), accepted_exts, prune, path_filter)
+        options = {key: state[key] for key in ("root", "accepted_exts", "filter")}
+        options.update(prune=state["prune"], metadata=bool(metadata))
+
+        def load(path):
+            if not self._read_cached(root, path, state, metadata):
+                return False
+            if cache.validate:
+                added, removed = self.refresh(workers=workers)
+                if added or removed:
+                    self._save_cached(cache, path)
+            return True
+
+        def build(path):
+            self._build_from_dir(
+                root, accepted_exts, path_filter, prune, workers, metadata
+            )
+            self._save_cached(cache, path)
+
+        cache.fetch(options, load, build)
+
+    def _read_cached(self, root, infile, state, metadata):
+        """
+        Reads the cached crawl of root from infile, returning false if it is
+        unreadable or was not crawled with the options of state
+        """
+        try:
+            storage = BinaryStorage(infile)
+        except (OSError, TypeError, ValueError):
+            return False
+        try:
+            self._set_prefixes(root_prefix(root))
+            if storage.line_prefix != self._prefixes["abs"]:
+                return False
+            self._data_storage = storage.to_data_storage(self._prefixes)
+            self._data_storage.diagnostics = self._diagnostics
+        finally:
+            storage.close()
+        self._scan = load_scan_state(infile, len(self))
+        if self._scan is None or self._scan["root"] != state["root"]:
+            return False
+        if metadata:
+            columns = load_metadata(infile, len(self))
+            if columns is None:
+                return False
+            self._data_storage.metadata = columns
+        return True
+
+    def _save_cached(self, cache, path):
+        """Saves the Filelist as the cache entry at path, a binary filelist"""
+        cache.write(
+            path,
+            lambda outfile: self.save(
+                outfile, output_type="abs", binary=True, hash_index=False
+            ),
+        )
+
+    def _filter(self, input_data, path_filter, root=None):
+        """
+        Returns the paths path_filter keeps, statting files below root, and
+        counts the rejected ones
+        """
+        if path_filter is None:
+            return input_data
+        return path_filter.apply(input_data, root, self._diagnostics)
 
-    def _get_rel_path(self, path):
+    def _loader(self, input_data, path_filter, columns=None):
+        for value in self._filter(input_data, path_filter):
+            if columns is not None:
+                append_rows(columns, [stat_path(value)])
+            yield self._get_suffix(value)
+
+    def _get_suffix(self, path):
         unique_path = path[len(self._prefixes["curr"]) :]
-        if self._state == "na" and self._prefixes["rel"] != "":
-            unique_path = "/" + unique_path
-        return self._prefixes["rel"] + unique_path
+        if self._prefixes["curr"]:
+            unique_path = unique_path.lstrip(os.sep)
+        return unique_path
 
     def to_list(self):
         """Returns the Filelist as a List"""
         if self.is_abs():
-            return self._data_storage.paths["abs"]
-        return self._data_storage.paths["rel"]
+            return self._data_storage.abs_paths()
+        return self._data_storage.rel_paths()
 
     def _to_abs_list(self):
-        return self._data_storage.paths["abs"]
+        return self._data_storage.abs_paths()
 
     def _to_rel_list(self):
-        return self._data_storage.paths["rel"]
+        return self._data_storage.rel_paths()
 
     def __iter__(self):
-        return iter(self.to_list())
+        return self._data_storage.iter_paths(self._path_kind())
+
+    def iter_chunks(self, size):
+        """
+        Yields the paths of the Filelist in order, as lists of up to size paths,
+        for consumers that work in batches
+        """
+        if size < 1:
+            raise ValueError(colored("chunk size must be positive", "red"))
+        return self._data_storage.iter_chunks(size, self._path_kind())
 
     def __len__(self):
         return len(self._data_storage)
 
+    @property
+    def stats(self):
+        """
+        Returns how many paths were left out of the Filelist by reason, with a
+        sample of them: duplicates, paths whose extension was not accepted
+        (rejected), and directories that could not be read (skipped)
+        """
+        return self._diagnostics.to_dict()
+
     def __getitem__(self, idx):
-        if isinstance(idx, (int, slice)):
-            return (
-                self._data_storage[idx][0]
-                if self.is_abs()
-                else self._data_storage[idx][1]
-            )
+        key = self._path_kind()
+        if isinstance(idx, int):
+            if key == "abs":
+                return self._data_storage.abs_path(idx)
+            return self._data_storage.rel_path(idx)
+        if isinstance(idx, slice):
+            indices = range(*idx.indices(len(self._data_storage)))
+            return StorageView(self._data_storage, indices, key)
         raise TypeError(
             colored(f"indices must be integers or slices, not {type(idx)}", "red")
         )
@@ -133,13 +350,11 @@ class Filelist:
         return colored("Empty Filelist", "red")
 
     def __repr__(self):
-        idx = 0 if self.is_abs() else 1
         if len(self._data_storage) > 10:
             return colored(
-                f"Filelist({self._data_storage[:5][idx], ..., self._data_storage[:-5][idx]})",
-                "cyan",
+                f"Filelist({self[:5].to_list(), ..., self[-5:].to_list()})", "cyan"
             )
-        return colored(f"Filelist({str(self._data_storage[:][idx])})", "cyan")
+        return colored(f"Filelist({str(self[:].to_list())})", "cyan")
 
     def is_abs(self):
         """Returns true if storing an absolute Filelist and false otherwise."""
@@ -167,6 +382,435 @@ class Filelist:
             self._state = "rel"
         return self
 
+    def refresh(self, prune=None, workers=None):
+        """
+        Updates a Filelist built from a directory, or read back from a filelist
+        saved with its scan state, by relisting only the directories whose
+        mtime changed since the last crawl. The paths end up in the order a
+        fresh crawl would list them.
+        prune applies to relisted directories and defaults to the pruned names
+        of the first crawl. Returns the lists of added and removed paths.
+        """
+        if self._scan is None:
+            raise ValueError(
+                colored(
+                    "Only Filelists crawled from a directory can be refreshed", "red"
+                )
+            )
+        self._rebase(self._scan["root"])
+        root = self._scan["root"]
+        path_filter = build_filter(
+            self._scan["accepted_exts"], PathFilter.from_specs(self._scan.get("filter"))
+        )
+        added, removed = rescan(
+            self._data_storage,
+            self._scan,
+            lambda files: self._filter(files, path_filter, root),
+            prune,
+            workers,
+            self._diagnostics,
+        )
+        # files may have changed without their directory's mtime changing
+        self._data_storage.digests = None
+        self._diagnostics.report()
+        prefix = self._prefixes["abs" if self.is_abs() else "rel"]
+        return (
+            [join_prefix(prefix, suffix) for suffix in added],
+            [join_prefix(prefix, suffix) for suffix in removed],
+        )
+
+    def _rebase(self, prefix):
+        """
+        Moves the paths into an in-memory DataStorage below prefix, an absolute
+        directory holding the current prefix, rebasing every suffix if needed.
+        """
+        storage = self._data_storage
+        head = os.path.relpath(self._prefixes["abs"], prefix)
+        head = "" if head == "." else head
+        # pylint: disable-next=unidiomatic-typecheck
+        if not head and type(storage) is DataStorage:
+            return
+        columns = None
+        if storage.metadata is not None:
+            columns = {name: storage.column(name) for name, _ in COLUMNS}
+        self._data_storage = DataStorage(
+            (join_prefix(head, suffix) for suffix in storage.suffixes()),
+            self._prefixes,
+            self._diagnostics,
+            columns,
+        )
+        if storage.digests is not None:
+            self._data_storage.digests = storage.column("digest")
+            self._data_storage.digest_algo = storage.digest_algo
+        storage.close()
+        if head:
+            curr = prefix if self.is_abs() else os.path.relpath(prefix)
+            self._set_prefixes("" if curr == "." else curr)
+
+    def append(self, path):
+        """
+        Adds path to the end of the Filelist, unless it is already in it.
+        The prefix is only recomputed, and the stored paths rebased, when path
+        falls outside it.
+        """
+        self._append(path)
+        self._diagnostics.report()
+
+    def extend(self, paths):
+        """Appends every path of an iterable"""
+        for path in paths:
+            self._append(path)
+        self._diagnostics.report()
+
+    def _append(self, path):
+        """Appends path, counting it as a duplicate if it is already stored"""
+        if not isinstance(path, str):
+            raise TypeError(colored("Invalid input: path must be a string", "red"))
+        self._scan = None
+        if not self._data_storage:
+            self._rebase(self._prefixes["abs"])
+            self._set_prefixes(os.path.dirname(path))
+        elif not self.is_na() and not os.path.isabs(path):
+            # relative paths are relative to the cwd, like the rel prefix
+            path = os.path.abspath(path)
+        suffix = self._data_storage.to_suffix(path)
+        if suffix is None or (self.is_na() and os.path.isabs(path)):
+            self._rebase(
+                os.path.commonpath(
+                    [self._prefixes["abs"], os.path.dirname(os.path.abspath(path))]
+                )
+            )
+            suffix = self._data_storage.to_suffix(path)
+        else:
+            self._rebase(self._prefixes["abs"])
+        self._data_storage._append(suffix)  # pylint: disable=protected-access
+
+    def remove(self, path):
+        """
+        Removes path from the Filelist. Raises a ValueError if it is not in it.
+        """
+        if not isinstance(path, str):
+            raise TypeError(colored("Invalid input: path must be a string", "red"))
+        self._rebase(self._prefixes["abs"])
+        try:
+            self._data_storage.remove(path)
+        except ValueError:
+            raise ValueError(colored(f"{path} is not in Filelist", "red")) from None
+        self._scan = None
+
+    def compact(self):
+        """Reclaims the space of removed paths, which otherwise happens periodically"""
+        self._data_storage.compact()
+
+    def _vectorized(self):
+        """Returns a PathArray of the stored suffixes, or None without numpy"""
+        if not HAS_NUMPY:
+            return None
+        return PathArray.from_storage(self._data_storage)
+
+    def _derive(self, suffixes):
+        """
+        Returns a new Filelist with the same prefixes, from an iterable of
+        suffixes or a PathArray.
+        """
+        if isinstance(suffixes, PathArray):
+            storage = suffixes.to_storage(dict(self._prefixes))
+        else:
+            storage = DataStorage(suffixes, dict(self._prefixes))
+        return Filelist.from_storage(storage, self._prefixes["curr"])
+
+    def filter_exts(self, accepted_exts):
+        """
+        Returns a new Filelist of the paths whose extension is in accepted_exts,
+        matching what accepted_exts keeps when building a Filelist.
+        """
+        paths = self._vectorized()
+        if paths is not None:
+            return self._derive(paths.compress(paths.ext_mask(accepted_exts)))
+        accepted_exts = set(accepted_exts)
+        return self._derive(
+            suffix
+            for suffix in self._data_storage.suffixes()
+            if os.path.splitext(suffix)[1] in accepted_exts
+        )
+
+    def sorted(self, reverse=False):
+        """
+        Returns a new Filelist with the paths in sorted order.
+        Paths are ordered by their utf-8 bytes, which matches sorting the str paths.
+        """
+        paths = self._vectorized()
+        if paths is not None:
+            order = paths.argsort()
+            if reverse:
+                order = order[::-1]
+            return self._derive(paths.take(order))
+        return self._derive(sorted(self._data_storage.suffixes(), reverse=reverse))
+
+    def has_metadata(self):
+        """Returns true if the Filelist holds the size, mtime and inode of its paths"""
+        return self._data_storage.metadata is not None
+
+    def column(self, name):
+        """
+        Returns the size, mtime (in nanoseconds) or inode of every path, in
+        order, as an array. Raises a ValueError if the Filelist has no metadata.
+        """
+        try:
+            return storage_column(self._data_storage, name)
+        except ValueError as e:
+            raise ValueError(colored(str(e), "red")) from None
+
+    def total_size(self):
+        """Returns the total size in bytes of the files in the Filelist"""
+        return sum(self.column("size"))
+
+    def newer_than(self, timestamp):
+        """
+        Returns a new Filelist of the paths modified after timestamp, in
+        seconds since the epoch, with their metadata
+        """
+        return self._select(newer_indices(self.column("mtime"), timestamp))
+
+    def sorted_by(self, key="size", reverse=False):
+        """
+        Returns a new Filelist with its metadata, ordered by the size, mtime
+        or inode of the paths. Ties keep their order.
+        """
+        return self._select(stable_order(self.column(key), reverse))
+
+    def has_hashes(self):
+        """Returns true if the digests of every path are computed"""
+        return self._data_storage.digests is not None
+
+    def compute_hashes(self, algo=DEFAULT_ALGO, workers=None, cache=None):
+        """
+        Hashes the contents of every file with the hashlib algorithm algo, on
+        a pool of workers threads, and stores the digests as the "digest"
+        column, aligned with the paths. Files that cannot be read get None and
+        are counted as skipped.
+        Digests are cached by path, size and mtime, statted afresh on every
+        call, so files that have not changed since the last call are not read
+        again. cache may be a dict shared between Filelists, and defaults to
+        one kept by this Filelist; either holds the MAX_CACHED most recently
+        used digests. Returns the digests.
+        """
+        try:
+            check_algo(algo)
+        except ValueError as e:
+            raise ValueError(colored(str(e), "red")) from None
+        storage = self._data_storage
+        storage.compact()
+        paths = list(storage.iter_paths("abs"))
+        if cache is None:
+            cache = self._hash_cache
+        digests = list(hash_files(paths, algo, workers, cache))
+        for path, digest in zip(paths, digests):
+            if digest is None:
+                self._diagnostics.record("skipped", path)
+        self._diagnostics.report()
+        storage.digests = digests
+        storage.digest_algo = algo
+        return list(digests)
+
+    def duplicates(self):
+        """
+        Returns the groups of paths with the same contents, each in order and
+        ordered by their first path, hashing the files first if needed.
+        Files that cannot be read are left out.
+        """
+        if not self.has_hashes():
+            self.compute_hashes()
+        groups = {}
+        for path, digest in zip(self, self.column("digest")):
+            if digest is not None:
+                groups.setdefault(digest, []).append(path)
+        return [paths for paths in groups.values() if len(paths) > 1]
+
+    def _select(self, indices):
+        """Returns a new Filelist of the paths at indices, with their metadata"""
+        storage = self._data_storage.select(indices, dict(self._prefixes))
+        return Filelist.from_storage(storage, self._prefixes["curr"])
+
+    def _subset(self, mask, invert=False):
+        """
+        Returns a new Filelist of the paths whose flag in mask is true, or
+        false if invert, in order
+        """
+        storage = self._data_storage.subset(mask, invert, dict(self._prefixes))
+        return Filelist.from_storage(storage, self._prefixes["curr"])
+
+    def partition(self, key="hash", num_parts=None):
+        """
+        Returns a dict from each part to a new Filelist of its paths, in order,
+        filled in one pass.
+        key picks the part of each path:
+            hash: a stable hash of the absolute path modulo num_parts, so a
+                file lands in the same part in every run; every part from 0
+                to num_parts - 1 is returned, even if empty
+            dir: the directory of the path below the Filelist's prefix
+            ext: the extension of the path
+            or a function called with each path as the Filelist returns it
+        """
+        part_of = part_key(key, num_parts, self._prefixes, self._path_kind())
+        parts = range(num_parts) if key == "hash" else ()
+        return {
+            part: Filelist.from_storage(storage, self._prefixes["curr"])
+            for part, storage in partition_storage(
+                self._data_storage, part_of, parts
+            ).items()
+        }
+
+    def shard(self, num_shards, index, by="hash"):
+        """
+        Returns shard index of num_shards as a new Filelist.
+        by="hash" assigns paths by a stable hash of their absolute path, so a
+        file stays in the same shard as the Filelist changes; by="range"
+        splits the Filelist into contiguous, evenly sized runs.
+        """
+        if not 0 <= index < num_shards:
+            raise IndexError(
+                colored(f"shard {index} is out of range for {num_shards}", "red")
+            )
+        if by == "range":
+            count = len(self._data_storage)
+            indices = range(
+                index * count // num_shards, (index + 1) * count // num_shards
+            )
+            return self._derive(self._data_storage.suffix_range(indices))
+        if by != "hash":
+            raise ValueError(colored(f"by must be hash or range, not {by}", "red"))
+        part_of = part_key("hash", num_shards, self._prefixes, self._path_kind())
+        suffixes = self._data_storage.suffixes()
+        return self._derive(suffix for suffix in suffixes if part_of(suffix) == index)
+
+    def save_shards(self, outfile, num_parts=None, key="hash", output_type=None):
+        """
+        Splits the Filelist as partition(key, num_parts) does and writes each
+        part to an uncompressed filelist in a single pass over the paths.
+        outfile is a pattern formatted with the number of each part, such as
+        "shards/filelist_{}.txt": with key="hash" that number is the part, and
+        otherwise parts are numbered in the order they are first seen.
+        Returns a dict from each part to the path it was written to.
+        """
+        if output_type is None:
+            output_type = self._state
+        part_of = part_key(key, num_parts, self._prefixes, self._path_kind())
+        numbers = {}
+
+        def outfile_of(part):
+            number = part if key == "hash" else numbers.setdefault(part, len(numbers))
+            return outfile.format(number)
+
+        return write_parts(
+            self._data_storage,
+            part_of,
+            outfile_of,
+            lambda path: self._output_prefix(output_type, path),
+            range(num_parts) if key == "hash" else (),
+        )
+
+    def _path_kind(self):
+        """Returns the prefix key of the paths the Filelist returns"""
+        return "abs" if self.is_abs() else "rel"
+
+    def _check_other(self, other):
+        if not isinstance(other, Filelist):
+            raise TypeError(
+                colored(f"Invalid input: {type(other)} is not a Filelist", "red")
+            )
+
+    @staticmethod
+    def _common_prefix(flist, other):
+        """
+        Returns the absolute prefix shared by both Filelists, and the heads
+        joining each Filelist's suffixes onto it, empty if it is their prefix.
+        """
+        prefix = os.path.commonpath([flist.prefix, other.prefix])
+        heads = [os.path.relpath(each.prefix, prefix) for each in (flist, other)]
+        return (prefix, *("" if head == "." else head for head in heads))
+
+    def _found_in(self, flist, other):
+        """
+        Returns whether each of flist's suffixes is in other, probing other's
+        index rather than collecting either Filelist's suffixes
+        """
+        _, head, other_head = self._common_prefix(flist, other)
+        suffixes = flist.storage.suffixes()
+        if head or other_head:
+            suffixes = (
+                _strip_head(join_prefix(head, suffix), other_head)
+                for suffix in suffixes
+            )
+        return other.storage.contains_suffixes(suffixes)
+
+    def _combine(self, other, only_new):
+        """
+        Returns a Filelist of this Filelist's suffixes, or only those not in
+        other if only_new, followed by other's suffixes that are not in this
+        Filelist, below the prefix both Filelists share.
+        """
+        prefix, head, other_head = self._common_prefix(self, other)
+        in_other = self._found_in(self, other) if only_new else repeat(False)
+        in_self = self._found_in(other, self)
+
+        if not head and not other_head:
+            left = self._data_storage
+            if only_new or not left.in_memory:
+                left = left.subset(in_other, invert=True)
+            storage = DataStorage.concat(
+                [left, other.storage.subset(in_self, invert=True)],
+                dict(self._prefixes),
+            )
+            return Filelist.from_storage(storage, self._prefixes["curr"])
+
+        def combined():
+            for suffix, found in zip(self._data_storage.suffixes(), in_other):
+                if not found:
+                    yield join_prefix(head, suffix)
+            for suffix, found in zip(other.storage.suffixes(), in_self):
+                if not found:
+                    yield join_prefix(other_head, suffix)
+
+        if not head:
+            return Filelist.from_storage(
+                DataStorage(combined(), dict(self._prefixes)), self._prefixes["curr"]
+            )
+        curr = prefix if self.is_abs() else os.path.relpath(prefix)
+        return Filelist.from_storage(DataStorage(combined()), curr)
+
+    def __or__(self, other):
+        self._check_other(other)
+        return self._combine(other, only_new=False)
+
+    def __and__(self, other):
+        self._check_other(other)
+        return self._subset(self._found_in(self, other))
+
+    def __sub__(self, other):
+        self._check_other(other)
+        return self._subset(self._found_in(self, other), invert=True)
+
+    def __xor__(self, other):
+        self._check_other(other)
+        return self._combine(other, only_new=True)
+
+    def union(self, other):
+        """Returns a new Filelist of the paths in either Filelist"""
+        return self | other
+
+    def intersection(self, other):
+        """Returns a new Filelist of the paths in both Filelists"""
+        return self & other
+
+    def difference(self, other):
+        """Returns a new Filelist of the paths not in other"""
+        return self - other
+
+    def symmetric_difference(self, other):
+        """Returns a new Filelist of the paths in exactly one of the Filelists"""
+        return self ^ other
+
     def contains(self, filename):
         """
         Returns True if the filelist contains a given filename.
@@ -175,16 +819,81 @@ class Filelist:
             raise TypeError(colored("Invalid input: filename must be a string", "red"))
         return filename in self._data_storage
 
-    def save(self, outfile="filelist.txt", output_type=None, compressed=False):
+    def contains_many(self, filenames, as_filelist=False):
+        """
+        Returns a list of whether each filename of an iterable, such as a list,
+        generator or numpy array of str, is in the filelist. Filenames may be
+        absolute, relative or below the Filelist's prefix, and are checked in
+        one pass. as_filelist=True returns a new Filelist of the stored paths
+        among filenames instead, in filelist order.
+        """
+        if isinstance(filenames, str):
+            raise TypeError(
+                colored("Invalid input: filenames must be an iterable of str", "red")
+            )
+        if hasattr(filenames, "tolist"):
+            filenames = filenames.tolist()
+        filenames = list(filenames)
+        if not all(isinstance(filename, str) for filename in filenames):
+            raise TypeError(colored("Invalid input: filenames must be strings", "red"))
+        if not as_filelist:
+            return self._data_storage.contains_many(filenames)
+        keys = set(self._data_storage.query_suffixes(filenames))
+        return self._subset(suffix in keys for suffix in self._data_storage.suffixes())
+
+    def index(self, filename):
+        """
+        Returns the position of a given filename, which may be an absolute
+        path, a relative path or a path below the Filelist's prefix.
+        """
+        if not isinstance(filename, str):
+            raise TypeError(colored("Invalid input: filename must be a string", "red"))
+        try:
+            return self._data_storage.index(filename)
+        except ValueError:
+            raise ValueError(colored(f"{filename} is not in Filelist", "red")) from None
+
+    def count(self, filename):
+        """Returns the number of times a given filename occurs, 0 or 1"""
+        return 1 if self.contains(filename) else 0
+
+    def save(
+        self,
+        outfile="filelist.txt",
+        output_type=None,
+        compressed=False,
+        binary=False,
+        hash_index=True,
+        block_size=None,
+        bloom=None,
+    ):
         """
         Saves a Filelist.
         Args:
             outfile (str, optional): path and filename to output filelist
-            output_type (str, optional): whether to save a relative, absolute, or na filelist
-            compressed(bool, optional): whether or not to compress the output filelist
+            output_type (str, optional): whether to save a relative, absolute, or na
+                filelist
                 abs: save outpaths as abspaths
                 rel: save outpaths as relpaths, relative to outfile
                 na: saves only the filenames
+            compressed(bool or str, optional): whether or not to compress the output
+                filelist. True uses zlib; a string picks the codec and level as
+                "[front+]name[:level]", with name one of zlib, lzma, bz2, none,
+                and zstd or lz4 when installed. "front" front-codes blocks of
+                paths, each storing the length shared with the previous path
+                plus the rest. "stream" writes the headerless single zlib
+                stream of earlier versions. Every other compressed filelist
+                records its codec, so read_filelist detects it.
+            binary(bool, optional): whether to save in the binary indexed format,
+                which read_filelist can open lazily with O(1) random access
+            hash_index(bool, optional): whether a binary filelist stores a hash
+                index for membership tests
+            block_size(int, optional): number of paths per independently
+                compressed block, which can be decompressed in parallel or on
+                their own
+            bloom(float or bool, optional): false-positive rate of a Bloom
+                filter saved next to the filelist, True for 1%. A filelist read
+                lazily uses it to reject most absent paths without a search.
         """
         if not isinstance(outfile, str):
             raise TypeError(
@@ -196,41 +905,93 @@ class Filelist:
         if output_type is None:
             output_type = self._state
 
+        self._write(outfile, output_type, compressed, binary, hash_index, block_size)
+
+        if self._scan is not None and output_type != "na":
+            save_scan_state(outfile, self._scan)
+        elif os.path.exists(scan_state_path(outfile)):
+            os.remove(scan_state_path(outfile))
+
+        if self.has_metadata():
+            save_metadata(outfile, {name: self.column(name) for name, _ in COLUMNS})
+        elif os.path.exists(metadata_path(outfile)):
+            os.remove(metadata_path(outfile))
+
+        if bloom:
+            save_bloom(
+                outfile,
+                self._normalize_paths(output_type, outfile),
+                len(self._data_storage),
+                ERROR_RATE if bloom is True else bloom,
+            )
+        elif os.path.exists(bloom_path(outfile)):
+            os.remove(bloom_path(outfile))
+
+    def _write(self, outfile, output_type, compressed, binary, hash_index, block_size):
+        """Writes the paths to outfile in the format picked by save"""
+        if binary:
+            write_binary(
+                outfile,
+                self._output_prefix(output_type, outfile),
+                self._data_storage.suffixes(),
+                len(self._data_storage),
+                hash_index,
+            )
+            return
+
+        if compressed and compressed != "stream":
+            parse_codec(compressed)
+            with open(outfile, "wb") as f:
+                write_blocks(
+                    f,
+                    self._output_prefix(output_type, outfile),
+                    self._data_storage.suffixes(),
+                    block_size or BLOCK_SIZE,
+                    compressed,
+                )
+            return
+
+        prefix = self._output_prefix(output_type, outfile)
+        if (
+            not compressed
+            and HAS_NUMPY
+            and write_lines(outfile, self._data_storage, prefix)
+        ):
+            return
+
         out_data = self._normalize_paths(output_type, outfile)
 
         if compressed:
             with open(outfile, "wb") as f:
-                f.write(self._compress(out_data))
+                write_compressed(f, out_data, self._prefixes["curr"])
         else:
             with open(outfile, "w", encoding="utf-8") as f:
-                f.write(os.linesep.join(out_data))
+                for idx, path in enumerate(out_data):
+                    if idx:
+                        f.write(os.linesep)
+                    f.write(path)
 
-    def _normalize_paths(self, target_type, target_file):
+    def _output_prefix(self, target_type, target_file):
         """
-        target_type: type of Filelist to write
-        target_file: path to desired Filelist location
+        Returns the prefix written before each suffix for a target_type Filelist
+        saved at target_file.
         """
         if target_type == "abs":
-            return self._to_abs_list()
+            return self._prefixes["abs"]
         if target_type == "rel":
-            target_prefix = os.path.relpath(
-                self._prefixes["curr"], start=os.path.dirname(target_file)
+            return os.path.relpath(
+                self._prefixes["curr"],
+                start=os.path.dirname(os.path.abspath(target_file)),
             )
-            return [
-                target_prefix + path[len(self._prefixes["rel"]) :]
-                for path in self._to_rel_list()
-            ]
         if target_type == "na":
-            if self._state == "na":
-                return self.to_list()
-            return [path[len(self._prefixes["curr"]) + 1 :] for path in self.to_list()]
+            return ""
         raise TypeError(colored("Desired target type is unknown", "red"))
 
-    def _compress(self, data):
-        zdict = self._prefixes["curr"].encode("utf-8")
-        obj = zlib.compressobj(level=1, memLevel=9, zdict=zdict)
-        data = ",".join(data).encode("utf-8")
-        data_zip = obj.compress(data)
-        data_zip += obj.flush()
-        data_zip = zdict + b"\n" + data_zip
-        return data_zip
+    def _normalize_paths(self, target_type, target_file):
+        """
+        Returns a generator of the paths to write for a Filelist.
+        target_type: type of Filelist to write
+        target_file: path to desired Filelist location
+        """
+        prefix = self._output_prefix(target_type, target_file)
+        return (join_prefix(prefix, suffix) for suffix in self._data_storage.suffixes())
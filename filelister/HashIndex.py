@@ -0,0 +1,179 @@
+"""HashIndex class"""
+import zlib
+from array import array
+
+
+class HashIndex:
+    """
+    Open-addressing hash table from encoded suffixes to storage indices.
+
+    Slots hold index + 1, with 0 marking an empty slot, and collisions are
+    resolved by linear probing. Keys are not stored: candidates are checked
+    against the storage itself, so the table costs 4 or 8 bytes per slot.
+    The table may be an array or a memoryview over a mapped file; only an
+    array can be grown or have keys inserted and deleted.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.mask = len(table) - 1
+        self.counter = 0
+
+    @staticmethod
+    def hash_key(key):
+        """Returns the stable hash of an encoded suffix"""
+        return zlib.crc32(key)
+
+    @staticmethod
+    def num_slots(count):
+        """Returns a power of two that keeps the load factor at or below 0.5"""
+        slots = 8
+        while slots < 2 * count:
+            slots <<= 1
+        return slots
+
+    @staticmethod
+    def typecode(count):
+        """Returns the smallest array typecode able to hold count + 1"""
+        return "I" if count < 0xFFFFFFFF else "Q"
+
+    @classmethod
+    def empty(cls, count, capacity=None):
+        """
+        Returns an empty index sized for count entries, storing indices below
+        capacity, which defaults to count
+        """
+        typecode = cls.typecode(count if capacity is None else capacity)
+        size = array(typecode).itemsize * cls.num_slots(count)
+        return cls(array(typecode, bytes(size)))
+
+    @classmethod
+    def build(cls, keys, get_key):
+        """
+        Returns an index of an iterable of encoded keys, numbered in order, and
+        the list of indices whose key repeats an earlier one, which are left out.
+        get_key(idx) must return the key numbered idx.
+        """
+        hashes = array("I", map(cls.hash_key, keys))
+        index = cls.empty(len(hashes))
+        table, mask = index.table, index.mask
+        duplicates = []
+        for idx, key_hash in enumerate(hashes):
+            pos = key_hash & mask
+            slot = table[pos]
+            while slot:
+                if hashes[slot - 1] == key_hash:
+                    if get_key(slot - 1) == get_key(idx):
+                        duplicates.append(idx)
+                        break
+                pos = (pos + 1) & mask
+                slot = table[pos]
+            else:
+                table[pos] = idx + 1
+        index.counter = len(hashes) - len(duplicates)
+        return index, duplicates
+
+    def insert_hash(self, key_hash, idx):
+        """Stores idx in the first free slot for key_hash"""
+        pos = key_hash & self.mask
+        while self.table[pos]:
+            pos = (pos + 1) & self.mask
+        self.table[pos] = idx + 1
+        self.counter += 1
+
+    def insert(self, key, idx, get_key):
+        """
+        Stores idx for key unless key is already stored, growing the table to
+        keep the load factor at or below 0.5. Returns the index stored for key.
+        get_key(idx) must return the encoded suffix stored at every other index.
+        """
+        if 2 * (self.counter + 1) > len(self.table) or idx + 1 > self.max_index():
+            self._grow(get_key, idx + 1)
+        table, mask = self.table, self.mask
+        pos = self.hash_key(key) & mask
+        while True:
+            slot = table[pos]
+            if not slot:
+                table[pos] = idx + 1
+                self.counter += 1
+                return idx
+            if get_key(slot - 1) == key:
+                return slot - 1
+            pos = (pos + 1) & mask
+
+    def max_index(self):
+        """Returns the largest index + 1 the table can hold"""
+        return 0xFFFFFFFF if self.table.itemsize == 4 else 0xFFFFFFFFFFFFFFFF
+
+    def _grow(self, get_key, capacity):
+        """Rehashes every stored index into a table sized for one more entry"""
+        grown = self.empty(self.counter + 1, max(capacity, self.counter + 1))
+        for slot in self.table:
+            if slot:
+                grown.insert_hash(self.hash_key(get_key(slot - 1)), slot - 1)
+        self.table, self.mask = grown.table, grown.mask
+
+    def _position(self, key, get_key):
+        """Returns the table position holding key, or -1 if there is none"""
+        table, mask = self.table, self.mask
+        pos = self.hash_key(key) & mask
+        while True:
+            slot = table[pos]
+            if not slot:
+                return -1
+            if get_key(slot - 1) == key:
+                return pos
+            pos = (pos + 1) & mask
+
+    def delete(self, key, get_key):
+        """
+        Removes key and returns the index stored for it, or -1 if there is none.
+        Later entries of the probe run are shifted back so no tombstone is left.
+        """
+        hole = self._position(key, get_key)
+        if hole == -1:
+            return -1
+        table, mask = self.table, self.mask
+        idx = table[hole] - 1
+        pos = (hole + 1) & mask
+        while table[pos]:
+            home = self.hash_key(get_key(table[pos] - 1)) & mask
+            if (pos - home) & mask >= (pos - hole) & mask:
+                table[hole] = table[pos]
+                hole = pos
+            pos = (pos + 1) & mask
+        table[hole] = 0
+        self.counter -= 1
+        return idx
+
+    def find(self, key, get_key):
+        """
+        Returns the index stored for key, or -1 if there is none.
+        get_key(idx) must return the encoded suffix stored at idx.
+        """
+        pos = self.hash_key(key) & self.mask
+        while True:
+            slot = self.table[pos]
+            if not slot:
+                return -1
+            if get_key(slot - 1) == key:
+                return slot - 1
+            pos = (pos + 1) & self.mask
+
+    def find_many(self, keys, get_key):
+        """Yields the index stored for each key of an iterable, -1 for None keys"""
+        table, mask, hash_key = self.table, self.mask, self.hash_key
+        for key in keys:
+            if key is None:
+                yield -1
+                continue
+            pos = hash_key(key) & mask
+            while True:
+                slot = table[pos]
+                if not slot:
+                    yield -1
+                    break
+                if get_key(slot - 1) == key:
+                    yield slot - 1
+                    break
+                pos = (pos + 1) & mask
@@ -0,0 +1,107 @@
+"""MappedStorage class"""
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+from .DataStorage import ENCODING, ERRORS, DataStorage, empty_prefixes, join_prefix
+
+CHUNK_SIZE = 1 << 24
+SEP = os.linesep.encode(ENCODING)
+
+
+class MappedStorage(DataStorage):
+    """
+    Class to read Filelist data from an uncompressed filelist without loading it.
+
+    The file is memory-mapped and its line offsets are indexed in a single pass,
+    which also finds the directory shared by every line. Suffixes are decoded
+    from the map only when they are accessed. Duplicate lines are not removed.
+    """
+
+    in_memory = False
+    lookup = None
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, infile, prefixes=None):
+        self.prefixes = prefixes if prefixes is not None else empty_prefixes()
+        self.offsets = array("Q")
+        self.line_prefix = ""
+        self.counter = 0
+        self._skip = 0
+
+        with open(infile, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self.buffer = b""
+                return
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index()
+
+    def _index(self):
+        end = len(self.buffer)
+        while end > 0 and self.buffer[end - 1 : end].isspace():
+            end -= 1
+
+        common = None
+        pos = 0
+        while pos < end:
+            limit = min(pos + CHUNK_SIZE, end)
+            if limit < end:
+                newline = self.buffer.rfind(SEP, pos, limit)
+                if newline == -1:
+                    newline = self.buffer.find(SEP, limit, end)
+                limit = end if newline == -1 else newline
+            lines = self.buffer[pos:limit].split(SEP)
+            self.offsets.extend(
+                accumulate((len(line) + len(SEP) for line in lines[:-1]), initial=pos)
+            )
+            candidates = [min(lines), max(lines)]
+            if common is not None:
+                candidates.append(common)
+            common = os.path.commonprefix(candidates)
+            pos = limit + len(SEP)
+
+        self.counter = len(self.offsets)
+        self.offsets.append(end + len(SEP))
+        if common is not None:
+            self.line_prefix = os.path.dirname(common).decode(ENCODING, ERRORS)
+        self._skip = len(self.line_prefix.encode(ENCODING, ERRORS))
+
+    def is_abs(self):
+        """Returns true if the lines of the file are absolute paths"""
+        return self.counter > 0 and self.buffer[:1] == os.sep.encode(ENCODING)
+
+    def _decode(self, idx):
+        start = self.offsets[idx] + self._skip
+        line = self.buffer[start : self.offsets[idx + 1] - len(SEP)]
+        suffix = line.decode(ENCODING, ERRORS).rstrip()
+        if self._skip:
+            suffix = suffix.lstrip(os.sep)
+        return suffix
+
+    def suffix(self, idx):
+        return self._decode(self._check_index(idx))
+
+    def suffixes(self):
+        for idx in range(self.counter):
+            yield self._decode(idx)
+
+    def _find(self, value):
+        """Returns the line index of value, or -1 if it is not in the file"""
+        suffix = self.query_suffix(value)
+        if suffix is None or not self.counter:
+            return -1
+        for idx in (0, self.counter - 1):
+            if self._decode(idx) == suffix:
+                return idx
+        line = join_prefix(self.line_prefix, suffix).encode(ENCODING, ERRORS)
+        pos = self.buffer.find(SEP + line + SEP)
+        if pos == -1:
+            return -1
+        return bisect_right(self.offsets, pos + len(SEP)) - 1
+
+    def close(self):
+        """Releases the memory map"""
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
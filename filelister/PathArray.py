@@ -0,0 +1,250 @@
+"""
+PathArray class for vectorized bulk operations on stored suffixes
+
+Requires numpy, which is optional: HAS_NUMPY is False when it is missing, and
+Filelist then falls back to per-path Python loops with the same results.
+"""
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .DataStorage import ENCODING, ERRORS, DataStorage
+
+HAS_NUMPY = np is not None
+SEP = os.sep.encode(ENCODING)
+# paths joined per vectorized write when saving a text filelist, bounding the
+# temporary arrays join_lines builds
+SAVE_CHUNK = 1 << 14
+# suffixes are sorted as fixed-width bytes unless padding them to the longest
+# one takes more than MAX_PADDING times their total size
+MAX_PADDING = 8
+
+
+class PathArray:
+    """
+    Offset-encoded array of utf-8 suffixes.
+
+    data is a uint8 array of every suffix back to back, and suffix i spans
+    data[offsets[i]:offsets[i + 1]], the same layout as DataStorage. Masks,
+    orders and joins are computed with numpy instead of per-path loops.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_storage(cls, storage, start=0, stop=None):
+        """
+        Copies the suffixes start to stop of a storage, straight from its buffer
+        if in memory
+        """
+        if stop is None or stop > len(storage):
+            stop = len(storage)
+        if type(storage) is DataStorage:  # pylint: disable=unidiomatic-typecheck
+            storage.compact()
+            bounds = storage.offsets[start : stop + 1]
+            offsets = np.frombuffer(bounds, dtype=np.uint64).astype(np.int64)
+            data = np.frombuffer(storage.buffer[bounds[0] : bounds[-1]], dtype=np.uint8)
+            return cls(data, offsets - offsets[0])
+        return cls.from_suffixes(map(storage.suffix, range(start, stop)))
+
+    @classmethod
+    def from_suffixes(cls, suffixes):
+        """Builds a PathArray from an iterable of suffixes"""
+        encoded = [suffix.encode(ENCODING, ERRORS) for suffix in suffixes]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(suffix) for suffix in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def to_storage(self, prefixes=None):
+        """Returns a DataStorage of the suffixes, which must be unique"""
+        offsets = array("Q")
+        offsets.frombytes(self.offsets.astype(np.uint64).tobytes())
+        return DataStorage.from_buffer(self.data.tobytes(), offsets, prefixes)
+
+    def decode_all(self):
+        """Returns a list of every suffix, decoded in one pass"""
+        if not self:
+            return []
+        return self.join_lines("", "\0").decode(ENCODING, ERRORS).split("\0")
+
+    def lengths(self):
+        """Returns the byte length of every suffix"""
+        return np.diff(self.offsets)
+
+    def suffixes(self):
+        """Yields every suffix in order"""
+        yield from self.decode_all()
+
+    def take(self, indices):
+        """Returns a PathArray of the suffixes at indices, in that order"""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.offsets[:-1][indices]
+        lengths = self.lengths()[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.arange(offsets[-1], dtype=np.int64) + np.repeat(
+            starts - offsets[:-1], lengths
+        )
+        return PathArray(self.data[gather], offsets)
+
+    def compress(self, mask):
+        """Returns a PathArray of the suffixes where mask is True"""
+        return self.take(np.flatnonzero(mask))
+
+    def endswith(self, ending):
+        """Returns a mask of the suffixes ending with the bytes ending"""
+        ends = self.offsets[1:]
+        mask = self.lengths() >= len(ending)
+        if not self.data.size:
+            return mask
+        for pos, byte in enumerate(ending):
+            idx = np.clip(ends - len(ending) + pos, 0, len(self.data) - 1)
+            mask &= self.data[idx] == byte
+        return mask
+
+    def _splitext_candidates(self, ext):
+        """
+        Returns a mask of the suffixes ending with ext, and a mask of those
+        needing os.path.splitext to confirm, when the byte before ext is a dot,
+        a separator or the start of the suffix.
+        """
+        mask = self.endswith(ext)
+        if not self.data.size:
+            return mask, mask
+        before = self.offsets[1:] - len(ext) - 1
+        at_start = before < self.offsets[:-1]
+        prev = self.data[np.clip(before, 0, len(self.data) - 1)]
+        unsure = mask & (at_start | (prev == ord(".")) | (prev == SEP[0]))
+        return mask, unsure
+
+    def ext_mask(self, exts):
+        """
+        Returns a mask of the suffixes whose os.path.splitext extension is in exts.
+        Extensions of the form ".ext" are matched on the last bytes; anything
+        else, and ambiguous dotfile names, fall back to os.path.splitext.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        unsure = np.zeros(len(self), dtype=bool)
+        fallback = False
+        for ext in exts:
+            encoded = ext.encode(ENCODING, ERRORS)
+            if (
+                len(encoded) < 2
+                or not encoded.startswith(b".")
+                or b"." in encoded[1:]
+                or SEP in encoded
+            ):
+                fallback = True
+                continue
+            matched, ambiguous = self._splitext_candidates(encoded)
+            mask |= matched & ~ambiguous
+            unsure |= ambiguous
+        if fallback:
+            unsure[:] = True
+        exts = set(exts)
+        for idx in np.flatnonzero(unsure).tolist():
+            suffix = self.data[self.offsets[idx] : self.offsets[idx + 1]].tobytes()
+            mask[idx] = os.path.splitext(suffix.decode(ENCODING, ERRORS))[1] in exts
+        return mask
+
+    def _sort_keys(self):
+        """
+        Returns the suffixes as a fixed-width numpy bytes array, or as an
+        object array of bytes when a few long suffixes make padding too costly
+        """
+        lengths = self.lengths()
+        width = max(int(lengths.max()) if lengths.size else 0, 1)
+        if len(self) * width > MAX_PADDING * max(self.data.size, 1):
+            data = self.data.tobytes()
+            bounds = self.offsets.tolist()
+            keys = np.empty(len(self), dtype=object)
+            keys[:] = [data[start:end] for start, end in zip(bounds, bounds[1:])]
+            return keys
+        matrix = np.zeros(len(self) * width, dtype=np.uint8)
+        shift = np.arange(len(self), dtype=np.int64) * width - self.offsets[:-1]
+        gather = np.arange(self.data.size, dtype=np.int64) + np.repeat(shift, lengths)
+        matrix[gather] = self.data
+        return matrix.view(f"S{width}")
+
+    def argsort(self):
+        """Returns the indices that sort the suffixes by their utf-8 bytes"""
+        return np.argsort(self._sort_keys(), kind="stable")
+
+    def unique(self):
+        """Returns the sorted indices of the first occurrence of each suffix"""
+        _, first = np.unique(self._sort_keys(), return_index=True)
+        return np.sort(first)
+
+    def join_lines(self, prefix, linesep=os.linesep):
+        """
+        Returns the encoded paths join_prefix(prefix, suffix) separated by linesep
+        """
+        head = prefix.encode(ENCODING, ERRORS)
+        if head and not head.endswith(SEP):
+            head += SEP
+        head = np.frombuffer(head, dtype=np.uint8)
+        linesep = np.frombuffer(linesep.encode(ENCODING), dtype=np.uint8)
+        lengths = self.lengths()
+        if not lengths.size:
+            return b""
+
+        line_lengths = lengths + len(head) + len(linesep)
+        starts = np.zeros(len(self), dtype=np.int64)
+        np.cumsum(line_lengths[:-1], out=starts[1:])
+        if len(linesep) == 1:
+            out = np.full(int(line_lengths.sum()), linesep[0], dtype=np.uint8)
+        else:
+            out = np.empty(int(line_lengths.sum()), dtype=np.uint8)
+        if len(head):
+            out[(starts[:, None] + np.arange(len(head))).ravel()] = np.tile(
+                head, len(self)
+            )
+        out[
+            np.arange(len(self.data), dtype=np.int64)
+            + np.repeat(starts + len(head) - self.offsets[:-1], lengths)
+        ] = self.data
+        if len(linesep) > 1:
+            sep_starts = starts + len(head) + lengths
+            out[(sep_starts[:, None] + np.arange(len(linesep))).ravel()] = np.tile(
+                linesep, len(self)
+            )
+        return out[: len(out) - len(linesep)].tobytes()
+
+
+def write_lines(outfile, storage, prefix):
+    """
+    Writes the paths of a storage below prefix to outfile as a text filelist,
+    in vectorized joins of SAVE_CHUNK paths copied from the buffer. Returns
+    False without writing for a storage that is not in memory, and for
+    suffixes that are not valid utf-8, which a text filelist cannot hold.
+    """
+    # pylint: disable-next=unidiomatic-typecheck
+    if type(storage) is not DataStorage:
+        return False
+    storage.compact()
+    starts = range(0, len(storage), SAVE_CHUNK)
+    offsets = storage.offsets
+    try:
+        with memoryview(storage.buffer) as view:
+            for start in starts:
+                stop = min(start + SAVE_CHUNK, len(storage))
+                str(view[offsets[start] : offsets[stop]], ENCODING)
+    except UnicodeDecodeError:
+        return False
+    linesep = os.linesep.encode(ENCODING)
+    with open(outfile, "wb") as f:
+        for start in starts:
+            if start:
+                f.write(linesep)
+            paths = PathArray.from_storage(storage, start, start + SAVE_CHUNK)
+            f.write(paths.join_lines(prefix))
+    return True
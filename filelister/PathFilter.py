@@ -0,0 +1,219 @@
+"""
+PathFilter class for filtering paths while they stream into a Filelist
+
+A filter is compiled once: extensions into a set, fnmatch globs into one
+regex, include and exclude regexes into one alternation each. It is applied
+to paths as they are crawled, listed or read, before they reach
+DataStorage, so rejected paths are never encoded or stored. Name checks run
+before size and mtime checks, which stat the file.
+"""
+import fnmatch
+import os
+import re
+
+NAME_KEYS = ("exts", "globs", "include", "exclude")
+STAT_KEYS = ("min_size", "max_size", "modified_after", "modified_before")
+
+
+class PathFilter:
+    """
+    Keeps the paths that pass every check given.
+
+    exts: extensions to keep, such as ".jpg"
+    globs: fnmatch patterns, a path must match one of them
+    include: regexes, a path must contain a match of one of them
+    exclude: regexes, a path must not contain a match of any of them
+    min_size, max_size: bounds on the file size in bytes
+    modified_after, modified_before: bounds on the mtime, in seconds since the epoch
+
+    Patterns are matched against each path as its source lists it: relative
+    to the directory of a crawl, as given in a list, or as written in a saved
+    filelist. Filters combine with &, keeping the paths both keep.
+    """
+
+    def __init__(
+        self,
+        exts=None,
+        globs=None,
+        include=None,
+        exclude=None,
+        min_size=None,
+        max_size=None,
+        modified_after=None,
+        modified_before=None,
+    ):
+        spec = {
+            "exts": exts,
+            "globs": globs,
+            "include": include,
+            "exclude": exclude,
+            "min_size": min_size,
+            "max_size": max_size,
+            "modified_after": modified_after,
+            "modified_before": modified_before,
+        }
+        for key in NAME_KEYS:
+            if isinstance(spec[key], str):
+                spec[key] = [spec[key]]
+        spec = {
+            key: sorted(value) if key in NAME_KEYS else value
+            for key, value in spec.items()
+            if value is not None
+        }
+        self.specs = [spec] if spec else []
+        self._compile()
+
+    @classmethod
+    def from_specs(cls, specs):
+        """Returns the filter keeping the paths every spec, a dict of checks, keeps"""
+        path_filter = cls()
+        path_filter.specs = [dict(spec) for spec in specs or () if spec]
+        path_filter._compile()
+        return path_filter
+
+    def __and__(self, other):
+        if not isinstance(other, PathFilter):
+            return NotImplemented
+        return PathFilter.from_specs(self.specs + other.specs)
+
+    def __bool__(self):
+        return bool(self.specs)
+
+    def __repr__(self):
+        return f"PathFilter.from_specs({self.specs})"
+
+    def _compile(self):
+        checks = []
+        stat_specs = []
+        for spec in self.specs:
+            checks.extend(_name_checks(spec))
+            if any(key in spec for key in STAT_KEYS):
+                stat_specs.append(spec)
+        self._keep_name = _chain(checks)
+        self._stat_specs = stat_specs
+
+    def apply(self, paths, root=None, diagnostics=None):
+        """
+        Yields the paths the filter keeps, in order. Files are statted below
+        root, if given. Rejected paths are counted in diagnostics.
+        """
+        if not self.specs:
+            yield from paths
+            return
+        keep_name = self._keep_name
+        keep_stat = (
+            _stat_check(self._stat_specs, root) if self._stat_specs else _keep_all
+        )
+        record = diagnostics.record if diagnostics is not None else None
+        for path in paths:
+            if keep_name(path) and keep_stat(path):
+                yield path
+            elif record is not None:
+                record("rejected", path)
+
+    def __call__(self, path, root=None):
+        """Returns whether the filter keeps path"""
+        return next(self.apply((path,), root), None) is not None
+
+
+def build_filter(accepted_exts=None, path_filter=None):
+    """
+    Returns one PathFilter for the accepted_exts of a Filelist and a
+    PathFilter, or None if neither filters anything
+    """
+    if accepted_exts:
+        exts_filter = PathFilter(exts=list(accepted_exts))
+        path_filter = exts_filter & path_filter if path_filter else exts_filter
+    return path_filter or None
+
+
+def _keep_all(_path):
+    return True
+
+
+def _chain(checks):
+    """Returns a function keeping the paths every check keeps"""
+    if not checks:
+        return _keep_all
+    if len(checks) == 1:
+        return checks[0]
+
+    def keep(path):
+        for check in checks:
+            if not check(path):
+                return False
+        return True
+
+    return keep
+
+
+def _alternation(patterns):
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+def _name_checks(spec):
+    """Returns the checks of spec on the path string, cheapest first"""
+    checks = []
+    if "exts" in spec:
+        checks.append(_ext_check(frozenset(spec["exts"])))
+    if "globs" in spec:
+        match = _alternation(map(fnmatch.translate, spec["globs"])).match
+        checks.append(lambda path: match(path) is not None)
+    if "include" in spec:
+        search = _alternation(spec["include"]).search
+        checks.append(lambda path: search(path) is not None)
+    if "exclude" in spec:
+        excluded = _alternation(spec["exclude"]).search
+        checks.append(lambda path: excluded(path) is None)
+    return checks
+
+
+def _ext_check(exts):
+    """
+    Returns a function checking that os.path.splitext(path)[1] is in exts,
+    without calling it for extensions of one dot and a name
+    """
+    sep = os.sep
+    if not all(len(ext) > 1 and ext.rfind(".") == 0 and sep not in ext for ext in exts):
+        splitext = os.path.splitext
+        return lambda path: splitext(path)[1] in exts
+
+    def check(path):
+        dot = path.rfind(".")
+        if path[dot:] not in exts:
+            return False
+        # splitext takes no extension from a name of only leading dots
+        return path[path.rfind(sep, 0, dot) + 1 : dot].strip(".") != ""
+
+    return check
+
+
+def _stat_check(specs, root):
+    """
+    Returns a function checking the size and mtime of a path below root
+    against specs. Paths that cannot be statted are rejected.
+    """
+    min_size = max(
+        (spec["min_size"] for spec in specs if "min_size" in spec), default=0
+    )
+    max_size = min(
+        (spec["max_size"] for spec in specs if "max_size" in spec), default=float("inf")
+    )
+    after = max(
+        (spec["modified_after"] for spec in specs if "modified_after" in spec),
+        default=float("-inf"),
+    )
+    before = min(
+        (spec["modified_before"] for spec in specs if "modified_before" in spec),
+        default=float("inf"),
+    )
+    join = os.path.join
+
+    def keep(path):
+        try:
+            stat = os.stat(join(root, path) if root else path)
+        except OSError:
+            return False
+        return min_size <= stat.st_size <= max_size and after <= stat.st_mtime <= before
+
+    return keep
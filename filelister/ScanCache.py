@@ -0,0 +1,204 @@
+"""
+ScanCache class for sharing the crawl of a directory between processes
+
+Each cached crawl is a binary filelist of absolute paths saved with its scan
+state, so loading it is a memory-mapped read and validating it only stats
+the directories of the crawl, relisting those whose mtime changed. Entries
+are named by a hash of the root and the options of the crawl, so different
+filters of the same root are cached apart. An entry older than max_age is
+crawled again from scratch, and the least recently used entries are evicted
+once the cache grows past max_size bytes.
+
+Every entry has a lock file, held exclusively while the entry is loaded or
+built, so processes starting together wait for the first one to crawl and
+then load its result instead of all crawling at once. Locking uses fcntl
+and is skipped on platforms without it. Entries are written to a temporary
+file and moved into place, so a crash while writing never leaves a broken
+entry behind.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SUFFIX = ".flb"
+LOCK_SUFFIX = ".lock"
+TMP_SUFFIX = ".tmp"
+
+
+class ScanCache:
+    """
+    A directory of cached crawls.
+
+    directory: where entries are kept, created if needed
+    max_age: seconds after which an entry is crawled again, None for never
+    max_size: total bytes of entries kept, None for no limit
+    validate: whether a loaded entry is refreshed by statting its
+        directories; without it, an entry is trusted until max_age
+    """
+
+    def __init__(self, directory, max_age=None, max_size=None, validate=True):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_size = max_size
+        self.validate = validate
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return (
+            f"ScanCache({self.directory!r}, max_age={self.max_age}, "
+            f"max_size={self.max_size}, validate={self.validate})"
+        )
+
+    def entry_path(self, options):
+        """Returns the path of the entry cached for options, a JSON-able dict"""
+        key = json.dumps(options, sort_keys=True).encode("utf-8")
+        return os.path.join(self.directory, hashlib.sha256(key).hexdigest() + SUFFIX)
+
+    def fetch(self, options, load, build):
+        """
+        Loads or builds the entry for options while holding its lock.
+        load(path) reads an entry younger than max_age, returning false if it
+        is unusable; build(path) crawls and saves the entry through write().
+        Returns true on a cache hit.
+        """
+        path = self.entry_path(options)
+        with self._lock(path):
+            hit = self._fresh(path) and load(path)
+            if not hit:
+                build(path)
+            # the lock file's mtime records when the entry was last used
+            os.utime(path + LOCK_SUFFIX)
+        self.evict(keep=path)
+        return hit
+
+    def write(self, path, save):
+        """
+        Writes the entry at path by calling save with a temporary path in the
+        cache directory, then moving the file and its sidecars into place,
+        the entry itself last. Sidecars the new entry lacks are removed.
+        """
+        directory, stem = os.path.split(path)
+        # hidden, so entries() never lists a half written entry
+        fd, tmp = tempfile.mkstemp(suffix=TMP_SUFFIX, prefix="." + stem, dir=directory)
+        os.close(fd)
+        tmp_stem = os.path.basename(tmp)
+        try:
+            save(tmp)
+            sidecars = [
+                name[len(tmp_stem) :]
+                for name in os.listdir(directory)
+                if name.startswith(tmp_stem) and name != tmp_stem
+            ]
+            for name in os.listdir(directory):
+                sidecar = name[len(stem) :]
+                if name.startswith(stem) and sidecar not in ("", LOCK_SUFFIX):
+                    if sidecar not in sidecars:
+                        os.remove(os.path.join(directory, name))
+            for sidecar in sidecars:
+                os.replace(tmp + sidecar, path + sidecar)
+            os.replace(tmp, path)
+        finally:
+            for name in os.listdir(directory):
+                if name.startswith(tmp_stem):
+                    os.remove(os.path.join(directory, name))
+
+    def _fresh(self, path):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        return self.max_age is None or time.time() - mtime <= self.max_age
+
+    @contextmanager
+    def _lock(self, path, blocking=True):
+        """
+        Holds the lock of the entry at path, yielding false if blocking is
+        false and another process holds it
+        """
+        with open(path + LOCK_SUFFIX, "a+b") as f:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def entries(self):
+        """
+        Returns a list of (last used, size in bytes, path) of every entry,
+        least recently used first
+        """
+        sizes = {}
+        for name in os.listdir(self.directory):
+            pos = name.find(SUFFIX)
+            if pos < 0 or name.startswith(".") or name.endswith(LOCK_SUFFIX):
+                continue
+            stem = name[: pos + len(SUFFIX)]
+            try:
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            sizes[stem] = sizes.get(stem, 0) + size
+        found = []
+        for stem, size in sizes.items():
+            path = os.path.join(self.directory, stem)
+            try:
+                used = os.path.getmtime(path + LOCK_SUFFIX)
+            except OSError:
+                used = 0
+            found.append((used, size, path))
+        return sorted(found)
+
+    def size(self):
+        """Returns the total size in bytes of the entries"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the rest fit in
+        max_size. The entry at keep, and entries locked by another process,
+        are kept.
+        """
+        if self.max_size is None:
+            return
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            with self._lock(path, blocking=False) as locked:
+                if locked:
+                    self._remove(path)
+                    total -= size
+
+    def clear(self):
+        """Removes every entry"""
+        for _, _, path in self.entries():
+            with self._lock(path):
+                self._remove(path)
+
+    def _remove(self, path):
+        """Removes the entry at path and its sidecars, keeping its lock file"""
+        directory, stem = os.path.split(path)
+        for name in os.listdir(directory):
+            if name.startswith(stem) and not name.endswith(LOCK_SUFFIX):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,48 @@
+"""StorageView class"""
+
+
+class StorageView:
+    """
+    Lazy view of a slice of the paths in a storage.
+
+    Holds the parent storage, the range of its indices in the view, and
+    which paths it builds, "abs" or "rel". Nothing is copied: paths are built
+    from the parent when accessed, and slicing a view returns a view of the
+    same parent. A view reads the parent as it is at access time.
+    """
+
+    def __init__(self, storage, indices, kind):
+        self.storage = storage
+        self.indices = indices
+        self.kind = kind
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if self.kind == "abs":
+                return self.storage.abs_path(self.indices[key])
+            return self.storage.rel_path(self.indices[key])
+        if isinstance(key, slice):
+            return StorageView(self.storage, self.indices[key], self.kind)
+        raise TypeError(f"indices must be integers or slices, not {type(key)}")
+
+    def __iter__(self):
+        return self.storage.iter_paths(self.kind, self.indices)
+
+    def to_list(self):
+        """Returns the paths in the view as a list"""
+        return list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (StorageView, list, tuple)):
+            return len(self) == len(other) and all(
+                path == other_path for path, other_path in zip(self, other)
+            )
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"StorageView({self.to_list()})"
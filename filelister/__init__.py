@@ -1,3 +1,15 @@
+from .crawler import crawl
+from .BinaryStorage import BinaryStorage
+from .BlockStorage import BlockStorage
+from .BloomFilter import BloomFilter
 from .DataStorage import DataStorage
+from .Diagnostics import Diagnostics
+from .MappedStorage import MappedStorage
+from .PathArray import PathArray
+from .PathFilter import PathFilter
+from .ScanCache import ScanCache
+from .StorageView import StorageView
 from .Filelist import Filelist
-from .read_filelist import read_filelist
+from .read_filelist import iter_filelist, read_filelist
+from .diff import diff_filelists, write_diff
+from .sharding import stable_hash
@@ -0,0 +1,371 @@
+"""
+functions to write and read compressed filelists
+
+A stream-compressed filelist is the zlib dictionary (the Filelist prefix) on
+its own line, followed by a single zlib stream of comma-separated paths.
+
+A block-compressed filelist splits the suffixes into independently compressed
+blocks of a fixed number of paths, so blocks can be decompressed in parallel
+or on their own. Layout, little-endian:
+    header     magic, version, codec, flags, paths per block, count,
+               prefix size and the offset of the block index
+    prefix     utf-8 prefix shared by every entry, also used as the zdict
+    blocks     NUL-separated or front-coded utf-8 suffixes, compressed with
+               the codec named in the header
+    index      number of blocks + 1 uint64 file offsets of each block
+
+Front coding stores each suffix as the length it shares with the previous
+suffix in the block, the length of the rest, and the rest, with lengths as
+LEB128 varints. It can be followed by any registered codec or stored as is.
+
+Codecs are registered by name and by the id stored in the header: zlib, lzma
+and bz2 from the standard library, plus zstd and lz4 when zstandard and lz4
+are installed.
+"""
+
+import bz2
+import lzma
+import struct
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+
+from termcolor import colored
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from lz4 import frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+from .DataStorage import ENCODING, ERRORS
+
+CHUNK_SIZE = 1 << 20
+BLOCK_SIZE = 65536
+BLOCK_MAGIC = b"\x00FLZ"
+BLOCK_VERSION = 1
+BLOCK_HEADER = struct.Struct("<4sBBHIQQQ")
+BLOCK_SEP = b"\x00"
+FLAG_FRONT_CODED = 1
+
+
+class Codec(
+    namedtuple(
+        "Codec",
+        ["name", "codec_id", "compress", "decompress", "level", "levels"],
+        defaults=((),),
+    )
+):
+    """
+    A general-purpose compressor for blocks.
+    compress(data, level, zdict) and decompress(data, zdict) take bytes;
+    zdict is the Filelist prefix, which codecs may ignore. level is the
+    default level and levels the range of levels that can be asked for.
+    """
+
+
+# every known codec id, so files naming a codec that is not installed can say so
+CODEC_NAMES = {0: "zlib", 1: "none", 2: "lzma", 3: "bz2", 4: "zstd", 5: "lz4"}
+CODECS = {}
+
+
+def register_codec(codec):
+    """Makes codec available to save and read"""
+    CODEC_NAMES[codec.codec_id] = codec.name
+    CODECS[codec.name] = codec
+
+
+def _zlib_compress(data, level, zdict):
+    obj = zlib.compressobj(level=level, memLevel=9, zdict=zdict)
+    return obj.compress(data) + obj.flush()
+
+
+def _zlib_decompress(data, zdict):
+    obj = zlib.decompressobj(zdict=zdict)
+    return obj.decompress(data) + obj.flush()
+
+
+register_codec(Codec("zlib", 0, _zlib_compress, _zlib_decompress, 1, range(-1, 10)))
+register_codec(
+    Codec("none", 1, lambda data, level, zdict: data, lambda data, zdict: data, None)
+)
+register_codec(
+    Codec(
+        "lzma",
+        2,
+        lambda data, level, zdict: lzma.compress(data, preset=level),
+        lambda data, zdict: lzma.decompress(data),
+        6,
+        range(10),
+    )
+)
+register_codec(
+    Codec(
+        "bz2",
+        3,
+        lambda data, level, zdict: bz2.compress(data, compresslevel=level),
+        lambda data, zdict: bz2.decompress(data),
+        9,
+        range(1, 10),
+    )
+)
+if zstandard is not None:
+    register_codec(
+        Codec(
+            "zstd",
+            4,
+            lambda data, level, zdict: zstandard.ZstdCompressor(level=level).compress(
+                data
+            ),
+            lambda data, zdict: zstandard.ZstdDecompressor().decompress(data),
+            3,
+            range(-(1 << 17), zstandard.MAX_COMPRESSION_LEVEL + 1),
+        )
+    )
+if lz4_frame is not None:
+    register_codec(
+        Codec(
+            "lz4",
+            5,
+            lambda data, level, zdict: lz4_frame.compress(
+                data, compression_level=level
+            ),
+            lambda data, zdict: lz4_frame.decompress(data),
+            0,
+            range(lz4_frame.COMPRESSIONLEVEL_MAX + 1),
+        )
+    )
+
+
+def parse_codec(spec):
+    """
+    Returns the (codec, level, front_coded) triple for a compressed= value.
+    spec is True for zlib, or a string of the form "[front+]name[:level]",
+    such as "lzma", "zlib:9" or "front+zstd:19". "front" alone front-codes
+    without a compressor. Raises a ValueError for a level outside the
+    codec's levels.
+    """
+    if spec is True:
+        spec = "zlib"
+    if not isinstance(spec, str):
+        raise ValueError(colored(f"Unknown compression: {spec}", "red"))
+    front_coded = spec == "front" or spec.startswith("front+")
+    name = "none" if spec == "front" else spec[len("front+") :] if front_coded else spec
+    name, _, level = name.partition(":")
+    if name not in CODECS:
+        if name in CODEC_NAMES.values():
+            raise ValueError(
+                colored(
+                    f"Compression {name} requires a package that is not installed",
+                    "red",
+                )
+            )
+        raise ValueError(colored(f"Unknown compression: {spec}", "red"))
+    codec = CODECS[name]
+    if not level:
+        return codec, codec.level, front_coded
+    try:
+        level = int(level)
+    except ValueError as e:
+        raise ValueError(colored(f"Invalid compression level: {level}", "red")) from e
+    if level not in codec.levels:
+        raise ValueError(
+            colored(f"Invalid compression level for {name}: {level}", "red")
+        )
+    return codec, level, front_coded
+
+
+def get_codec(codec_id):
+    """Returns the registered codec stored as codec_id in a file header"""
+    name = CODEC_NAMES.get(codec_id)
+    if name is None:
+        raise ValueError(f"Unknown compression codec id: {codec_id}")
+    if name not in CODECS:
+        raise ValueError(f"Compression {name} requires a package that is not installed")
+    return CODECS[name]
+
+
+def write_compressed(f, paths, zdict, chunk_size=CHUNK_SIZE):
+    """
+    Compresses paths into the binary file object f.
+    Paths are fed to the compressor in chunks of about chunk_size bytes,
+    so memory use does not grow with the number of paths.
+    """
+    zdict = zdict.encode(ENCODING, ERRORS)
+    obj = zlib.compressobj(level=1, memLevel=9, zdict=zdict)
+    f.write(zdict + b"\n")
+
+    chunk = []
+    chunk_len = 0
+    first = True
+    for path in paths:
+        path = path.encode(ENCODING, ERRORS)
+        if not first:
+            chunk.append(b",")
+        first = False
+        chunk.append(path)
+        chunk_len += len(path) + 1
+        if chunk_len >= chunk_size:
+            f.write(obj.compress(b"".join(chunk)))
+            chunk = []
+            chunk_len = 0
+    f.write(obj.compress(b"".join(chunk)))
+    f.write(obj.flush())
+
+
+def iter_compressed(infile, chunk_size=CHUNK_SIZE):
+    """
+    Yields the paths of a compressed filelist one at a time.
+    The file is read, and decompressed, at most chunk_size bytes at a time.
+    """
+    with open(infile, "rb") as f:
+        zdict = f.readline().strip()
+        obj = zlib.decompressobj(zdict=zdict)
+        remainder = b""
+        empty = True
+        while True:
+            chunk = obj.unconsumed_tail or f.read(chunk_size)
+            if not chunk:
+                break
+            remainder += obj.decompress(chunk, chunk_size)
+            *entries, remainder = remainder.split(b",")
+            for entry in entries:
+                empty = False
+                yield entry.decode(ENCODING, ERRORS)
+        remainder += obj.flush()
+        if remainder or not empty:
+            for entry in remainder.split(b","):
+                yield entry.decode(ENCODING, ERRORS)
+
+
+def is_block_compressed(infile):
+    """Returns True if infile starts with the block-compressed magic"""
+    with open(infile, "rb") as f:
+        return f.read(len(BLOCK_MAGIC)) == BLOCK_MAGIC
+
+
+def _shared_len(prev, curr):
+    """Returns the length of the common prefix of two byte strings"""
+    low, high = 0, min(len(prev), len(curr))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if prev[:mid] == curr[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = data[pos]
+    pos += 1
+    if value < 0x80:
+        return value, pos
+    value &= 0x7F
+    shift = 7
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def front_encode(suffixes):
+    """Front-codes a list of encoded suffixes"""
+    out = bytearray()
+    prev = b""
+    for suffix in suffixes:
+        shared = _shared_len(prev, suffix)
+        _write_varint(out, shared)
+        _write_varint(out, len(suffix) - shared)
+        out += suffix[shared:]
+        prev = suffix
+    return bytes(out)
+
+
+def front_decode(data):
+    """Returns the encoded suffixes of front-coded data"""
+    suffixes = []
+    prev = b""
+    pos = 0
+    while pos < len(data):
+        shared, pos = _read_varint(data, pos)
+        length, pos = _read_varint(data, pos)
+        prev = prev[:shared] + data[pos : pos + length]
+        pos += length
+        suffixes.append(prev)
+    return suffixes
+
+
+def compress_block(suffixes, zdict, codec=CODECS["zlib"], level=1, front_coded=False):
+    """Compresses a list of encoded suffixes into one independent block"""
+    data = front_encode(suffixes) if front_coded else BLOCK_SEP.join(suffixes)
+    return codec.compress(data, level, zdict)
+
+
+def decompress_block(data, zdict, codec=CODECS["zlib"], front_coded=False):
+    """Returns the encoded suffixes of one compressed block"""
+    data = codec.decompress(data, zdict)
+    if front_coded:
+        return front_decode(data)
+    return data.split(BLOCK_SEP) if data else [b""]
+
+
+def write_blocks(f, prefix, suffixes, block_size=BLOCK_SIZE, codec=True):
+    """
+    Writes suffixes sharing prefix to the seekable binary file object f
+    as a block-compressed filelist of block_size paths per block.
+    codec is a compressed= value accepted by parse_codec.
+    Only one block and the block offsets are held in memory.
+    """
+    codec, level, front_coded = parse_codec(codec)
+    zdict = prefix.encode(ENCODING, ERRORS)
+    f.write(bytes(BLOCK_HEADER.size))
+    f.write(zdict)
+    offsets = array("Q", [f.tell()])
+
+    count = 0
+    block = []
+    for suffix in suffixes:
+        block.append(suffix.encode(ENCODING, ERRORS))
+        if len(block) == block_size:
+            f.write(compress_block(block, zdict, codec, level, front_coded))
+            offsets.append(f.tell())
+            count += len(block)
+            block = []
+    if block:
+        f.write(compress_block(block, zdict, codec, level, front_coded))
+        offsets.append(f.tell())
+        count += len(block)
+
+    index_offset = f.tell()
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    f.write(offsets.tobytes())
+    f.seek(0)
+    f.write(
+        BLOCK_HEADER.pack(
+            BLOCK_MAGIC,
+            BLOCK_VERSION,
+            codec.codec_id,
+            FLAG_FRONT_CODED if front_coded else 0,
+            block_size,
+            count,
+            len(zdict),
+            index_offset,
+        )
+    )
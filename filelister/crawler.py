@@ -0,0 +1,196 @@
+"""
+functions to crawl directories for Filelists
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .metadata import stat_row
+
+# filesystems such as FAT store mtimes with a 2 second resolution
+RACY_NS = 2 * 10**9
+
+
+def _make_pruner(prune):
+    if prune is None:
+        return None
+    if callable(prune):
+        return prune
+    names = set(prune)
+    return lambda entry: entry.name in names
+
+
+def root_prefix(root):
+    """
+    Returns root without trailing separators, as used for a Filelist prefix
+    """
+    stripped = root.rstrip(os.sep)
+    return stripped if stripped else root[:1]
+
+
+def scan_dir(root, rel_dir, stat=False):
+    """
+    Lists a single directory below root.
+    Returns its mtime in nanoseconds, the file suffixes, the DirEntry
+    objects of its subdirectories, and with stat=True the (size, mtime,
+    inode) of each file from its DirEntry, else None. The mtime is read
+    before listing, so changes made while listing show up as a newer mtime.
+    It is None if the directory cannot be statted or listed.
+    """
+    path = os.path.join(root, rel_dir) if rel_dir else root
+    files = []
+    subdirs = []
+    rows = [] if stat else None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, files, subdirs, rows
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry)
+                    continue
+                files.append(rel_dir + os.sep + entry.name if rel_dir else entry.name)
+                if stat:
+                    rows.append(stat_row(entry))
+    except OSError:
+        # a listing that failed is not complete, so its mtime must not be
+        # recorded
+        mtime = None
+    return mtime, files, subdirs, rows
+
+
+def _children(rel_dir, subdirs, pruner):
+    return [
+        rel_dir + os.sep + entry.name if rel_dir else entry.name
+        for entry in subdirs
+        if pruner is None or not pruner(entry)
+    ]
+
+
+def crawl(root, prune=None, workers=None):
+    """
+    Streams every file below root using os.scandir.
+    Yields paths relative to root, with each directory's files listed before
+    its subdirectories are visited, matching the order of os.walk.
+    prune may be a collection of directory names or a callable taking an
+    os.DirEntry; matching directories are not descended into.
+    workers > 1 lists directories concurrently on a thread pool; the output
+    order is the same as a single-threaded crawl.
+    Symlinked directories are not followed.
+    """
+    for _, _, files in crawl_dirs(root, prune, workers):
+        yield from files
+
+
+def crawl_dirs(root, prune=None, workers=None, stat=False):
+    """
+    Streams every directory below root in the order crawl visits them.
+    Yields the directory relative to root ("" for root), its mtime in
+    nanoseconds and the suffixes of its files, plus with stat=True the
+    (size, mtime, inode) of each file. Takes the same arguments as crawl.
+    """
+    pruner = _make_pruner(prune)
+
+    def visit(rel_dir):
+        mtime, files, subdirs, rows = scan_dir(root, rel_dir, stat)
+        return (mtime, files, rows), _children(rel_dir, subdirs, pruner)
+
+    for rel_dir, (mtime, files, rows) in _walk(visit, workers):
+        if stat:
+            yield rel_dir, mtime, files, rows
+        else:
+            yield rel_dir, mtime, files
+
+
+def recrawl_dirs(root, dirs, time_ns, prune=None, workers=None, stat=False):
+    """
+    Walks root like crawl_dirs, reusing what a previous crawl recorded.
+    dirs maps each directory crawled at time_ns to its mtime, in crawl order.
+    A directory whose mtime is unchanged has the same files and subdirectories,
+    so it is only stat'ed and yielded with files None. Other directories are
+    listed again, and prune only applies to their subdirectories.
+    Directories modified within RACY_NS of the previous crawl are always
+    listed, since a change in the same timestamp tick would not show up.
+    Directories recorded without an mtime could not be read and are listed
+    again.
+    With stat=True, listed directories also yield the (size, mtime, inode)
+    of each file, and unchanged ones None.
+    """
+    pruner = _make_pruner(prune)
+    children = {}
+    for rel_dir in dirs:
+        if rel_dir:
+            children.setdefault(os.path.dirname(rel_dir), []).append(rel_dir)
+
+    def visit(rel_dir):
+        recorded = dirs.get(rel_dir)
+        if recorded is not None and recorded < time_ns - RACY_NS:
+            try:
+                mtime = os.stat(os.path.join(root, rel_dir) if rel_dir else root)
+                if mtime.st_mtime_ns == recorded:
+                    return (recorded, None, None), children.get(rel_dir, [])
+            except OSError:
+                pass
+        mtime, files, subdirs, rows = scan_dir(root, rel_dir, stat)
+        return (mtime, files, rows), _children(rel_dir, subdirs, pruner)
+
+    for rel_dir, (mtime, files, rows) in _walk(visit, workers):
+        if stat:
+            yield rel_dir, mtime, files, rows
+        else:
+            yield rel_dir, mtime, files
+
+
+def _walk(visit, workers=None):
+    """
+    Depth-first walk from the root directory "".
+    visit(rel_dir) returns a result and the directories to descend into, in
+    order. Yields (rel_dir, result) in os.walk order.
+    """
+    if workers is not None and workers > 1:
+        yield from _parallel_walk(visit, workers)
+        return
+
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        result, children = visit(rel_dir)
+        yield rel_dir, result
+        stack.extend(reversed(children))
+
+
+def _parallel_walk(visit, workers):
+    """
+    Depth-first walk where the directories next in line are visited ahead of
+    time on a thread pool. Results are consumed in stack order, so the merged
+    output is deterministic regardless of which visit finishes first.
+    """
+    lookahead = workers * 4
+    stack = [["", None]]  # [rel_dir, future]
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while stack:
+            in_flight = 0
+            for item in reversed(stack):
+                if in_flight >= lookahead:
+                    break
+                if item[1] is None:
+                    item[1] = pool.submit(visit, item[0])
+                in_flight += 1
+
+            rel_dir, future = stack.pop()
+            result, children = future.result()
+            yield rel_dir, result
+            stack.extend([child, None] for child in reversed(children))
+    finally:
+        for _, future in stack:
+            if future is not None:
+                future.cancel()
+        pool.shutdown(wait=True)
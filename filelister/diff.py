@@ -0,0 +1,170 @@
+"""
+functions to diff saved filelists that are larger than memory
+
+Each filelist is streamed through iter_filelist and external-sorted: paths
+are collected until they reach the memory cap, sorted, and spilled to a
+temporary run file, then the runs are merged with heapq.merge. The two sorted
+streams are walked side by side to find removed, added and common paths.
+"""
+
+import heapq
+import os
+import sys
+import tempfile
+
+from .DataStorage import ENCODING, ERRORS
+from .read_filelist import iter_filelist
+
+MEMORY_CAP = 256 << 20
+RECORD_SEP = b"\0"
+MAX_RUNS = 256
+MIN_READ_SIZE = 1 << 16
+
+
+def _spill(keys, run_dir, run_id):
+    """Writes sorted encoded paths to a run file and returns its path"""
+    run = os.path.join(run_dir, f"run_{run_id}")
+    with open(run, "wb") as f:
+        f.writelines(key + RECORD_SEP for key in keys)
+    return run
+
+
+def _read_run(run, read_size):
+    """Yields the encoded paths of a run file, read read_size bytes at a time"""
+    with open(run, "rb") as f:
+        remainder = b""
+        while True:
+            chunk = f.read(read_size)
+            if not chunk:
+                break
+            *keys, remainder = (remainder + chunk).split(RECORD_SEP)
+            yield from keys
+
+
+def external_sort(paths, memory_cap=MEMORY_CAP, tmp_dir=None):
+    """
+    Yields the unique paths of an iterable as sorted utf-8 bytes.
+    About memory_cap bytes of paths are held before a sorted run is spilled
+    to a temporary directory in tmp_dir, which is removed when the generator
+    finishes or is closed.
+    """
+    with tempfile.TemporaryDirectory(prefix="filelister_sort_", dir=tmp_dir) as run_dir:
+        runs = []
+        keys = []
+        size = 0
+        for path in paths:
+            key = path.encode(ENCODING, ERRORS)
+            keys.append(key)
+            size += sys.getsizeof(key) + 8
+            if size >= memory_cap:
+                keys.sort()
+                runs.append(_spill(keys, run_dir, len(runs)))
+                keys = []
+                size = 0
+        keys.sort()
+
+        if runs:
+            if keys:
+                runs.append(_spill(keys, run_dir, len(runs)))
+                keys = []
+            while len(runs) > MAX_RUNS:
+                group, runs = runs[:MAX_RUNS], runs[MAX_RUNS:]
+                merged = heapq.merge(*(_read_run(run, MIN_READ_SIZE) for run in group))
+                runs.append(_spill(merged, run_dir, f"merged_{len(runs)}"))
+                for run in group:
+                    os.remove(run)
+            # split records take about three times their size in bytes objects
+            read_size = max(memory_cap // (4 * len(runs)), MIN_READ_SIZE)
+            keys = heapq.merge(*(_read_run(run, read_size) for run in runs))
+
+        prev = None
+        for key in keys:
+            if key != prev:
+                yield key
+                prev = key
+
+
+def merge_diff(old_keys, new_keys):
+    """
+    Walks two sorted streams of unique keys and yields ("removed", key) for
+    keys only in old_keys, ("added", key) for keys only in new_keys and
+    ("common", key) for keys in both, in sorted order.
+    """
+    old_keys, new_keys = iter(old_keys), iter(new_keys)
+    old = next(old_keys, None)
+    new = next(new_keys, None)
+    while old is not None and new is not None:
+        if old < new:
+            yield "removed", old
+            old = next(old_keys, None)
+        elif new < old:
+            yield "added", new
+            new = next(new_keys, None)
+        else:
+            yield "common", old
+            old = next(old_keys, None)
+            new = next(new_keys, None)
+    while old is not None:
+        yield "removed", old
+        old = next(old_keys, None)
+    while new is not None:
+        yield "added", new
+        new = next(new_keys, None)
+
+
+def diff_filelists(old, new, memory_cap=MEMORY_CAP, tmp_dir=None, compressed=False):
+    """
+    Yields (status, path) for every path of the saved filelists old and new,
+    in sorted order, where status is "removed", "added" or "common".
+    Paths are compared as absolute paths, and each filelist is sorted with
+    half of memory_cap bytes, spilling runs to temporary files in tmp_dir.
+    compressed is passed on for headerless stream-compressed filelists.
+    """
+    sorts = [
+        external_sort(iter_filelist(infile, compressed), memory_cap // 2, tmp_dir)
+        for infile in (old, new)
+    ]
+    try:
+        for status, key in merge_diff(*sorts):
+            yield status, key.decode(ENCODING, ERRORS)
+    finally:
+        for sort in sorts:
+            sort.close()
+
+
+def write_diff(
+    old,
+    new,
+    added=None,
+    removed=None,
+    common=None,
+    memory_cap=MEMORY_CAP,
+    tmp_dir=None,
+    compressed=False,
+):
+    """
+    Diffs the saved filelists old and new, writing the added, removed and
+    common paths to uncompressed absolute filelists at the given paths.
+    Streams that are not given a path are skipped.
+    Returns the number of added, removed and common paths.
+    """
+    outfiles = {"added": added, "removed": removed, "common": common}
+    counts = dict.fromkeys(outfiles, 0)
+    sep = os.linesep.encode(ENCODING)
+    handles = {
+        status: open(outfile, "wb")  # pylint: disable=consider-using-with
+        for status, outfile in outfiles.items()
+        if outfile is not None
+    }
+    try:
+        for status, path in diff_filelists(old, new, memory_cap, tmp_dir, compressed):
+            handle = handles.get(status)
+            if handle is not None:
+                if counts[status]:
+                    handle.write(sep)
+                handle.write(path.encode(ENCODING, ERRORS))
+            counts[status] += 1
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return counts["added"], counts["removed"], counts["common"]
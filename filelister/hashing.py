@@ -0,0 +1,98 @@
+"""
+functions to hash the contents of the files of a Filelist
+
+Files are read in large chunks into one reused buffer per thread, and hashed
+on a thread pool, since hashlib releases the GIL while it digests. Digests
+are cached by (algorithm, path, size, mtime), so a file that has not changed
+since it was last hashed is not read again. A cache holds at most MAX_CACHED
+digests, dropping the least recently used first, so digests of files that
+changed or left the Filelist do not pile up.
+"""
+
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import local
+
+DEFAULT_ALGO = "blake2b"
+CHUNK_SIZE = 1 << 20
+MAX_CACHED = 1 << 18
+
+
+def check_algo(algo):
+    """Raises a ValueError unless algo is a hashlib algorithm of fixed digest size"""
+    try:
+        digest_size = hashlib.new(algo).digest_size
+    except (TypeError, ValueError):
+        digest_size = 0
+    if not digest_size:
+        raise ValueError(f"Unsupported hash algorithm: {algo}")
+
+
+def hash_file(path, algo=DEFAULT_ALGO, buffer=None):
+    """
+    Returns the digest of the contents of path, read in chunks into buffer,
+    a writable bytes-like object of CHUNK_SIZE bytes if not given
+    """
+    if buffer is None:
+        buffer = bytearray(CHUNK_SIZE)
+    hasher = hashlib.new(algo)
+    with memoryview(buffer) as view, open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(view)
+            if not size:
+                break
+            hasher.update(view[:size])
+    return hasher.digest()
+
+
+def hash_files(
+    paths, algo=DEFAULT_ALGO, workers=None, cache=None, max_cached=MAX_CACHED
+):
+    """
+    Yields the digest of each of paths in order, or None for a file that
+    cannot be read. workers > 1 stats and hashes files ahead of time on a
+    thread pool. cache, a dict kept in least recently used order, maps
+    (algo, path, size, mtime) to digests, and is read and updated down to
+    max_cached entries; every file is statted first, so a file changed since
+    it was cached is hashed again.
+    """
+    if cache is None:
+        cache = {}
+    buffers = local()
+
+    def digest(path):
+        try:
+            stat = os.stat(path)
+            key = (algo, path, stat.st_size, stat.st_mtime_ns)
+            found = cache.get(key)
+            if found is None:
+                if not hasattr(buffers, "buffer"):
+                    buffers.buffer = bytearray(CHUNK_SIZE)
+                found = hash_file(path, algo, buffers.buffer)
+            return key, found
+        except OSError:
+            return None, None
+
+    def store(key, found):
+        if key is not None and found is not None:
+            cache.pop(key, None)
+            cache[key] = found
+            while len(cache) > max_cached:
+                del cache[next(iter(cache))]
+        return found
+
+    if not workers or workers <= 1:
+        for path in paths:
+            yield store(*digest(path))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(digest, path))
+            if len(pending) >= 4 * workers:
+                yield store(*pending.popleft().result())
+        while pending:
+            yield store(*pending.popleft().result())
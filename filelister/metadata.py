@@ -0,0 +1,177 @@
+"""
+functions to hold, persist and load stat metadata columns of a Filelist
+
+Metadata is held as one array per column, parallel to the slots of a
+DataStorage: the size in bytes, the mtime in nanoseconds and the inode of
+every file, taken from the os.DirEntry objects of a crawl. It is saved next
+to a saved filelist, for every format, keyed on the file it describes, and
+queried by the Filelist methods column, total_size, newer_than and sorted_by.
+
+Layout of the sidecar, little-endian:
+    header     magic, version, count, and the size of the filelist it was
+               saved with
+    columns    count int64 or uint64 values per column, in COLUMNS order
+"""
+
+import os
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS = (("size", "Q"), ("mtime", "q"), ("inode", "Q"))
+MISSING = (0, 0, 0)
+MAGIC = b"\x00FLS"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xQQ")
+SUFFIX = ".meta"
+
+
+def new_columns():
+    """Returns empty metadata columns"""
+    return {name: array(typecode) for name, typecode in COLUMNS}
+
+
+def stat_row(entry):
+    """
+    Returns the size, mtime and inode of an os.DirEntry, or of a broken
+    symlink itself, or MISSING if it cannot be statted
+    """
+    try:
+        try:
+            stat = entry.stat()
+        except OSError:
+            stat = entry.stat(follow_symlinks=False)
+    except OSError:
+        return MISSING
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def stat_path(path):
+    """Returns the size, mtime and inode of path, or MISSING"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return MISSING
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def append_rows(columns, rows):
+    """Appends an iterable of (size, mtime, inode) rows to columns"""
+    for (name, _), values in zip(COLUMNS, zip(*rows)):
+        columns[name].extend(values)
+
+
+def kept_rows(files, rows, kept):
+    """
+    Returns the rows of the files in kept, a subsequence of files, where
+    rows holds a row per file
+    """
+    if kept is files:
+        return rows
+    listed = iter(zip(files, rows))
+    found = []
+    for suffix in kept:
+        for name, row in listed:
+            if name == suffix:
+                found.append(row)
+                break
+    return found
+
+
+def storage_column(storage, name):
+    """
+    Returns the size, mtime (in nanoseconds) or inode of every path of a
+    storage, or its digests for "digest", in order. Raises a ValueError if
+    the storage does not hold them.
+    """
+    if name == "digest":
+        if storage.digests is None:
+            raise ValueError("Filelist has no digests, call compute_hashes()")
+    elif storage.metadata is None:
+        raise ValueError("Filelist has no metadata, build it with metadata=True")
+    elif name not in dict(COLUMNS):
+        raise ValueError(f"Unknown metadata column: {name}")
+    return storage.column(name)
+
+
+def newer_indices(mtimes, timestamp):
+    """
+    Returns the indices of the mtimes, in nanoseconds, after timestamp, in
+    seconds since the epoch
+    """
+    threshold = int(timestamp * 10**9)
+    return [idx for idx, mtime in enumerate(mtimes) if mtime > threshold]
+
+
+def stable_order(values, reverse=False):
+    """Returns the indices ordering values, ties keeping their order"""
+    if np is None:
+        return sorted(range(len(values)), key=values.__getitem__, reverse=reverse)
+    if reverse:
+        # the stable order of the reversed values, read backwards, keeps ties
+        # in their original order
+        flipped = np.argsort(np.asarray(values)[::-1], kind="stable")[::-1]
+        return (len(values) - 1 - flipped).tolist()
+    return np.argsort(np.asarray(values), kind="stable").tolist()
+
+
+def metadata_path(outfile):
+    """Returns the path of the metadata saved next to outfile"""
+    return outfile + SUFFIX
+
+
+def save_metadata(outfile, columns):
+    """
+    Saves metadata columns next to outfile, which must already be written,
+    since its size is recorded.
+    """
+    count = len(columns[COLUMNS[0][0]])
+    with open(metadata_path(outfile), "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, os.path.getsize(outfile)))
+        for name, typecode in COLUMNS:
+            values = columns[name]
+            if sys.byteorder == "big":
+                values = array(typecode, values)
+                values.byteswap()
+            f.write(values.tobytes())
+
+
+def load_metadata(infile, count=None):
+    """
+    Returns the metadata columns saved next to infile, or None if there are
+    none or they were not saved with the count paths currently in infile.
+    count=None takes the count saved with the columns.
+    """
+    try:
+        with open(metadata_path(infile), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, saved_count, source_size = HEADER.unpack_from(data)
+    if count is None:
+        count = saved_count
+    if (
+        len(data) != HEADER.size + 8 * len(COLUMNS) * count
+        or magic != MAGIC
+        or version != VERSION
+        or saved_count != count
+        or source_size != os.path.getsize(infile)
+    ):
+        return None
+    columns = {}
+    pos = HEADER.size
+    for name, typecode in COLUMNS:
+        values = array(typecode)
+        values.frombytes(data[pos : pos + 8 * count])
+        if sys.byteorder == "big":
+            values.byteswap()
+        columns[name] = values
+        pos += 8 * count
+    return columns
@@ -3,64 +3,254 @@ functions to read filelists from text file and store in Filelist class
 """
 
 import os
-import zlib
+from array import array
 
 from termcolor import colored
 
+from .BinaryStorage import BinaryStorage, is_binary
+from .BlockStorage import BlockStorage
+from .BloomFilter import load_bloom
+from .compression import is_block_compressed, iter_compressed
+from .DataStorage import ENCODING, ERRORS, DataStorage, join_prefix
+from .Diagnostics import Diagnostics
 from .Filelist import Filelist
+from .MappedStorage import MappedStorage
+from .metadata import COLUMNS, load_metadata
+from .scan_state import load_scan_state
 
 
-def read_filelist(infile, compressed=False):
+def read_filelist(infile, compressed=False, lazy=False, workers=None, path_filter=None):
     """
-    reads filelist from a .txt or .zz file
-    run with relative=False and validate=False to improve runtime
+    reads filelist from a .txt, .zz or binary .flb file
+    binary and compressed filelists are detected from their header; compressed
+    is only needed for headerless stream-compressed files not named .zz
+    lazy=True only reads and decodes paths when they are accessed, for
+    uncompressed, binary and block-compressed filelists
+    workers sets the number of threads decompressing a block-compressed filelist
+    a scan state saved next to infile is loaded, so the Filelist can be refreshed
+    a Bloom filter saved next to infile is consulted by lazy membership tests
+    stat metadata saved next to infile is loaded with the paths
+    path_filter, a PathFilter, drops paths while they are read, matching them
+    as they are written in infile; it cannot be combined with lazy=True
+    the metadata of the paths a path_filter keeps is loaded, but the scan
+    state is not, since refreshing from it would bring back dropped paths
     """
 
     try:
-        check_infile(infile)
-        if compressed:
-            data = read_compressed(infile)
+        rows = [] if path_filter else None
+        storage, curr = _read(infile, compressed, lazy, workers, path_filter, rows)
+        count = len(storage)
+        scan = None
+        if rows is None:
+            scan = load_scan_state(infile, count)
+            storage.metadata = load_metadata(infile, count)
         else:
-            data = read_uncompressed(infile)
-        if data[0][0] == "/":
-            data = [fpath.rstrip() for fpath in data]
-        else:
-            dirname = os.path.dirname(infile)
-            in_comm_pfx = os.path.dirname(os.path.commonprefix(data))
-            out_comm_pfx = os.path.relpath(
-                os.path.abspath(os.path.join(dirname, in_comm_pfx)),
-                start=os.getcwd(),
-            )
-            if out_comm_pfx == ".":
-                out_comm_pfx = ""
-            if not in_comm_pfx and out_comm_pfx:
-
-                data = [
-                    (out_comm_pfx + "/" + fpath[len(in_comm_pfx) :]).rstrip()
-                    for fpath in data
-                ]
-            data = [
-                (out_comm_pfx + fpath[len(in_comm_pfx) :]).rstrip() for fpath in data
-            ]
-        return Filelist(data)
+            storage.metadata = _kept_metadata(load_metadata(infile), rows, count)
+        if lazy:
+            storage.bloom = load_bloom(infile, count)
+        return Filelist.from_storage(storage, curr, scan)
 
     except Exception as e:
         raise e
 
 
+def _read(infile, compressed, lazy, workers, path_filter, rows):
+    """Returns the storage read from infile and the Filelist prefix of its paths"""
+    path_filter = path_filter or None
+    check_infile(infile)
+    if lazy and path_filter is not None:
+        raise ValueError(
+            colored("a path_filter cannot be applied to a lazily read filelist", "red")
+        )
+    if is_binary(infile):
+        return read_binary(infile, lazy, path_filter, rows)
+    if is_block_compressed(infile):
+        return read_blocks(infile, lazy, workers, path_filter, rows)
+    if not compressed and os.path.splitext(infile)[1] != ".zz":
+        return read_mapped(infile, lazy, path_filter, rows)
+    if lazy:
+        raise ValueError(
+            colored(
+                "lazy reading requires an uncompressed, binary or "
+                "block-compressed filelist",
+                "red",
+            )
+        )
+    return read_streamed(infile, lambda: iter_compressed(infile), path_filter, rows)
+
+
+def iter_filelist(infile, compressed=False):
+    """
+    yields the absolute paths of a saved filelist one at a time, in file order
+    Relative paths are resolved against the filelist's location. Memory use
+    does not grow with the size of the filelist.
+    """
+    check_infile(infile)
+    base = os.path.dirname(os.path.abspath(infile))
+
+    def resolve(path):
+        if path.startswith(os.sep):
+            return path
+        return os.path.normpath(os.path.join(base, path))
+
+    if is_binary(infile) or is_block_compressed(infile):
+        storage = BinaryStorage(infile) if is_binary(infile) else BlockStorage(infile)
+        try:
+            prefix = resolve(storage.line_prefix)
+            for suffix in storage.suffixes():
+                yield join_prefix(prefix, suffix)
+        finally:
+            storage.close()
+    elif compressed or os.path.splitext(infile)[1] == ".zz":
+        for path in iter_compressed(infile):
+            yield resolve(path)
+    else:
+        with open(infile, "rb") as f:
+            for line in f:
+                path = line.rstrip().decode(ENCODING, ERRORS)
+                if path:
+                    yield resolve(path)
+
+
+def read_mapped(infile, lazy=False, path_filter=None, rows=None):
+    """
+    reads an uncompressed filelist through a memory map, returning its storage
+    and the Filelist prefix of its paths
+    lazy=False copies the suffixes into a DataStorage and releases the map
+    """
+    storage = MappedStorage(infile)
+    return _from_lazy_storage(infile, storage, lazy, path_filter, rows)
+
+
+def read_binary(infile, lazy=False, path_filter=None, rows=None):
+    """
+    reads a binary filelist through a memory map, returning its storage and
+    the Filelist prefix of its paths
+    lazy=False copies the suffixes into a DataStorage and releases the map
+    """
+    storage = BinaryStorage(infile)
+    return _from_lazy_storage(infile, storage, lazy, path_filter, rows)
+
+
+def read_blocks(infile, lazy=False, workers=None, path_filter=None, rows=None):
+    """
+    reads a block-compressed filelist, returning its storage and the Filelist
+    prefix of its paths
+    lazy=False decompresses every block on a thread pool into a DataStorage
+    """
+    storage = BlockStorage(infile, workers=workers)
+    return _from_lazy_storage(infile, storage, lazy, path_filter, rows)
+
+
+def read_streamed(infile, open_paths, path_filter=None, rows=None):
+    """
+    reads a filelist from a stream of paths in two passes, returning its
+    storage and the Filelist prefix of its paths
+    open_paths() must return a new iterator over the paths on every call.
+    The first pass finds the shared prefix and the second streams suffixes
+    into DataStorage, so no intermediate lists are built. path_filter drops
+    paths in the second pass, before they are stored, and the line number of
+    each path it keeps is appended to rows, if given.
+    """
+    common = None
+    is_abs = False
+    for path in open_paths():
+        if common is None:
+            common = path
+            is_abs = path.startswith(os.sep)
+        elif not path.startswith(common):
+            common = os.path.commonprefix([common, path])
+    line_prefix = os.path.dirname(common) if common else ""
+    curr = output_prefix(infile, line_prefix, is_abs)
+
+    diagnostics = Diagnostics()
+
+    def loader():
+        paths = open_paths()
+        if path_filter is not None:
+            paths = _filter_lines(path_filter, paths, infile, diagnostics, rows)
+        for path in paths:
+            suffix = path[len(line_prefix) :].rstrip()
+            yield suffix.lstrip(os.sep) if line_prefix else suffix
+
+    return DataStorage(loader(), None, diagnostics), curr
+
+
+def _from_lazy_storage(infile, storage, lazy, path_filter=None, rows=None):
+    curr = output_prefix(infile, storage.line_prefix, storage.is_abs())
+    if lazy:
+        return storage, curr
+    diagnostics = Diagnostics()
+    suffixes = storage.suffixes()
+    if path_filter is not None:
+        head = join_prefix(storage.line_prefix, "")
+        lines = (head + suffix for suffix in suffixes)
+        lines = _filter_lines(path_filter, lines, infile, diagnostics, rows)
+        suffixes = (line[len(head) :] for line in lines)
+    try:
+        return DataStorage(suffixes, None, diagnostics), curr
+    finally:
+        storage.close()
+
+
+def _filter_lines(path_filter, lines, infile, diagnostics, rows):
+    """
+    Yields the lines path_filter keeps, statting relative lines below the
+    directory of infile, and appends the line number of each to rows
+    """
+    line_number = -1
+
+    def numbered():
+        nonlocal line_number
+        for line_number, line in enumerate(lines):
+            yield line
+
+    for line in path_filter.apply(numbered(), _infile_dir(infile), diagnostics):
+        # apply yields each line it keeps before reading the next one
+        if rows is not None:
+            rows.append(line_number)
+        yield line
+
+
+def _kept_metadata(columns, rows, count):
+    """
+    Returns the rows of metadata columns read with a path_filter, or None if
+    there are none or the count rows kept were not all stored
+    """
+    if columns is None or len(rows) != count:
+        return None
+    if rows and rows[-1] >= len(columns[COLUMNS[0][0]]):
+        return None
+    return {
+        name: array(values.typecode, map(values.__getitem__, rows))
+        for name, values in columns.items()
+    }
+
+
+def _infile_dir(infile):
+    """Returns the directory relative lines of infile are relative to"""
+    return os.path.dirname(os.path.abspath(infile))
+
+
+def output_prefix(infile, line_prefix, is_abs):
+    """
+    Returns the Filelist prefix for lines sharing line_prefix in infile.
+    Relative lines are relative to infile, so the prefix is rebased onto the cwd.
+    """
+    if is_abs:
+        return line_prefix
+    prefix = os.path.relpath(
+        os.path.abspath(os.path.join(os.path.dirname(infile), line_prefix)),
+        start=os.getcwd(),
+    )
+    return "" if prefix == "." else prefix
+
+
 def read_compressed(infile):
     """
     reads a compressed filelist
     """
-    with open(infile, "rb") as f:
-        zdict = f.readline().strip()
-        data = f.read()
-    obj = zlib.decompressobj(zdict=zdict)
-    data = obj.decompress(data)
-    data += obj.flush()
-
-    data = data.decode("utf-8").split(",")
-    return data
+    return list(iter_compressed(infile))
 
 
 def read_uncompressed(infile):
@@ -80,5 +270,5 @@ def check_infile(infile):
     if not os.path.isfile(infile):
         raise TypeError(colored(f"{infile} is not a valid file", "red"))
     ext = os.path.splitext(infile)[1]
-    if ext not in (".txt", ".zz"):
+    if ext not in (".txt", ".zz", ".flb"):
         raise TypeError(colored(f"{ext} is not an accepted file extension"))
@@ -0,0 +1,240 @@
+"""
+functions to record, persist and replay the directory crawl of a Filelist
+
+The scan state of a Filelist built from a directory holds the absolute root,
+the time the crawl started, the extension filter and pruned names it used,
+and for each directory in crawl order its mtime and the range of storage
+indices holding its files. It is saved as JSON next to a saved filelist, so
+a later refresh only lists the directories whose mtime changed.
+"""
+
+import json
+import os
+import time
+from array import array
+
+from .crawler import recrawl_dirs
+from .DataStorage import ENCODING, ERRORS
+from .metadata import COLUMNS, append_rows, kept_rows, new_columns
+
+SUFFIX = ".scan"
+VERSION = 2
+
+
+def new_scan_state(root, accepted_exts, prune, path_filter=None):
+    """Returns an empty scan state for a crawl of root starting now"""
+    return {
+        "root": os.path.abspath(root),
+        "time_ns": time.time_ns(),
+        "accepted_exts": sorted(accepted_exts) if accepted_exts else None,
+        "filter": path_filter.specs if path_filter else None,
+        "prune": None if prune is None or callable(prune) else sorted(prune),
+        "dirs": {},
+    }
+
+
+def record_dirs(listings, dirs, filter_files, diagnostics=None, metadata=None):
+    """
+    Yields the kept files of (rel_dir, mtime, files) listings while recording
+    each directory's mtime, None if it cannot be read, and the range of
+    indices of its files in dirs.
+    filter_files(files) returns the files to keep. Directories that cannot
+    be read are counted as skipped in diagnostics. Given metadata columns,
+    listings also hold a row per file, and the rows of kept files are
+    appended to metadata.
+    """
+    count = 0
+    for rel_dir, mtime, files, *rows in listings:
+        start = count
+        kept = filter_files(files)
+        if metadata is not None:
+            if kept is not files:
+                kept = list(kept)
+            append_rows(metadata, kept_rows(files, rows[0], kept))
+        for suffix in kept:
+            yield suffix
+            count += 1
+        # an unreadable directory is kept with no mtime, so it is listed
+        # again by the next refresh
+        dirs[rel_dir] = [mtime, start, count]
+        if mtime is None and diagnostics is not None:
+            diagnostics.record("skipped", rel_dir)
+
+
+def scan_state_path(outfile):
+    """Returns the path of the scan state saved next to outfile"""
+    return outfile + SUFFIX
+
+
+def save_scan_state(outfile, state):
+    """
+    Saves state next to the filelist at outfile, recording the size of the
+    written file so state is not reattached to a later, different filelist
+    """
+    data = dict(state, version=VERSION, source_size=os.path.getsize(outfile))
+    data["dirs"] = [[rel_dir, *entry] for rel_dir, entry in state["dirs"].items()]
+    with open(scan_state_path(outfile), "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def load_scan_state(infile, count):
+    """
+    Returns the scan state saved next to infile, or None if there is none
+    or it was not saved with infile as it is now, holding count paths.
+    """
+    try:
+        with open(scan_state_path(infile), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.pop("version", None) != VERSION:
+        return None
+    if data.pop("source_size", None) != os.path.getsize(infile):
+        return None
+    data["dirs"] = {entry[0]: entry[1:] for entry in data["dirs"]}
+    stop = max((entry[2] for entry in data["dirs"].values()), default=0)
+    if stop != count:
+        return None
+    return data
+
+
+def _stored_files(storage, entry):
+    return [storage.suffix(idx) for idx in range(entry[1], entry[2])]
+
+
+def rescan(storage, state, filter_files, prune=None, workers=None, diagnostics=None):
+    """
+    Brings an in-memory DataStorage holding the files crawled below
+    state["root"] up to date, relisting only directories whose mtime changed.
+    The storage is patched in place, in the order a fresh crawl would
+    produce, with unchanged directories copied over as encoded bytes, and
+    state is updated. Directories that cannot be read are counted as skipped
+    in diagnostics. Metadata columns of the storage are carried over for
+    unchanged directories and taken from the listing for relisted ones.
+    Returns the added and removed suffixes.
+    """
+    time_ns = time.time_ns()
+    dirs = state["dirs"]
+    listings, changed = _relist(
+        storage,
+        dirs,
+        recrawl_dirs(
+            state["root"],
+            {rel_dir: entry[0] for rel_dir, entry in dirs.items()},
+            state["time_ns"],
+            state["prune"] if prune is None else prune,
+            workers,
+            storage.metadata is not None,
+        ),
+        filter_files,
+        diagnostics,
+    )
+    state["time_ns"] = time_ns
+
+    if not changed and {listing[0] for listing in listings} == dirs.keys():
+        for rel_dir, mtime, _, rows in listings:
+            dirs[rel_dir][0] = mtime
+            if rows is not None:
+                _update_rows(storage.metadata, rows, dirs[rel_dir][1], dirs[rel_dir][2])
+        return [], []
+    return _patch(storage, dirs, listings)
+
+
+def _relist(storage, dirs, listings, filter_files, diagnostics):
+    """
+    Returns the recrawled listings as (rel_dir, mtime, files, rows), files
+    being None for directories whose mtime did not change, and whether a
+    relisted directory holds other files than stored
+    """
+    stat = storage.metadata is not None
+    relisted = []
+    changed = False
+    for rel_dir, mtime, files, *rows in listings:
+        if mtime is None and diagnostics is not None:
+            diagnostics.record("skipped", rel_dir)
+        if files is not None:
+            kept = list(filter_files(files))
+            if stat:
+                rows = [kept_rows(files, rows[0], kept)]
+            files = kept
+            if rel_dir not in dirs or files != _stored_files(storage, dirs[rel_dir]):
+                changed = True
+        relisted.append((rel_dir, mtime, files, rows[0] if stat else None))
+    return relisted, changed
+
+
+def _patch(storage, dirs, listings):
+    """
+    Rebuilds storage from listings, copying the encoded bytes of unchanged
+    directories and decoding only the stored files of relisted or removed
+    ones, and points dirs at the new ranges. Returns the added and removed
+    suffixes.
+    """
+    metadata = None if storage.metadata is None else new_columns()
+    patched = (bytearray(), array("Q", [0]), metadata)
+    new_dirs = {}
+    changes = ([], [])
+    with memoryview(storage.buffer) as view:
+        for rel_dir, mtime, files, rows in listings:
+            start = len(patched[1]) - 1
+            entry = dirs.get(rel_dir)
+            if files is None:
+                _copy_slots(storage, view, entry, patched)
+            else:
+                _diff(storage, entry, files, changes)
+                _append_files(files, rows, patched)
+            new_dirs[rel_dir] = [mtime, start, len(patched[1]) - 1]
+    for rel_dir, entry in dirs.items():
+        if rel_dir not in new_dirs:
+            changes[1].extend(_stored_files(storage, entry))
+
+    storage.reset(patched[0], patched[1])
+    storage.metadata = metadata
+    dirs.clear()
+    dirs.update(new_dirs)
+    return changes
+
+
+def _diff(storage, entry, files, changes):
+    """
+    Appends the relisted files missing from a directory's stored entry, and
+    the stored files no longer listed, to the added and removed changes
+    """
+    stored = [] if entry is None else _stored_files(storage, entry)
+    listed = set(files)
+    changes[1].extend(suffix for suffix in stored if suffix not in listed)
+    stored = set(stored)
+    changes[0].extend(suffix for suffix in files if suffix not in stored)
+
+
+def _append_files(files, rows, patched):
+    """Appends relisted files and their metadata rows to the patched storage"""
+    buffer, offsets, metadata = patched
+    for suffix in files:
+        buffer += suffix.encode(ENCODING, ERRORS)
+        offsets.append(len(buffer))
+    if metadata is not None:
+        append_rows(metadata, rows)
+
+
+def _copy_slots(storage, view, entry, patched):
+    """
+    Appends the encoded suffixes and metadata rows of the slots of a stored
+    directory's entry, read through view of the storage buffer, to the
+    patched buffer, offsets and metadata
+    """
+    buffer, offsets, metadata = patched
+    first, last = entry[1], entry[2]
+    old_offsets = storage.offsets
+    shift = len(buffer) - old_offsets[first]
+    buffer += view[old_offsets[first] : old_offsets[last]]
+    offsets.extend(map(shift.__add__, old_offsets[first + 1 : last + 1]))
+    if metadata is not None:
+        for name, values in metadata.items():
+            values.extend(storage.metadata[name][first:last])
+
+
+def _update_rows(metadata, rows, first, last):
+    """Overwrites the metadata of slots first to last with rows"""
+    for (name, _), values in zip(COLUMNS, zip(*rows)):
+        metadata[name][first:last] = array(metadata[name].typecode, values)
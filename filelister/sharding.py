@@ -0,0 +1,126 @@
+"""
+functions to split the paths of a storage into parts for distribution
+
+A part key maps each stored suffix to the part it belongs to: its directory,
+its extension, a stable hash of its absolute path modulo the number of parts,
+or any function of the path. Parts are filled in a single pass over the
+storage, straight into encoded buffers, and written out without building a
+list of paths per part.
+"""
+
+import os
+import zlib
+from array import array
+
+from .DataStorage import ENCODING, ERRORS, DataStorage, join_prefix
+
+KEYS = ("hash", "dir", "ext")
+FLUSH_SIZE = 1 << 20
+MAX_BUFFERED = 64 << 20
+
+
+def stable_hash(path):
+    """Returns a hash of path that is the same in every process and run"""
+    return zlib.crc32(path.encode(ENCODING, ERRORS))
+
+
+def part_key(key, num_parts, prefixes, kind):
+    """
+    Returns a function from a stored suffix to its part.
+    key is "hash", which needs num_parts and hashes the absolute path, "dir"
+    or "ext" of the suffix, or a function called with the kind ("abs" or
+    "rel") path.
+    """
+    if callable(key):
+        prefix = prefixes[kind]
+        return lambda suffix: key(join_prefix(prefix, suffix))
+    if key == "hash":
+        if not num_parts or num_parts < 1:
+            raise ValueError("hash partitioning needs a positive number of parts")
+        prefix = prefixes["abs"]
+        return lambda suffix: stable_hash(join_prefix(prefix, suffix)) % num_parts
+    if key == "dir":
+        return os.path.dirname
+    if key == "ext":
+        return lambda suffix: os.path.splitext(suffix)[1]
+    raise ValueError(f"key must be one of {', '.join(KEYS)} or a function, not {key}")
+
+
+def partition_storage(storage, part_of, parts=()):
+    """
+    Returns a dict from each part to a DataStorage of its suffixes, in order,
+    sharing storage's prefixes by value. parts lists parts to create even if
+    they stay empty.
+    """
+    buffers = {part: (bytearray(), array("Q", [0])) for part in parts}
+    for suffix in storage.suffixes():
+        part = part_of(suffix)
+        entry = buffers.get(part)
+        if entry is None:
+            entry = buffers[part] = (bytearray(), array("Q", [0]))
+        buffer, offsets = entry
+        buffer += suffix.encode(ENCODING, ERRORS)
+        offsets.append(len(buffer))
+    return {
+        part: DataStorage.from_buffer(buffer, offsets, dict(storage.prefixes))
+        for part, (buffer, offsets) in buffers.items()
+    }
+
+
+def write_parts(storage, part_of, outfile_of, line_prefix_of, parts=()):
+    """
+    Writes the suffixes of each part to an uncompressed filelist at
+    outfile_of(part) in one pass, with line_prefix_of(outfile) written
+    before each suffix. A file is created when its part is first seen, and
+    for every part in parts. Lines are buffered per part, and a buffer is
+    appended to its file, which is only open while it is written, once it
+    holds FLUSH_SIZE bytes. Every buffer is written out once they hold
+    MAX_BUFFERED bytes in all, so neither open files nor memory grow with
+    the number of parts. Returns a dict from each part to its outfile.
+    """
+    sep = os.linesep.encode(ENCODING)
+    outfiles = {}
+    pending = {}
+    written = set()
+    buffered = 0
+
+    def open_part(part):
+        outfile = outfiles[part] = outfile_of(part)
+        with open(outfile, "wb"):
+            pass
+        entry = pending[part] = (line_prefix_of(outfile), bytearray())
+        return entry
+
+    def flush(part):
+        buffer = pending[part][1]
+        with open(outfiles[part], "ab") as f:
+            f.write(buffer)
+        size = len(buffer)
+        del buffer[:]
+        written.add(part)
+        return size
+
+    for part in parts:
+        open_part(part)
+    for suffix in storage.suffixes():
+        part = part_of(suffix)
+        entry = pending.get(part)
+        if entry is None:
+            entry = open_part(part)
+        head, buffer = entry
+        size = len(buffer)
+        # the last line of a file is not followed by sep
+        if size or part in written:
+            buffer += sep
+        buffer += join_prefix(head, suffix).encode(ENCODING, ERRORS)
+        buffered += len(buffer) - size
+        if len(buffer) > FLUSH_SIZE:
+            buffered -= flush(part)
+        elif buffered > MAX_BUFFERED:
+            for other, (_, other_buffer) in pending.items():
+                if other_buffer:
+                    buffered -= flush(other)
+    for part, (_, buffer) in pending.items():
+        if buffer:
+            flush(part)
+    return outfiles
@@ -3,6 +3,8 @@ import time
 from ctypes import c_wchar_p
 from random import choice
 
+import filelister as fs
+
 
 def benchmark_append_python(iters, str_len):
     print(
@@ -54,6 +56,47 @@ def benchmark_indexing_ctypes(iters):
     print(f"Runtime: {end - start}")
 
 
+def make_paths(num_paths):
+    """
+    builds synthetic absolute paths below a shared prefix
+    """
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+        for idx in range(num_paths)
+    ]
+
+
+def benchmark_filelist_mutation(num_paths, num_changes):
+    """
+    times appending and removing paths in place against rebuilding the Filelist
+    """
+    print(
+        f"Benchmarking {num_changes} appends and removes on a {num_paths} path Filelist"
+    )
+    paths = make_paths(num_paths + num_changes)
+    flist = fs.Filelist(paths[:num_paths])
+
+    start = time.time()
+    for path in paths[num_paths:]:
+        flist = fs.Filelist(flist.to_list() + [path])
+    print(f"Rebuild per append: {(time.time() - start) / num_changes} seconds")
+
+    flist = fs.Filelist(paths[:num_paths])
+    start = time.time()
+    flist.extend(paths[num_paths:])
+    print(f"Append: {(time.time() - start) / num_changes} seconds")
+
+    start = time.time()
+    for path in paths[:: num_paths // num_changes]:
+        flist.remove(path)
+    print(f"Remove: {(time.time() - start) / num_changes} seconds")
+
+    start = time.time()
+    flist.compact()
+    print(f"Compact: {time.time() - start} seconds")
+    print(f"Entries: {len(flist)}\n")
+
+
 if __name__ == "__main__":
     benchmark_append_python(10000, 10)
     benchmark_append_ctypes(10000, 10)
@@ -64,3 +107,5 @@ if __name__ == "__main__":
 
     # benchmark_indexing_python(10000)
     # benchmark_indexing_ctypes(10000)
+
+    benchmark_filelist_mutation(1000000, 100)
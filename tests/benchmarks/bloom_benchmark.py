@@ -0,0 +1,64 @@
+"""
+Benchmarking for Bloom filter membership tests on lazily read filelists
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import filelister as fs
+
+
+def make_paths(start, stop):
+    """
+    builds synthetic absolute paths for indices start to stop
+    """
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+        for idx in range(start, stop)
+    ]
+
+
+def time_queries(name, flist, queries):
+    """
+    reports the time per membership test of queries against flist
+    """
+    start = time.time()
+    found = sum(query in flist for query in queries)
+    elapsed = time.time() - start
+    print(f"{name}")
+    print(f"Found: {found} of {len(queries)}")
+    print(f"Time per query: {elapsed / len(queries) * 1e6} us\n")
+
+
+def benchmark(num_paths, num_queries, name, **options):
+    """
+    times negative membership tests on a lazily read filelist with and
+    without a Bloom filter
+    """
+    print(f"Benchmarking {num_queries} absent paths against {num_paths} in {name}\n")
+    absent = make_paths(num_paths, num_paths + num_queries)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        outfile = os.path.join(tmp_dir, name)
+        flist = fs.Filelist(make_paths(0, num_paths))
+
+        flist.save(outfile, **options)
+        lazy = fs.read_filelist(outfile, lazy=True)
+        time_queries("Exact check", lazy, absent)
+        lazy._data_storage.close()
+
+        start = time.time()
+        flist.save(outfile, bloom=0.01, **options)
+        print(f"Save with Bloom filter: {time.time() - start} seconds")
+        print(f"Bloom filter size: {os.path.getsize(outfile + '.bloom') / 1e6} MB\n")
+        lazy = fs.read_filelist(outfile, lazy=True)
+        time_queries("Bloom filter, then exact check", lazy, absent)
+        lazy._data_storage.close()
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    benchmark(size, 1000, "filelist.txt")
+    benchmark(size, 1000, "filelist.zz", compressed=True, block_size=65536)
+    benchmark(size, 10000, "filelist.flb", binary=True, hash_index=False)
@@ -3,13 +3,20 @@ Benchmarking for filelister compression
 """
 
 
+import multiprocessing
 import os
+import resource
 import sys
+import tempfile
 import time
+import zlib
 
 import filelister as fs
+from filelister.compression import iter_compressed, write_compressed
 from tqdm import tqdm
 
+SAMPLE_PREFIX = "/home/simon/dev/data_science/filelister/tests/data"
+
 
 def get_uncompressed_metrics(path):
     """
@@ -141,7 +148,170 @@ def benchmark_read_compressed(test_file, iterations):
     print(f"Min execution time: {min(runtimes)} seconds")
 
 
+def sample_paths(num_paths):
+    """
+    yields synthetic paths
+    """
+    for i in range(num_paths):
+        yield f"{SAMPLE_PREFIX}/dir_{str(i // 1000).zfill(5)}/sample_{str(i).zfill(9)}"
+
+
+def legacy_write(path, num_paths):
+    """
+    compresses the way Filelist did before chunked streaming
+    """
+    zdict = SAMPLE_PREFIX.encode("utf-8")
+    obj = zlib.compressobj(level=1, memLevel=9, zdict=zdict)
+    data = ",".join(list(sample_paths(num_paths))).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(zdict + b"\n" + obj.compress(data) + obj.flush())
+
+
+def stream_write(path, num_paths):
+    """
+    compresses with chunked streaming
+    """
+    with open(path, "wb") as f:
+        write_compressed(f, sample_paths(num_paths), SAMPLE_PREFIX)
+
+
+def legacy_read(path):
+    """
+    decompresses the way read_compressed did before chunked streaming
+    """
+    with open(path, "rb") as f:
+        zdict = f.readline().strip()
+        data = f.read()
+    obj = zlib.decompressobj(zdict=zdict)
+    data = obj.decompress(data)
+    data += obj.flush()
+    return len(data.decode("utf-8").split(","))
+
+
+def stream_read(path):
+    """
+    decompresses with chunked streaming
+    """
+    return sum(1 for _ in iter_compressed(path))
+
+
+def _report_peak_rss(func, args, queue):
+    func(*args)
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def peak_rss(func, *args):
+    """
+    runs func in a fresh process and returns its peak RSS in MB
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_report_peak_rss, args=(func, args, queue))
+    proc.start()
+    rss = queue.get()
+    proc.join()
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return rss / 1000000 if sys.platform == "darwin" else rss / 1000
+
+
+def benchmark_peak_memory(sizes):
+    """
+    compares peak RSS of legacy and streaming compression as the filelist grows
+    """
+    print("Benchmarking Peak RSS of Compressed Writes and Reads")
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "peak_rss.zz")
+    for num_paths in sizes:
+        print(f"Paths: {num_paths}")
+        print(f"Legacy write peak RSS: {peak_rss(legacy_write, path, num_paths)} MB")
+        print(f"Streaming write peak RSS: {peak_rss(stream_write, path, num_paths)} MB")
+        print(f"File Size: {os.stat(path).st_size / 1000000} MB")
+        print(f"Legacy read peak RSS: {peak_rss(legacy_read, path)} MB")
+        print(f"Streaming read peak RSS: {peak_rss(stream_read, path)} MB\n")
+    os.remove(path)
+    os.rmdir(tmp_dir)
+
+
+def benchmark_block_read(num_paths, block_size, workers_list, iterations):
+    """
+    benchmarks block-compressed reads as the number of decompression threads grows
+    """
+    print("Benchmarking Block-compressed Reads")
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "blocks.zz")
+    fs.Filelist(list(sample_paths(num_paths))).save(
+        path, compressed=True, block_size=block_size
+    )
+    print(f"Paths: {num_paths}")
+    print(f"Block size: {block_size}")
+    print(f"File Size: {os.stat(path).st_size / 1000000} MB")
+    for workers in workers_list:
+        runtimes = []
+        for _ in range(iterations):
+            start = time.time()
+            storage = fs.BlockStorage(path, workers=workers)
+            for _ in storage.iter_blocks():
+                pass
+            storage.close()
+            end = time.time()
+            runtimes.append(end - start)
+        print(f"Workers: {workers}, min decompression time: {min(runtimes)} seconds")
+    os.remove(path)
+    os.rmdir(tmp_dir)
+
+
+def benchmark_codecs(num_paths, iterations):
+    """
+    compares ratio and encode/decode speed of the stream zlib and block codecs
+    """
+    print("Benchmarking Compression Codecs")
+    tmp_dir = tempfile.mkdtemp()
+    flist = fs.Filelist(list(sample_paths(num_paths)))
+    txt_path = os.path.join(tmp_dir, "codecs.txt")
+    flist.save(txt_path)
+    txt_size = os.stat(txt_path).st_size
+    print(f"Paths: {num_paths}")
+    print(f"Uncompressed Size: {txt_size / 1000000} MB\n")
+
+    codecs = {
+        "stream zlib": {"compressed": "stream"},
+        "block zlib": {"compressed": "zlib"},
+        "block zlib:9": {"compressed": "zlib:9"},
+        "block lzma": {"compressed": "lzma"},
+        "block bz2": {"compressed": "bz2"},
+        "front": {"compressed": "front"},
+        "front+zlib": {"compressed": "front+zlib"},
+    }
+    for name, kwargs in codecs.items():
+        path = os.path.join(tmp_dir, "codecs.zz")
+        encode_times = []
+        decode_times = []
+        for _ in range(iterations):
+            start = time.time()
+            flist.save(path, **kwargs)
+            encode_times.append(time.time() - start)
+            start = time.time()
+            fs.read_filelist(path, compressed=True)
+            decode_times.append(time.time() - start)
+        size = os.stat(path).st_size
+        print(f"{name}")
+        print(f"Compressed Size: {size / 1000000} MB")
+        print(f"Ratio: {txt_size / size}")
+        print(f"Min encode time: {min(encode_times)} seconds")
+        print(f"Min decode time: {min(decode_times)} seconds\n")
+        os.remove(path)
+    os.remove(txt_path)
+    os.rmdir(tmp_dir)
+
+
 if __name__ == "__main__":
+    benchmark_codecs(1000000, 3)
+    print("\n\n")
+    benchmark_peak_memory([250000, 1000000, 4000000])
+    print("\n\n")
+    benchmark_block_read(2000000, 65536, [1, 2, 4, 8], 3)
+    print("\n\n")
+
     NUM_ITERATIONS = 1
     TEST_FILE = os.path.join(os.path.dirname(__file__), "./sample_flist.txt")
 
@@ -0,0 +1,49 @@
+"""
+Benchmarking for batch membership queries
+"""
+
+import sys
+import time
+
+import filelister as fs
+
+
+def make_paths(start, stop):
+    """
+    builds synthetic absolute paths for indices start to stop
+    """
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+        for idx in range(start, stop)
+    ]
+
+
+def timed(name, func):
+    """
+    reports the runtime of func and how many queries it found
+    """
+    start = time.time()
+    found = func()
+    print(f"{name}")
+    print(f"Found: {sum(found) if isinstance(found, list) else len(found)}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+
+
+def benchmark(num_paths, num_queries):
+    """
+    times num_queries membership tests, half of them hits, one at a time
+    and as a batch
+    """
+    print(f"Benchmarking {num_queries} queries against {num_paths} paths\n")
+    flist = fs.Filelist(make_paths(0, num_paths))
+    queries = make_paths(num_paths - num_queries // 2, num_paths + num_queries // 2)
+
+    timed("in (loop)", lambda: [query in flist for query in queries])
+    timed("contains_many", lambda: flist.contains_many(queries))
+    timed("contains_many(as_filelist=True)", lambda: flist.contains_many(queries, True))
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    benchmark(size, size // 100)
+    benchmark(size, size)
@@ -0,0 +1,74 @@
+"""
+Benchmarking for building Filelists that leave out many paths
+"""
+
+import contextlib
+import os
+import sys
+import time
+
+from termcolor import colored
+
+import filelister as fs
+
+
+class PrintingFilelist(fs.Filelist):
+    """
+    Filelist printing a line for every rejected path, as Filelist used to
+    """
+
+    def _filter(self, input_data, accepted_exts):
+        for value in input_data:
+            if accepted_exts:
+                if os.path.splitext(value)[1] in accepted_exts:
+                    yield value
+                else:
+                    print(colored(f"Invalid exception found. Skipping {value}.", "red"))
+            else:
+                yield value
+
+
+def make_paths(num_paths):
+    """
+    builds synthetic image paths, each with a .json sidecar
+    """
+    paths = []
+    for idx in range(num_paths):
+        path = f"/data/images/dir_{idx // 1000:05}/sample_{idx:09}"
+        paths.append(path + ".jpg")
+        paths.append(path + ".json")
+    return paths
+
+
+def timed(name, func):
+    """
+    reports the runtime of func
+    """
+    start = time.time()
+    func()
+    print(f"{name}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+
+
+def build_printing(paths):
+    """
+    builds a PrintingFilelist, sending its output to os.devnull
+    """
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            PrintingFilelist(paths, accepted_exts=[".jpg"])
+
+
+def benchmark(num_paths):
+    """
+    times building a Filelist of images that rejects as many .json sidecars
+    """
+    print(f"Benchmarking {num_paths} images with {num_paths} sidecars\n")
+    paths = make_paths(num_paths)
+    timed("print per path (to os.devnull)", lambda: build_printing(paths))
+    timed("counted", lambda: fs.Filelist(paths, accepted_exts=[".jpg"]))
+    print(fs.Filelist(paths, accepted_exts=[".jpg"]).stats["rejected"]["count"])
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,82 @@
+"""
+Benchmarking for the external sorted-merge diff
+"""
+
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import filelister as fs
+
+MEMORY_CAP = 64 << 20
+
+
+def write_filelist(path, start, stop):
+    """
+    streams synthetic paths for indices start to stop, in shuffled order
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for idx in range(start, stop):
+            idx = start + (idx * 7919) % (stop - start)
+            f.write(f"/data/images/dir_{str(idx // 1000).zfill(5)}/")
+            f.write(f"sample_{str(idx).zfill(9)}.jpg\n")
+
+
+def loop_diff(old, new):
+    """
+    diffs with in-memory sets, as callers did before the streaming diff
+    """
+    old_paths = set(fs.read_filelist(old).to_list())
+    new_paths = set(fs.read_filelist(new).to_list())
+    return len(new_paths - old_paths), len(old_paths - new_paths)
+
+
+def stream_diff(old, new):
+    """
+    diffs with the external sorted-merge diff
+    """
+    return fs.write_diff(old, new, memory_cap=MEMORY_CAP)[:2]
+
+
+def _report(func, args, queue):
+    start = time.time()
+    result = func(*args)
+    runtime = time.time() - start
+    queue.put((result, runtime, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def run(name, func, *args):
+    """
+    runs func in a fresh process and reports its result, runtime and peak RSS
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_report, args=(func, args, queue))
+    proc.start()
+    result, runtime, rss = queue.get()
+    proc.join()
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    rss = rss / 1000000 if sys.platform == "darwin" else rss / 1000
+    print(f"{name}")
+    print(f"Added, removed: {result}")
+    print(f"Execution time: {runtime} seconds")
+    print(f"Peak RSS: {rss} MB\n")
+
+
+if __name__ == "__main__":
+    NUM_PATHS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    TMP_DIR = tempfile.mkdtemp()
+    OLD = os.path.join(TMP_DIR, "old.txt")
+    NEW = os.path.join(TMP_DIR, "new.txt")
+    print(f"Writing 2 x {NUM_PATHS} paths to {TMP_DIR}\n")
+    write_filelist(OLD, 0, NUM_PATHS)
+    write_filelist(NEW, NUM_PATHS // 10, NUM_PATHS + NUM_PATHS // 10)
+    try:
+        run("In-memory sets", loop_diff, OLD, NEW)
+        run(f"External diff, {MEMORY_CAP >> 20} MB cap", stream_diff, OLD, NEW)
+    finally:
+        shutil.rmtree(TMP_DIR)
@@ -0,0 +1,66 @@
+"""
+Benchmarking for filtering paths while building Filelists
+"""
+
+import os
+import sys
+import time
+
+import filelister as fs
+
+EXTS = [".png", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp", ".jpg"]
+
+
+def make_paths(num_paths):
+    """
+    builds synthetic image paths, each with a .json sidecar
+    """
+    paths = []
+    for idx in range(num_paths):
+        path = f"/data/images/dir_{idx // 1000:05}/sample_{idx:09}"
+        paths.append(path + ".jpg")
+        paths.append(path + ".json")
+    return paths
+
+
+def timed(name, func):
+    """
+    reports the runtime of func and how many paths it kept
+    """
+    start = time.time()
+    kept = func()
+    print(f"{name}")
+    print(f"Kept: {kept}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+
+
+def filter_list(paths, accepted_exts):
+    """
+    filters by looking up each extension in a list, as Filelist used to
+    """
+    return sum(1 for path in paths if os.path.splitext(path)[1] in accepted_exts)
+
+
+def benchmark(num_paths):
+    """
+    times filtering num_paths images and as many sidecars
+    """
+    print(f"Benchmarking filters over {2 * num_paths} paths\n")
+    paths = make_paths(num_paths)
+
+    def count(path_filter):
+        return sum(1 for _ in path_filter.apply(paths))
+
+    timed("splitext in list", lambda: filter_list(paths, EXTS))
+    timed("PathFilter(exts)", lambda: count(fs.PathFilter(exts=EXTS)))
+    globs = ["*" + ext for ext in EXTS]
+    timed("PathFilter(globs)", lambda: count(fs.PathFilter(globs=globs)))
+    timed("PathFilter(include)", lambda: count(fs.PathFilter(include=r"\.jpg$")))
+    timed(
+        "Filelist(accepted_exts)",
+        lambda: len(fs.Filelist(paths, accepted_exts=EXTS)),
+    )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,78 @@
+"""
+Benchmarking for hashing the contents of the files of a Filelist
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import filelister as fs
+
+
+def make_files(root, num_files, file_size):
+    """
+    writes num_files files of file_size random bytes, a tenth of them copies
+    """
+    os.makedirs(root, exist_ok=True)
+    data = os.urandom(file_size)
+    for idx in range(num_files):
+        with open(os.path.join(root, f"file_{idx:06d}.bin"), "wb") as f:
+            f.write(data if idx % 10 == 0 else os.urandom(file_size))
+
+
+def hash_loop(flist):
+    """
+    hashes every file with a plain read loop, as jobs did before compute_hashes
+    """
+    digests = []
+    for path in flist:
+        with open(path, "rb") as f:
+            digests.append(hashlib.blake2b(f.read()).digest())
+    return digests
+
+
+def benchmark(name, func, iterations):
+    """
+    reports wall-clock time of func over iterations
+    """
+    runtimes = []
+    for _ in range(iterations):
+        start = time.time()
+        digests = func()
+        runtimes.append(time.time() - start)
+    print(f"{name}")
+    print(f"Digests: {len(digests)}")
+    print(f"Average execution time: {sum(runtimes) / iterations} seconds")
+    print(f"Min execution time: {min(runtimes)} seconds\n")
+
+
+if __name__ == "__main__":
+    NUM_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    FILE_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 1 << 20
+    NUM_ITERATIONS = 3
+    ROOT = tempfile.mkdtemp(prefix="filelister_hashing_")
+
+    print(f"Writing {NUM_FILES} files of {FILE_SIZE} bytes to {ROOT}\n")
+    make_files(ROOT, NUM_FILES, FILE_SIZE)
+    flist = fs.Filelist(ROOT, metadata=True)
+
+    try:
+        benchmark("read loop", lambda: hash_loop(flist), NUM_ITERATIONS)
+        for workers in (1, 4, 8):
+            benchmark(
+                f"compute_hashes, {workers} worker(s), no cache",
+                lambda: flist.compute_hashes(workers=workers, cache={}),
+                NUM_ITERATIONS,
+            )
+        flist.compute_hashes()
+        benchmark(
+            "compute_hashes, files unchanged",
+            lambda: flist.compute_hashes(workers=8),
+            NUM_ITERATIONS,
+        )
+        benchmark("duplicates", flist.duplicates, NUM_ITERATIONS)
+    finally:
+        shutil.rmtree(ROOT)
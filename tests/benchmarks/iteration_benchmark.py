@@ -0,0 +1,88 @@
+"""
+Benchmarking for iterating over Filelists and DataStorage
+"""
+
+import sys
+import time
+
+import filelister as fs
+
+
+class NextDataStorage(fs.DataStorage):
+    """
+    DataStorage that is its own iterator, stepping through __getitem__ for
+    every entry, as DataStorage used to
+    """
+
+    def __iter__(self):
+        self.curr_idx = 0
+        return self
+
+    def __next__(self):
+        if self.curr_idx < self.counter:
+            result = self[self.curr_idx]
+            self.curr_idx += 1
+            return result
+        raise StopIteration
+
+
+def make_paths(start, stop):
+    """
+    builds synthetic absolute paths for indices start to stop
+    """
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+        for idx in range(start, stop)
+    ]
+
+
+def timed(name, func):
+    """
+    reports the runtime of func and how many items it went through
+    """
+    start = time.time()
+    count = func()
+    print(f"{name}")
+    print(f"Items: {count}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+
+
+def consume(iterable):
+    """
+    counts the items of iterable
+    """
+    count = 0
+    for _ in iterable:
+        count += 1
+    return count
+
+
+def benchmark(num_paths):
+    """
+    times full iteration with __next__, the generator based iterators and chunks
+    """
+    print(f"Benchmarking iteration over {num_paths} paths\n")
+    paths = make_paths(0, num_paths)
+    prefixes = {"abs": "/data/images", "rel": "images", "curr": "/data/images"}
+    suffixes = [path[len("/data/images/") :] for path in paths]
+    old = NextDataStorage(suffixes, dict(prefixes))
+    new = fs.DataStorage(suffixes, dict(prefixes))
+    flist = fs.Filelist(paths)
+
+    timed("DataStorage (__next__)", lambda: consume(old))
+    timed("DataStorage (generator)", lambda: consume(new))
+    timed("DataStorage.iter_paths('abs')", lambda: consume(new.iter_paths("abs")))
+    timed("Filelist", lambda: consume(flist))
+    timed(
+        "Filelist.iter_chunks(10000)",
+        lambda: sum(len(chunk) for chunk in flist.iter_chunks(10000)),
+    )
+    new.remove(paths[0])
+    timed(
+        "DataStorage.iter_paths('abs') with a tombstone",
+        lambda: consume(new.iter_paths("abs")),
+    )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,175 @@
+"""
+Benchmarking for DataStorage memory usage
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+import filelister as fs
+from termcolor import colored
+
+
+class LegacyDataStorage:
+    """Dual abs/rel list storage used before prefix compression"""
+
+    def __init__(self, loader):
+        self.paths = {"abs": [], "rel": []}
+        self.lookup = {}
+        self.counter = 0
+
+        for abs_path, rel_path in loader:
+            if abs_path in self.lookup or rel_path in self.lookup:
+                print(colored("WARN: Path is already stored. Skipping.", "red"))
+                continue
+
+            self.paths["abs"].append(abs_path)
+            self.paths["rel"].append(rel_path)
+
+            self.lookup[abs_path] = self.counter
+            self.lookup[rel_path] = self.counter
+
+            self.counter += 1
+
+
+class DictLookupDataStorage:
+    """Prefix-compressed storage with the str-keyed dict lookup it used before"""
+
+    def __init__(self, loader):
+        self.buffer = bytearray()
+        self.offsets = array("Q", [0])
+        self.lookup = {}
+        self.counter = 0
+
+        for suffix in loader:
+            if suffix in self.lookup:
+                print(colored("WARN: Path is already stored. Skipping.", "red"))
+                continue
+
+            self.buffer += suffix.encode("utf-8")
+            self.offsets.append(len(self.buffer))
+            self.lookup[suffix] = self.counter
+
+            self.counter += 1
+
+
+PREFIXES = {
+    "abs": "/home/simon/dev/data_science/filelister/tests/data",
+    "rel": "tests/data",
+    "curr": "/home/simon/dev/data_science/filelister/tests/data",
+}
+
+
+def make_suffix(idx):
+    """
+    builds a synthetic path suffix
+    """
+    return f"dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+
+
+def legacy_loader(num_paths):
+    """
+    yields abs, rel pairs as the legacy Filelist loader did
+    """
+    for idx in range(num_paths):
+        suffix = make_suffix(idx)
+        yield PREFIXES["abs"] + "/" + suffix, PREFIXES["rel"] + "/" + suffix
+
+
+def suffix_loader(num_paths):
+    """
+    yields suffixes as the current Filelist loader does
+    """
+    for idx in range(num_paths):
+        yield make_suffix(idx)
+
+
+def measure(name, build):
+    """
+    reports build time and memory held by the storage built by build()
+    """
+    tracemalloc.start()
+    start = time.time()
+    storage = build()
+    end = time.time()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}")
+    print(f"Build time: {end - start} seconds")
+    print(f"Retained memory: {current / 1000000} MB")
+    print(f"Peak memory: {peak / 1000000} MB\n")
+    return storage
+
+
+def benchmark_storage(num_paths):
+    """
+    compares legacy and prefix-compressed storage for num_paths entries
+    """
+    print(f"Benchmarking storage of {num_paths} paths\n")
+    measure("Legacy DataStorage", lambda: LegacyDataStorage(legacy_loader(num_paths)))
+    measure(
+        "Prefix-compressed DataStorage (dict lookup)",
+        lambda: DictLookupDataStorage(suffix_loader(num_paths)),
+    )
+    storage = measure(
+        "Prefix-compressed DataStorage (hash index)",
+        lambda: fs.DataStorage(suffix_loader(num_paths), PREFIXES),
+    )
+    queries = [
+        PREFIXES["abs"] + "/" + make_suffix(idx) for idx in range(0, num_paths, 7)
+    ]
+    start = time.time()
+    for query in queries:
+        storage.index(query)
+    print(f"index(): {(time.time() - start) / len(queries) * 1e6} us per query\n")
+
+
+def benchmark_shards(num_paths, num_shards):
+    """
+    compares slicing a Filelist into shards as views against copying lists
+    """
+    print(f"Benchmarking {num_shards} shards of {num_paths} paths\n")
+    flist = fs.Filelist(
+        [PREFIXES["abs"] + "/" + make_suffix(idx) for idx in range(num_paths)]
+    )
+    starts = range(0, num_paths, num_paths // num_shards)
+    size = num_paths // num_shards
+    measure(
+        "Shards as lists",
+        lambda: [flist[start : start + size].to_list() for start in starts],
+    )
+    shards = measure(
+        "Shards as views", lambda: [flist[start : start + size] for start in starts]
+    )
+    start = time.time()
+    total = sum(1 for shard in shards for _ in shard)
+    print(f"Iterating {total} paths through the views: {time.time() - start} seconds\n")
+
+
+def benchmark_save(num_paths):
+    """
+    compares the peak memory of the vectorized and streaming text writers
+    """
+    print(f"Benchmarking saving {num_paths} paths\n")
+    flist = fs.Filelist(
+        [PREFIXES["abs"] + "/" + make_suffix(idx) for idx in range(num_paths)]
+    )
+    module = sys.modules["filelister.Filelist"]
+    with tempfile.TemporaryDirectory() as tmp:
+        outfile = os.path.join(tmp, "flist.txt")
+        measure("Vectorized save", lambda: flist.save(outfile))
+        has_numpy, module.HAS_NUMPY = module.HAS_NUMPY, False
+        try:
+            measure("Streaming save", lambda: flist.save(outfile))
+        finally:
+            module.HAS_NUMPY = has_numpy
+
+
+if __name__ == "__main__":
+    benchmark_storage(100000)
+    benchmark_storage(1000000)
+    benchmark_shards(1000000, 1000)
+    benchmark_save(1000000)
@@ -0,0 +1,69 @@
+"""
+Benchmarking for capturing stat metadata while scanning
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import filelister as fs
+from scan_benchmark import make_tree
+
+
+def stat_after(root):
+    """
+    lists a tree, then stats every path again, as jobs needing sizes did
+    """
+    flist = fs.Filelist(root)
+    sizes = [os.stat(path).st_size for path in flist]
+    return flist, sum(sizes)
+
+
+def stat_during(root, workers=None):
+    """
+    takes sizes from the DirEntry objects of the crawl
+    """
+    flist = fs.Filelist(root, metadata=True, workers=workers)
+    return flist, flist.total_size()
+
+
+def benchmark(name, func, iterations):
+    """
+    reports wall-clock time of func over iterations
+    """
+    runtimes = []
+    for _ in range(iterations):
+        start = time.time()
+        flist, total = func()
+        runtimes.append(time.time() - start)
+    print(f"{name}")
+    print(f"Entries: {len(flist)}, total size: {total}")
+    print(f"Average execution time: {sum(runtimes) / iterations} seconds")
+    print(f"Min execution time: {min(runtimes)} seconds\n")
+
+
+if __name__ == "__main__":
+    NUM_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    NUM_ITERATIONS = 3
+    ROOT = tempfile.mkdtemp(prefix="filelister_metadata_")
+
+    print(f"Writing {NUM_FILES} files to {ROOT}")
+    make_tree(ROOT, NUM_FILES)
+    print("\n")
+
+    try:
+        benchmark("Filelist, then os.stat", lambda: stat_after(ROOT), NUM_ITERATIONS)
+        benchmark("Filelist(metadata=True)", lambda: stat_during(ROOT), NUM_ITERATIONS)
+        benchmark(
+            "Filelist(metadata=True), 8 workers",
+            lambda: stat_during(ROOT, 8),
+            NUM_ITERATIONS,
+        )
+        flist = fs.Filelist(ROOT, metadata=True)
+        start = time.time()
+        flist.sorted_by("size", reverse=True)
+        print(f"sorted_by('size'): {time.time() - start} seconds")
+    finally:
+        shutil.rmtree(ROOT)
@@ -0,0 +1,65 @@
+"""
+Benchmarking for incremental refreshes against full rescans
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import filelister as fs
+from scan_benchmark import make_tree
+
+OLD_TIME = 1_000_000_000
+
+
+def age(root):
+    """
+    moves directory mtimes back, as for a tree crawled the night before
+    """
+    for path, _, _ in os.walk(root):
+        os.utime(path, ns=(OLD_TIME, OLD_TIME))
+
+
+def touch_dirs(root, num_dirs):
+    """
+    adds a file to the first num_dirs leaf directories
+    """
+    touched = 0
+    for path, dirs, _ in os.walk(root):
+        if not dirs and touched < num_dirs:
+            with open(os.path.join(path, "added.jpg"), "w"):
+                pass
+            touched += 1
+
+
+def timed(name, func):
+    """
+    reports the runtime of func
+    """
+    start = time.time()
+    result = func()
+    print(f"{name}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+    return result
+
+
+if __name__ == "__main__":
+    NUM_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    ROOT = tempfile.mkdtemp(prefix="filelister_refresh_")
+
+    print(f"Writing {NUM_FILES} files to {ROOT}")
+    make_tree(ROOT, NUM_FILES)
+    age(ROOT)
+    print("\n")
+
+    try:
+        flist = timed("Full crawl", lambda: fs.Filelist(ROOT))
+        timed("Refresh, nothing changed", flist.refresh)
+        touch_dirs(ROOT, 10)
+        added, removed = timed("Refresh, 10 directories changed", flist.refresh)
+        print(f"Added: {len(added)}, removed: {len(removed)}\n")
+        timed("Full crawl after changes", lambda: fs.Filelist(ROOT))
+    finally:
+        shutil.rmtree(ROOT)
@@ -0,0 +1,86 @@
+"""
+Benchmarking for directory scanning
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import filelister as fs
+from tqdm import tqdm
+
+
+def make_tree(root, num_files, files_per_dir=1000, dirs_per_level=32):
+    """
+    writes a synthetic tree of empty files, nested two directories deep
+    """
+    num_dirs = -(-num_files // files_per_dir)
+    written = 0
+    for dir_idx in tqdm(range(num_dirs)):
+        dirname = os.path.join(
+            root,
+            f"level_{str(dir_idx // dirs_per_level).zfill(4)}",
+            f"dir_{str(dir_idx).zfill(6)}",
+        )
+        os.makedirs(dirname)
+        for _ in range(min(files_per_dir, num_files - written)):
+            with open(
+                os.path.join(dirname, f"sample_{str(written).zfill(9)}.jpg"), "w"
+            ):
+                pass
+            written += 1
+
+
+def walk_list(root):
+    """
+    lists a tree the way Filelist did before the scandir crawler
+    """
+    tmp = []
+    for path, _, files in os.walk(root):
+        for filename in files:
+            tmp.append(path + os.sep + filename)
+    return tmp
+
+
+def benchmark(name, func, iterations):
+    """
+    reports wall-clock time of func over iterations
+    """
+    runtimes = []
+    for _ in range(iterations):
+        start = time.time()
+        result = func()
+        end = time.time()
+        runtimes.append(end - start)
+    print(f"{name}")
+    print(f"Entries: {len(result)}")
+    print(f"Average execution time: {sum(runtimes) / iterations} seconds")
+    print(f"Min execution time: {min(runtimes)} seconds\n")
+
+
+if __name__ == "__main__":
+    NUM_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    NUM_ITERATIONS = 3
+    ROOT = tempfile.mkdtemp(prefix="filelister_scan_")
+
+    print(f"Writing {NUM_FILES} files to {ROOT}")
+    make_tree(ROOT, NUM_FILES)
+    print("\n")
+
+    try:
+        benchmark("os.walk list", lambda: walk_list(ROOT), NUM_ITERATIONS)
+        benchmark("crawl", lambda: list(fs.crawl(ROOT)), NUM_ITERATIONS)
+        for workers in (2, 4, 8, 16):
+            benchmark(
+                f"crawl, {workers} workers",
+                lambda: list(fs.crawl(ROOT, workers=workers)),
+                NUM_ITERATIONS,
+            )
+        benchmark("Filelist", lambda: fs.Filelist(ROOT), NUM_ITERATIONS)
+        benchmark(
+            "Filelist, 8 workers", lambda: fs.Filelist(ROOT, workers=8), NUM_ITERATIONS
+        )
+    finally:
+        shutil.rmtree(ROOT)
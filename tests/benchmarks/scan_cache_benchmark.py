@@ -0,0 +1,60 @@
+"""
+Benchmarking for loading crawls from a persistent scan cache
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import filelister as fs
+from scan_benchmark import make_tree
+
+
+def benchmark(name, func, iterations):
+    """
+    reports wall-clock time of func over iterations
+    """
+    runtimes = []
+    for _ in range(iterations):
+        start = time.time()
+        flist = func()
+        runtimes.append(time.time() - start)
+    print(f"{name}")
+    print(f"Entries: {len(flist)}")
+    print(f"Average execution time: {sum(runtimes) / iterations} seconds")
+    print(f"Min execution time: {min(runtimes)} seconds\n")
+
+
+if __name__ == "__main__":
+    NUM_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    NUM_ITERATIONS = 3
+    ROOT = tempfile.mkdtemp(prefix="filelister_scan_cache_")
+    TREE = os.path.join(ROOT, "tree")
+
+    print(f"Writing {NUM_FILES} files to {TREE}")
+    make_tree(TREE, NUM_FILES)
+    print("\n")
+    validated = fs.ScanCache(os.path.join(ROOT, "cache"))
+    trusted = fs.ScanCache(os.path.join(ROOT, "cache"), validate=False)
+
+    try:
+        benchmark("Filelist, no cache", lambda: fs.Filelist(TREE), NUM_ITERATIONS)
+        benchmark(
+            "Filelist, cold cache",
+            lambda: validated.clear() or fs.Filelist(TREE, cache=validated),
+            NUM_ITERATIONS,
+        )
+        benchmark(
+            "Filelist, cache hit validated by directory mtimes",
+            lambda: fs.Filelist(TREE, cache=validated),
+            NUM_ITERATIONS,
+        )
+        benchmark(
+            "Filelist, cache hit trusted",
+            lambda: fs.Filelist(TREE, cache=trusted),
+            NUM_ITERATIONS,
+        )
+    finally:
+        shutil.rmtree(ROOT)
@@ -0,0 +1,55 @@
+"""
+Benchmarking for set algebra between Filelists
+"""
+
+import sys
+import time
+
+import filelister as fs
+
+
+def make_paths(start, stop):
+    """
+    builds synthetic absolute paths for indices start to stop
+    """
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+        for idx in range(start, stop)
+    ]
+
+
+def timed(name, func):
+    """
+    reports the runtime and size of the Filelist returned by func
+    """
+    start = time.time()
+    result = func()
+    print(f"{name}")
+    print(f"Entries: {len(result)}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+
+
+def loop_difference(left, right):
+    """
+    diffs two Filelists the way callers had to before the set operators
+    """
+    return fs.Filelist([path for path in left if path not in right])
+
+
+def benchmark(num_paths):
+    """
+    times each operator on two Filelists overlapping by half
+    """
+    print(f"Benchmarking set operations on 2 x {num_paths} paths\n")
+    left = fs.Filelist(make_paths(0, num_paths))
+    right = fs.Filelist(make_paths(num_paths // 2, num_paths + num_paths // 2))
+
+    timed("difference (loop)", lambda: loop_difference(left, right))
+    timed("difference (-)", lambda: left - right)
+    timed("intersection (&)", lambda: left & right)
+    timed("union (|)", lambda: left | right)
+    timed("symmetric difference (^)", lambda: left ^ right)
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000000)
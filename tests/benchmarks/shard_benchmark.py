@@ -0,0 +1,70 @@
+"""
+Benchmarking for sharding and partitioning Filelists
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import filelister as fs
+
+
+def make_paths(start, stop):
+    """
+    builds synthetic absolute paths for indices start to stop
+    """
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/sample_{str(idx).zfill(9)}.jpg"
+        for idx in range(start, stop)
+    ]
+
+
+def timed(name, func):
+    """
+    reports the runtime of func
+    """
+    start = time.time()
+    func()
+    print(f"{name}")
+    print(f"Execution time: {time.time() - start} seconds\n")
+
+
+def split_lists(flist, num_parts):
+    """
+    partitions by hash the way it is done by hand, into a list per part
+    """
+    parts = [[] for _ in range(num_parts)]
+    for path in flist:
+        parts[fs.stable_hash(path) % num_parts].append(path)
+    return [fs.Filelist(part) for part in parts]
+
+
+def save_lists(flist, num_parts, pattern):
+    """
+    builds a Filelist per part by hand and saves each one
+    """
+    for part, part_flist in enumerate(split_lists(flist, num_parts)):
+        part_flist.save(pattern.format(part))
+
+
+def benchmark(num_paths, num_parts):
+    """
+    times partitioning and saving num_parts shards of num_paths paths
+    """
+    print(f"Benchmarking {num_parts} shards of {num_paths} paths\n")
+    flist = fs.Filelist(make_paths(0, num_paths))
+    with tempfile.TemporaryDirectory() as tmp:
+        pattern = os.path.join(tmp, "shard_{}.txt")
+        timed("split into lists", lambda: split_lists(flist, num_parts))
+        timed("partition", lambda: flist.partition(num_parts=num_parts))
+        timed("shard (one)", lambda: flist.shard(num_parts, 0))
+        timed("shard (range)", lambda: flist.shard(num_parts, 0, by="range"))
+        timed("save lists", lambda: save_lists(flist, num_parts, pattern))
+        timed("save_shards", lambda: flist.save_shards(pattern, num_parts))
+        timed("save_shards (dir)", lambda: flist.save_shards(pattern, key="dir"))
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    benchmark(size, 16)
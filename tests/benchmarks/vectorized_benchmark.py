@@ -0,0 +1,60 @@
+"""
+Benchmarking for numpy-backed bulk operations against per-path loops
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import filelister as fs
+
+FILELIST = sys.modules["filelister.Filelist"]
+
+
+def make_paths(num_paths):
+    """
+    builds synthetic absolute paths with mixed extensions
+    """
+    exts = (".jpg", ".png", ".txt", ".json")
+    return [
+        f"/data/images/dir_{str(idx // 1000).zfill(5)}/"
+        f"sample_{str((idx * 7919) % num_paths).zfill(9)}{exts[idx % len(exts)]}"
+        for idx in range(num_paths)
+    ]
+
+
+def timed(name, func, iterations):
+    """
+    reports the average and best runtime of func
+    """
+    runtimes = []
+    for _ in range(iterations):
+        start = time.time()
+        func()
+        runtimes.append(time.time() - start)
+    print(f"{name}")
+    print(f"Average execution time: {sum(runtimes) / iterations} seconds")
+    print(f"Min execution time: {min(runtimes)} seconds\n")
+
+
+def benchmark(flist, outfile, iterations):
+    """
+    times filter_exts, sorted and save with and without numpy
+    """
+    for vectorized in (False, True):
+        FILELIST.HAS_NUMPY = vectorized
+        label = "numpy" if vectorized else "loop"
+        timed(f"filter_exts ({label})", lambda: flist.filter_exts({".jpg"}), iterations)
+        timed(f"sorted ({label})", flist.sorted, iterations)
+        timed(f"save ({label})", lambda: flist.save(outfile), iterations)
+    FILELIST.HAS_NUMPY = sys.modules["filelister.PathArray"].HAS_NUMPY
+
+
+if __name__ == "__main__":
+    NUM_PATHS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    NUM_ITERATIONS = 3
+    print(f"Benchmarking {NUM_PATHS} paths\n")
+    test_list = fs.Filelist(make_paths(NUM_PATHS))
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmark(test_list, os.path.join(tmp, "vectorized.txt"), NUM_ITERATIONS)
@@ -0,0 +1,42 @@
+"""Helpers and fixtures shared by the tests that crawl directory trees"""
+import os
+
+import pytest
+
+OLD_TIME = 1_000_000_000
+
+
+def write(root, rel_path, size=0, mtime=None):
+    """Writes a file of size bytes below root, with mtime in ns if given"""
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("x" * size)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def age(root):
+    """Moves every mtime back so the directories are not considered racy"""
+    for path, dirs, files in os.walk(root):
+        for name in dirs + files:
+            os.utime(os.path.join(path, name), ns=(OLD_TIME, OLD_TIME))
+    os.utime(root, ns=(OLD_TIME, OLD_TIME))
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    """
+    Returns a function writing files of size bytes at rel_paths below
+    tmp_path / name and ageing them, which returns the root
+    """
+
+    def make(rel_paths, name="tree", size=0):
+        root = str(tmp_path / name)
+        for rel_path in rel_paths:
+            write(root, rel_path, size)
+        age(root)
+        return root
+
+    return make
@@ -0,0 +1,108 @@
+"""Tests for Bloom filter membership tests on lazily read filelists"""
+import os
+
+import filelister as fs
+import pytest
+
+
+def make_paths(root, indices):
+    return [
+        os.path.join(root, f"dir_{idx % 13}", f"sample_{idx}.jpg") for idx in indices
+    ]
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path)
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = fs.BloomFilter.for_capacity(2000, 0.01)
+        keys = [f"file_{idx}".encode("utf-8") for idx in range(2000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+        assert bloom.count == 2000
+
+    def test_false_positive_rate(self):
+        bloom = fs.BloomFilter.for_capacity(5000, 0.01)
+        for idx in range(5000):
+            bloom.add(f"stored_{idx}".encode("utf-8"))
+        false_positives = sum(
+            f"absent_{idx}".encode("utf-8") in bloom for idx in range(20000)
+        )
+        assert false_positives / 20000 < 0.02
+
+    def test_round_trip(self):
+        bloom = fs.BloomFilter.for_capacity(10, 0.05)
+        bloom.add(b"dir/file.jpg")
+        loaded, source_size = fs.BloomFilter.from_bytes(bloom.to_bytes(123))
+        assert source_size == 123
+        assert b"dir/file.jpg" in loaded
+        assert loaded.num_hashes == bloom.num_hashes
+        with pytest.raises(ValueError):
+            fs.BloomFilter.from_bytes(b"not a bloom filter at all, not even close")
+
+    def test_invalid_error_rate(self):
+        with pytest.raises(ValueError):
+            fs.BloomFilter.for_capacity(10, 1.5)
+
+
+class TestSavedBloom:
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            ("paths.txt", {}),
+            ("paths.flb", {"binary": True}),
+            ("paths.zz", {"compressed": True, "block_size": 16}),
+        ],
+    )
+    def test_lazy_membership(self, root, name, options):
+        paths = make_paths(root, range(200))
+        outfile = os.path.join(root, name)
+        fs.Filelist(paths).save(outfile, bloom=0.01, **options)
+        assert os.path.exists(outfile + ".bloom")
+
+        flist = fs.read_filelist(outfile, lazy=True)
+        storage = flist._data_storage
+        assert storage.bloom is not None
+        for idx in (0, 57, 199):
+            assert paths[idx] in flist
+            assert flist.index(paths[idx]) == idx
+        absent = make_paths(root, range(200, 400))
+        assert not any(path in flist for path in absent)
+        rejected = sum(storage.query_suffix(path) is None for path in absent)
+        assert rejected > 180
+        storage.close()
+
+    def test_relative_filelist(self, root, monkeypatch):
+        monkeypatch.chdir(os.path.dirname(root))
+        paths = [os.path.relpath(path) for path in make_paths(root, range(50))]
+        outfile = os.path.join(root, "rel.txt")
+        fs.Filelist(paths).save(outfile, output_type="rel", bloom=True)
+        flist = fs.read_filelist(outfile, lazy=True)
+        assert flist._data_storage.bloom is not None
+        assert all(path in flist for path in paths)
+        flist._data_storage.close()
+
+    def test_stale_bloom_ignored(self, root):
+        outfile = os.path.join(root, "paths.txt")
+        fs.Filelist(make_paths(root, range(100))).save(outfile, bloom=True)
+        fs.Filelist(make_paths(root, range(100, 200))).save(outfile)
+        assert not os.path.exists(outfile + ".bloom")
+
+        fs.Filelist(make_paths(root, range(100))).save(outfile, bloom=True)
+        with open(outfile, "a", encoding="utf-8") as f:
+            f.write(os.linesep + make_paths(root, [500])[0])
+        flist = fs.read_filelist(outfile, lazy=True)
+        assert flist._data_storage.bloom is None
+        assert make_paths(root, [500])[0] in flist
+        flist._data_storage.close()
+
+    def test_eager_read_ignores_bloom(self, root):
+        outfile = os.path.join(root, "paths.txt")
+        fs.Filelist(make_paths(root, range(100))).save(outfile, bloom=True)
+        flist = fs.read_filelist(outfile)
+        assert flist._data_storage.bloom is None
+        assert make_paths(root, [5])[0] in flist
@@ -0,0 +1,85 @@
+"""Tests for the directory crawler"""
+import os
+
+import filelister as fs
+import pytest
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    root = tmp_path_factory.mktemp("tree")
+    for rel_path in [
+        "a.txt",
+        "sub/b.txt",
+        "sub/deeper/c.jpg",
+        "skip/d.txt",
+        "other/e.txt",
+    ]:
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("")
+    return str(root)
+
+
+def walk_suffixes(root):
+    return [
+        os.path.relpath(os.path.join(path, filename), root)
+        for path, _, files in os.walk(root)
+        for filename in files
+    ]
+
+
+class TestCrawl:
+    def test_matches_os_walk(self, tree):
+        assert list(fs.crawl(tree)) == walk_suffixes(tree)
+
+    def test_prune_by_name(self, tree):
+        crawled = list(fs.crawl(tree, prune=["skip", "deeper"]))
+        assert sorted(crawled) == sorted(["a.txt", "sub/b.txt", "other/e.txt"])
+
+    def test_prune_by_callable(self, tree):
+        crawled = list(fs.crawl(tree, prune=lambda entry: entry.name == "sub"))
+        assert "sub/b.txt" not in crawled
+        assert "sub/deeper/c.jpg" not in crawled
+        assert "skip/d.txt" in crawled
+
+    def test_does_not_follow_dir_symlinks(self, tree, tmp_path):
+        os.symlink(os.path.join(tree, "sub"), os.path.join(tmp_path, "link"))
+        assert list(fs.crawl(str(tmp_path))) == []
+
+
+class TestFilelistFromDir:
+    def test_prefix_is_root(self, tree):
+        flist = fs.Filelist(tree + os.sep)
+        assert flist._prefixes["curr"] == tree
+        assert set(flist.to_list()) == {
+            os.path.join(tree, path) for path in walk_suffixes(tree)
+        }
+
+    def test_prune(self, tree):
+        flist = fs.Filelist(tree, prune=["skip"])
+        assert os.path.join(tree, "skip/d.txt") not in flist
+        assert os.path.join(tree, "sub/deeper/c.jpg") in flist
+
+    def test_accepted_exts(self, tree):
+        flist = fs.Filelist(tree, [".jpg"])
+        assert flist.to_list() == [os.path.join(tree, "sub/deeper/c.jpg")]
+
+
+class TestParallelCrawl:
+    def test_matches_serial_order(self, tree):
+        assert list(fs.crawl(tree, workers=4)) == list(fs.crawl(tree))
+
+    def test_prune(self, tree):
+        assert list(fs.crawl(tree, prune=["sub"], workers=4)) == list(
+            fs.crawl(tree, prune=["sub"])
+        )
+
+    def test_early_exit(self, tree):
+        crawler = fs.crawl(tree, workers=2)
+        next(crawler)
+        crawler.close()
+
+    def test_filelist_workers(self, tree):
+        assert fs.Filelist(tree, workers=4).to_list() == fs.Filelist(tree).to_list()
@@ -2,6 +2,7 @@ from ctypes import c_wchar_p
 
 import filelister as fs
 import pytest
+from filelister.HashIndex import HashIndex
 
 test_data = [
     ("/home/christian/dir/filename_00.jpg", "./dir/filename_00.jpg"),
@@ -15,71 +16,97 @@ test_data = [
 abs_test_data = [item[0] for item in test_data]
 rel_test_data = [item[1] for item in test_data]
 
+test_prefixes = {"abs": "/home/christian", "rel": ".", "curr": "/home/christian"}
+
 
 def generator(data):
     for value in data:
-        yield value[0], value[1]
+        yield value[0][len(test_prefixes["abs"]) + 1 :]
 
 
-def compare_color(value, color):
-    if color == "red":
-        start, stop = "\x1b[31m", "\x1b[0m\n"
-        return value.startswith(start) and value.endswith(stop)
+def make_storage(data):
+    return fs.DataStorage(generator(data), test_prefixes)
 
 
 class TestDataStorage:
     def test_instantiation(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
 
     def test_initialize_paths(self):
-        storage = fs.DataStorage(generator(test_data))
-        assert isinstance(storage.paths, dict)
-        for path in storage.paths["abs"] + storage.paths["rel"]:
-            assert isinstance(path, str)
+        storage = make_storage(test_data)
+        assert isinstance(storage.buffer, bytearray)
+        assert len(storage.offsets) == len(test_data) + 1
+        assert storage.abs_paths() == abs_test_data
+        assert storage.rel_paths() == rel_test_data
+
+    def test_suffixes_stored_once(self):
+        storage = make_storage(test_data)
+        assert list(storage.suffixes()) == [
+            path[len(test_prefixes["abs"]) + 1 :] for path in abs_test_data
+        ]
+        assert bytes(storage.buffer) == "".join(storage.suffixes()).encode("utf-8")
 
     def test_initialize_lookup(self):
-        storage = fs.DataStorage(generator(test_data))
-        assert isinstance(storage.lookup, dict)
-        for entry in storage.lookup:
-            assert isinstance(entry, str)
-            assert isinstance(storage.lookup[entry], int)
+        storage = make_storage(test_data)
+        assert isinstance(storage.lookup, HashIndex)
+        assert storage.lookup.counter == len(test_data)
+        for idx, suffix in enumerate(storage.suffixes()):
+            assert storage.lookup.find(suffix.encode("utf-8"), storage._raw) == idx
+
+    def test_index_queries(self):
+        storage = make_storage(test_data)
+        for idx, (abs_path, rel_path) in enumerate(test_data):
+            suffix = abs_path[len(test_prefixes["abs"]) + 1 :]
+            assert storage.index(abs_path) == idx
+            assert storage.index(rel_path) == idx
+            assert storage.index(suffix) == idx
+            assert storage.count(abs_path) == 1
+        assert storage.count("/home/christian/missing.jpg") == 0
+        with pytest.raises(ValueError):
+            storage.index("/elsewhere/dir/filename_00.jpg")
 
-    def test_initialize_curr_idx(self):
-        storage = fs.DataStorage(generator(test_data))
-        assert storage.curr_idx == 0
+    def test_independent_iterators(self):
+        storage = make_storage(test_data)
+        assert iter(storage) is not storage
+        assert list(zip(storage, storage)) == list(zip(test_data, test_data))
+        outer = iter(storage)
+        next(outer)
+        assert list(storage) == test_data
+        assert list(outer) == test_data[1:]
 
     def test_len(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert len(storage) == len(test_data)
 
     def test_disallow_duplicates(self, capsys):
         dupe_test_data = test_data * 2
-        storage = fs.DataStorage(generator(dupe_test_data))
+        storage = make_storage(dupe_test_data)
         assert len(storage) == len(test_data)
 
-    def test_disallow_warning(self, capsys):
-        dupe_test_data = test_data + [test_data[0]]
-        storage = fs.DataStorage(generator(dupe_test_data))
-        captured = capsys.readouterr()
-        assert "WARN: Path is already stored. Skipping." in captured.out
-        assert compare_color(str(captured.out), "red") == True
+    def test_disallow_warning(self, caplog):
+        dupe_test_data = test_data + [test_data[0], test_data[0]]
+        storage = make_storage(dupe_test_data)
+        assert storage.diagnostics.counts["duplicate"] == 2
+        assert storage.diagnostics.samples["duplicate"] == ["dir/filename_00.jpg"] * 2
+        assert len(caplog.records) == 1
+        assert "Left out 2 duplicate path(s)" in caplog.text
 
     def test_getitem_by_index(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         for idx, test_item in enumerate(test_data):
             item = storage[idx]
             assert item[0] == test_item[0]
             assert item[1] == test_item[1]
 
     def test_getitem_by_slice_start(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert storage[2:][0] == abs_test_data[2:]
         assert storage[2:][1] == rel_test_data[2:]
         assert storage[-2:][0] == abs_test_data[-2:]
         assert storage[-2:][1] == rel_test_data[-2:]
 
     def test_getitem_by_slice_start_stop(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert storage[1:3][0] == abs_test_data[1:3]
         assert storage[1:3][1] == rel_test_data[1:3]
         assert storage[-1:3][0] == abs_test_data[-1:3]
@@ -88,7 +115,7 @@ class TestDataStorage:
         assert storage[-3:-1][1] == rel_test_data[-3:-1]
 
     def test_getitem_by_slice_start_stop_step(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert storage[1:4:2][0] == abs_test_data[1:4:2]
         assert storage[1:4:2][1] == rel_test_data[1:4:2]
         assert storage[-1:4:2][0] == abs_test_data[-1:4:2]
@@ -99,48 +126,195 @@ class TestDataStorage:
         assert storage[-1:-4:-2][1] == rel_test_data[-1:-4:-2]
 
     def test_getitem_by_slice_stop(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert storage[:2][0] == abs_test_data[:2]
         assert storage[:2][1] == rel_test_data[:2]
         assert storage[:-2][0] == abs_test_data[:-2]
         assert storage[:-2][1] == rel_test_data[:-2]
 
     def test_getitem_by_slice_stop_step(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert storage[:4:2][0] == abs_test_data[:4:2]
         assert storage[:4:2][1] == rel_test_data[:4:2]
         assert storage[:4:-2][0] == abs_test_data[:4:-2]
         assert storage[:4:-2][1] == rel_test_data[:4:-2]
 
     def test_getitem_by_slice_step(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         assert storage[::2][0] == abs_test_data[::2]
         assert storage[::2][1] == rel_test_data[::2]
         assert storage[::-2][0] == abs_test_data[::-2]
         assert storage[::-2][1] == rel_test_data[::-2]
 
     def test_getitem_throws_typeerror(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         with pytest.raises(
             TypeError, match=r"indices must be integers or slices, not "
         ):
             storage["hello"]
 
     def test_contains(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         for item in test_data:
             assert item[0] in storage
             assert item[1] in storage
         assert "hello" not in storage
+        assert "dir/filename_00.jpg" in storage
+        assert "/home/other/dir/filename_00.jpg" not in storage
+
+    def test_index(self):
+        storage = make_storage(test_data)
+        for idx, item in enumerate(test_data):
+            assert storage.index(item[0]) == idx
+            assert storage.index(item[1]) == idx
+        with pytest.raises(ValueError, match=r"is not in DataStorage"):
+            storage.index("hello")
+
+    def test_getitem_out_of_range(self):
+        storage = make_storage(test_data)
+        assert storage[-1] == test_data[-1]
+        with pytest.raises(IndexError, match=r"index out of range"):
+            storage[len(test_data)]
 
     def test_iteration(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         curr = 0
         for item in storage:
             assert item == test_data[curr]
             curr += 1
 
+    def test_iter_paths(self):
+        storage = make_storage(test_data)
+        assert list(storage.iter_paths("abs")) == abs_test_data
+        assert list(storage.iter_paths("rel", range(1, 3))) == rel_test_data[1:3]
+        storage.remove(abs_test_data[2])
+        assert list(storage.iter_paths("rel")) == rel_test_data[:2] + rel_test_data[3:]
+        assert list(storage.iter_paths("rel", range(1, 4))) == [
+            rel_test_data[1],
+            rel_test_data[3],
+            rel_test_data[4],
+        ]
+
+    def test_iter_chunks(self):
+        storage = make_storage(test_data)
+        chunks = list(storage.iter_chunks(4))
+        assert [len(chunk) for chunk in chunks] == [4, 2]
+        assert sum(chunks, []) == abs_test_data
+        assert list(storage.iter_chunks(10, "rel")) == [rel_test_data]
+        with pytest.raises(ValueError):
+            next(storage.iter_chunks(0))
+
     def test_enumeration(self):
-        storage = fs.DataStorage(generator(test_data))
+        storage = make_storage(test_data)
         for idx, item in enumerate(storage):
             assert item == test_data[idx]
+
+    def test_subset(self):
+        storage = make_storage(test_data)
+        mask = [idx in (1, 4) for idx in range(len(test_data))]
+        assert storage.subset(mask, prefixes=test_prefixes)[:] == (
+            [abs_test_data[1], abs_test_data[4]],
+            [rel_test_data[1], rel_test_data[4]],
+        )
+        inverted = storage.subset(mask, invert=True, prefixes=test_prefixes)
+        assert inverted[:][0] == [abs_test_data[i] for i in (0, 2, 3, 5)]
+        assert inverted.index(abs_test_data[5]) == 3
+
+    def test_contains_suffixes(self):
+        storage = make_storage(test_data)
+        storage.remove(abs_test_data[2])
+        queries = ["dir/filename_01.jpg", "dir/filename_02.jpg", None, "dir"]
+        assert storage.contains_suffixes(queries) == [True, False, False, False]
+
+    def test_concat(self):
+        first = make_storage(test_data[:2])
+        second = make_storage(test_data[2:])
+        storage = fs.DataStorage.concat([first, second], test_prefixes)
+        assert storage[:][0] == abs_test_data
+        for idx, path in enumerate(abs_test_data):
+            assert storage.index(path) == idx
+
+    def test_append_and_extend(self):
+        storage = make_storage(test_data[:2])
+        storage.append("dir/filename_02.jpg")
+        storage.extend(["dir/filename_03.jpg", "dir/filename_04.jpg"])
+        assert storage[:][0] == abs_test_data[:5]
+        assert storage.index(abs_test_data[4]) == 4
+        assert abs_test_data[3] in storage
+
+    def test_append_duplicate(self, caplog):
+        storage = make_storage(test_data)
+        storage.append("dir/filename_00.jpg")
+        assert len(storage) == len(test_data)
+        assert "Left out 1 duplicate path(s)" in caplog.text
+        caplog.clear()
+        storage.extend(["dir/filename_01.jpg", "dir/new.jpg", "dir/filename_02.jpg"])
+        assert len(caplog.records) == 1
+        assert "Left out 2 duplicate path(s), 3 in total" in caplog.text
+
+    def test_remove(self):
+        storage = make_storage(test_data)
+        storage.remove(abs_test_data[1])
+        storage.remove(rel_test_data[4])
+        kept = [abs_test_data[i] for i in (0, 2, 3, 5)]
+        assert len(storage) == 4
+        assert storage[:][0] == kept
+        assert [storage[i][0] for i in range(-4, 4)] == kept + kept
+        assert [storage.index(path) for path in kept] == [0, 1, 2, 3]
+        assert abs_test_data[1] not in storage
+        with pytest.raises(ValueError, match=r"is not in DataStorage"):
+            storage.remove(abs_test_data[1])
+        storage.compact()
+        assert storage.tombstones == []
+        assert storage[:][0] == kept
+        assert [storage.index(path) for path in kept] == [0, 1, 2, 3]
+
+    def test_remove_then_append(self):
+        storage = make_storage(test_data)
+        storage.remove(abs_test_data[0])
+        storage.append("dir/filename_00.jpg")
+        assert storage[:][0] == abs_test_data[1:] + abs_test_data[:1]
+        assert storage.index(abs_test_data[0]) == 5
+
+    def test_periodic_compaction(self):
+        storage = fs.DataStorage((f"file_{idx}" for idx in range(8000)))
+        for idx in range(0, 8000, 2):
+            storage.remove(f"file_{idx}")
+        assert len(storage.tombstones) < 2000
+        assert list(storage.suffixes()) == [f"file_{idx}" for idx in range(1, 8000, 2)]
+        assert storage.index("file_7999") == 3999
+
+    def test_non_ascii_suffixes(self):
+        suffixes = ["dir/ä.jpg", "dir/\udcff.jpg", "dir/plain.jpg", "dir/日本.jpg"]
+        storage = fs.DataStorage(iter(suffixes))
+        storage.remove("dir/plain.jpg")
+        assert list(storage.suffixes()) == [suffixes[0], suffixes[1], suffixes[3]]
+        assert storage.index("dir/日本.jpg") == 2
+        assert fs.DataStorage(iter(suffixes[1:3])).suffix(0) == suffixes[1]
+        assert list(fs.DataStorage(iter(suffixes[1:3])).suffixes()) == suffixes[1:3]
+
+
+class TestHashIndex:
+    def test_grow_and_delete(self):
+        keys = [f"file_{idx}".encode("utf-8") for idx in range(5000)]
+        index = HashIndex.empty(0)
+        for idx, key in enumerate(keys):
+            assert index.insert(key, idx, keys.__getitem__) == idx
+        assert index.insert(keys[7], 5000, keys.__getitem__) == 7
+        assert len(index.table) >= 2 * len(keys)
+        for idx in range(0, 5000, 3):
+            assert index.delete(keys[idx], keys.__getitem__) == idx
+        assert index.delete(keys[0], keys.__getitem__) == -1
+        for idx, key in enumerate(keys):
+            expected = -1 if idx % 3 == 0 else idx
+            assert index.find(key, keys.__getitem__) == expected
+        assert index.counter == sum(1 for slot in index.table if slot)
+
+    def test_build(self):
+        keys = [f"file_{idx}".encode("utf-8") for idx in range(100)]
+        repeated = keys + keys[:3]
+        index, duplicates = HashIndex.build(repeated, repeated.__getitem__)
+        assert duplicates == [100, 101, 102]
+        assert index.counter == 100
+        assert [index.find(key, keys.__getitem__) for key in keys] == list(range(100))
+        assert index.find(b"missing", keys.__getitem__) == -1
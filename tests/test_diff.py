@@ -0,0 +1,101 @@
+"""Tests for the external sorted-merge diff"""
+import os
+import random
+import sys
+
+import filelister as fs
+import pytest
+
+diff_module = sys.modules["filelister.diff"]
+
+
+def make_paths(indices):
+    return [f"/data/dir_{idx % 13}/file_{idx}.jpg" for idx in indices]
+
+
+@pytest.fixture(scope="module")
+def saved(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("diff")
+    old = make_paths(range(0, 600))
+    new = make_paths(range(400, 1000))
+    random.Random(0).shuffle(new)
+    paths = {"old": old, "new": new}
+    for name, save_kwargs in [
+        ("txt", {}),
+        ("zz", {"compressed": True}),
+        ("stream.zz", {"compressed": "stream"}),
+        ("flb", {"binary": True}),
+    ]:
+        for key in ("old", "new"):
+            ext = name.split(".")[-1]
+            outfile = os.path.join(out_dir, f"{key}_{name.replace('.', '_')}.{ext}")
+            fs.Filelist(paths[key]).save(outfile, **save_kwargs)
+            paths[f"{key}_{name}"] = outfile
+    return paths
+
+
+def expected_diff(old, new):
+    return (
+        sorted(set(new) - set(old)),
+        sorted(set(old) - set(new)),
+        sorted(set(old) & set(new)),
+    )
+
+
+def split_diff(diff):
+    diff = list(diff)
+    return tuple(
+        [path for status, path in diff if status == wanted]
+        for wanted in ("added", "removed", "common")
+    )
+
+
+class TestExternalSort:
+    def test_in_memory(self):
+        paths = make_paths([5, 3, 9, 3])
+        assert list(diff_module.external_sort(paths)) == sorted(
+            path.encode() for path in set(paths)
+        )
+
+    def test_spilled_runs(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(diff_module, "MAX_RUNS", 4)
+        paths = make_paths(random.Random(1).sample(range(500), 500) * 2)
+        result = list(
+            diff_module.external_sort(paths, memory_cap=2000, tmp_dir=tmp_path)
+        )
+        assert result == sorted(path.encode() for path in set(paths))
+        assert os.listdir(tmp_path) == []
+
+
+class TestDiff:
+    @pytest.mark.parametrize("fmt", ["txt", "zz", "stream.zz", "flb"])
+    def test_formats(self, saved, fmt):
+        diff = fs.diff_filelists(
+            saved[f"old_{fmt}"], saved[f"new_{fmt}"], memory_cap=4096
+        )
+        assert split_diff(diff) == expected_diff(saved["old"], saved["new"])
+
+    def test_mixed_formats(self, saved):
+        diff = fs.diff_filelists(saved["old_flb"], saved["new_txt"])
+        assert split_diff(diff) == expected_diff(saved["old"], saved["new"])
+
+    def test_relative_filelists(self, tmp_path):
+        paths = [str(tmp_path / "data" / f"{idx}.txt") for idx in range(10)]
+        os.makedirs(tmp_path / "a")
+        old = str(tmp_path / "a" / "old.txt")
+        new = str(tmp_path / "new.txt")
+        fs.Filelist(paths[:6]).save(old, output_type="rel")
+        fs.Filelist(paths[3:]).save(new, output_type="rel")
+        assert split_diff(fs.diff_filelists(old, new)) == expected_diff(
+            paths[:6], paths[3:]
+        )
+
+    def test_write_diff(self, saved, tmp_path):
+        outfiles = {
+            status: str(tmp_path / f"{status}.txt") for status in ("added", "removed")
+        }
+        counts = fs.write_diff(saved["old_txt"], saved["new_txt"], **outfiles)
+        added, removed, common = expected_diff(saved["old"], saved["new"])
+        assert counts == (len(added), len(removed), len(common))
+        assert fs.read_filelist(outfiles["added"]).to_list() == added
+        assert fs.read_filelist(outfiles["removed"]).to_list() == removed
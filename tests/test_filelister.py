@@ -1,9 +1,13 @@
 """Tests for Filelist"""
 import os
+import sys
+import tracemalloc
+import zlib
 from pathlib import Path
 
 import filelister as fs
 import pytest
+from filelister.PathArray import HAS_NUMPY
 
 FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "tmp_dir")
 
@@ -51,6 +55,14 @@ def data_pfx(tmp_dir):
     }
 
 
+@pytest.fixture(scope="session")
+def many_abs(tmp_dir):
+    return [
+        os.path.join(os.path.abspath(tmp_dir["data"]), f"dir_{i % 7}", f"{i}.jpg")
+        for i in range(250)
+    ]
+
+
 @pytest.fixture(scope="session")
 def data_no_ctx(tmp_dir):
     return ["sample_data_01.txt", "sample_data_02.txt", "sample_data_03.txt"]
@@ -120,6 +132,14 @@ class TestCreateFromType:
         assert flist._prefixes["abs"] == os.path.abspath(".")
         assert flist._prefixes["rel"] == ""
 
+    def test_from_storage(self, data_abs):
+        flist = fs.Filelist(data_abs)
+        copy = fs.Filelist.from_storage(flist.storage, os.path.dirname(data_abs[0]))
+        assert copy.prefix == flist.prefix == os.path.dirname(data_abs[0])
+        assert copy.to_list() == data_abs
+        with pytest.raises(ValueError):
+            copy.refresh()
+
     def test_remove_bad_exts(self, tmp_dir, data_no_ctx):
         test_data = data_no_ctx + ["bad_file.png", "worse_file.tiff", "good_file.jpg"]
         flist = fs.Filelist(test_data, [".txt", ".jpg"])
@@ -384,3 +404,673 @@ class TestCompression:
         test_path = os.path.join(tmp_dir["flists"], "compressed_rel.zz")
         flist = fs.read_filelist(test_path, compressed=True)
         assert flist.to_list() == data_rel
+
+
+class TestLazyRead:
+    """
+    tests for memory-mapped reads of uncompressed filelists
+    """
+
+    def test_lazy_abs(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "lazy_abs.txt")
+        fs.Filelist(data_abs).save(test_path)
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert isinstance(flist._data_storage, fs.MappedStorage)
+        assert len(flist) == len(data_abs)
+        assert flist[1] == data_abs[1]
+        assert flist[-1] == data_abs[-1]
+        assert flist.to_list() == fs.read_filelist(test_path).to_list() == data_abs
+
+    def test_lazy_rel(self, tmp_dir, data_rel):
+        test_path = os.path.join(tmp_dir["flists"], "lazy_rel.txt")
+        fs.Filelist(data_rel).save(test_path)
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert flist.to_list() == data_rel
+        assert flist._prefixes == fs.Filelist(data_rel)._prefixes
+
+    def test_lazy_contains(self, tmp_dir, data_abs, data_rel):
+        test_path = os.path.join(tmp_dir["flists"], "lazy_contains.txt")
+        fs.Filelist(data_abs).save(test_path)
+        flist = fs.read_filelist(test_path, lazy=True)
+        for idx, path in enumerate(data_abs):
+            assert path in flist
+            assert data_rel[idx] in flist
+            assert flist._data_storage.index(path) == idx
+        assert "/not_a_file" not in flist
+        assert data_abs[0] + "x" not in flist
+
+    def test_lazy_trailing_newlines(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "lazy_trailing.txt")
+        with open(test_path, "w", encoding="utf-8") as f:
+            f.write(os.linesep.join(data_abs) + os.linesep * 3)
+        assert fs.read_filelist(test_path, lazy=True).to_list() == data_abs
+
+    def test_lazy_empty(self, tmp_dir):
+        test_path = os.path.join(tmp_dir["flists"], "lazy_empty.txt")
+        with open(test_path, "w", encoding="utf-8"):
+            pass
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert len(flist) == 0
+        assert "anything" not in flist
+
+
+class TestBinary:
+    """
+    tests for the binary indexed filelist format
+    """
+
+    def test_binary_abs_lazy(self, tmp_dir, data_abs, data_rel):
+        test_path = os.path.join(tmp_dir["flists"], "binary_abs.flb")
+        fs.Filelist(data_abs).save(test_path, binary=True)
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert isinstance(flist._data_storage, fs.BinaryStorage)
+        assert len(flist) == len(data_abs)
+        assert flist[3] == data_abs[3]
+        assert flist[-1] == data_abs[-1]
+        assert flist.to_list() == data_abs
+        for idx, path in enumerate(data_abs):
+            assert path in flist
+            assert data_rel[idx] in flist
+            assert flist._data_storage.index(path) == idx
+        assert "/not_a_file" not in flist
+        assert data_abs[0] + "x" not in flist
+
+    def test_binary_rel(self, tmp_dir, data_rel):
+        test_path = os.path.join(tmp_dir["flists"], "binary_rel.flb")
+        fs.Filelist(data_rel).save(test_path, binary=True)
+        flist = fs.read_filelist(test_path)
+        assert isinstance(flist._data_storage, fs.DataStorage)
+        assert flist.to_list() == data_rel
+        assert fs.read_filelist(test_path, lazy=True).to_list() == data_rel
+
+    def test_binary_without_hash_index(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "binary_no_index.flb")
+        fs.Filelist(data_abs).save(test_path, binary=True, hash_index=False)
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert flist._data_storage.hash_index is None
+        assert data_abs[2] in flist
+        assert "/not_a_file" not in flist
+
+    def test_binary_close(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "binary_close.flb")
+        fs.Filelist(data_abs).save(test_path, binary=True)
+        storage = fs.BinaryStorage(test_path)
+        assert storage.suffix(0) == "sample_01.txt"
+        storage.close()
+
+    @pytest.mark.parametrize("storage_type", ["BinaryStorage", "BlockStorage"])
+    @pytest.mark.parametrize("data", [b"\x00FL", b"\x00FLX" + bytes(60)])
+    def test_bad_header(self, tmp_dir, storage_type, data):
+        test_path = os.path.join(tmp_dir["flists"], "bad_header.flb")
+        with open(test_path, "wb") as f:
+            f.write(data)
+        with pytest.raises(TypeError, match="is not a version 1"):
+            getattr(fs, storage_type)(test_path)
+
+
+class TestStreamingCompression:
+    """
+    tests for chunked compression and decompression
+    """
+
+    def test_small_chunks_roundtrip(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "chunked.zz")
+        with open(test_path, "wb") as f:
+            fs.compression.write_compressed(f, iter(data_abs), "", chunk_size=7)
+        assert list(fs.compression.iter_compressed(test_path, chunk_size=5)) == data_abs
+
+    def test_matches_single_stream(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "chunked_stream.zz")
+        fs.Filelist(data_abs).save(test_path, compressed="stream")
+        with open(test_path, "rb") as f:
+            zdict = f.readline().strip()
+            data = zlib.decompressobj(zdict=zdict).decompress(f.read())
+        assert data.decode("utf-8") == ",".join(data_abs)
+
+    def test_read_compressed_rel(self, tmp_dir, data_rel):
+        test_path = os.path.join(tmp_dir["flists"], "streamed_rel.zz")
+        fs.Filelist(data_rel).save(test_path, compressed="stream")
+        flist = fs.read_filelist(test_path)
+        assert flist.to_list() == data_rel
+        assert flist._prefixes == fs.Filelist(data_rel)._prefixes
+
+    def test_empty_roundtrip(self, tmp_dir):
+        test_path = os.path.join(tmp_dir["flists"], "empty.zz")
+        fs.Filelist([]).save(test_path, compressed="stream")
+        assert len(fs.read_filelist(test_path, compressed=True)) == 0
+
+
+class TestBlockCompression:
+    """
+    tests for block-compressed filelists
+    """
+
+    def test_roundtrip(self, tmp_dir, many_abs):
+        test_path = os.path.join(tmp_dir["flists"], "blocks_abs.zz")
+        fs.Filelist(many_abs).save(test_path, compressed=True, block_size=16)
+        assert fs.compression.is_block_compressed(test_path)
+        flist = fs.read_filelist(test_path)
+        assert isinstance(flist._data_storage, fs.DataStorage)
+        assert flist.to_list() == many_abs
+        assert fs.read_filelist(test_path, workers=1).to_list() == many_abs
+
+    def test_lazy_slice_touches_needed_blocks(self, tmp_dir, many_abs):
+        test_path = os.path.join(tmp_dir["flists"], "blocks_lazy.zz")
+        fs.Filelist(many_abs).save(test_path, compressed=True, block_size=16)
+        flist = fs.read_filelist(test_path, lazy=True)
+        storage = flist._data_storage
+        assert isinstance(storage, fs.BlockStorage)
+        assert storage.num_blocks == 16
+        assert flist[100:120] == many_abs[100:120]
+        assert sorted(storage._cache) == [6, 7]
+        assert flist[-1] == many_abs[-1]
+        assert many_abs[42] in flist
+        assert storage.index(many_abs[42]) == 42
+        assert "/not_a_file" not in flist
+        storage.close()
+
+    def test_rel_roundtrip(self, tmp_dir, data_rel):
+        test_path = os.path.join(tmp_dir["flists"], "blocks_rel.zz")
+        fs.Filelist(data_rel).save(test_path, compressed=True, block_size=2)
+        assert fs.read_filelist(test_path, compressed=True).to_list() == data_rel
+
+
+class TestFrontCoding:
+    """
+    tests for front-coded filelists
+    """
+
+    def test_encode_decode(self):
+        suffixes = [b"a/b/c.jpg", b"a/b/d.jpg", b"", b"x" * 300, b"x" * 299 + b"y"]
+        encoded = fs.compression.front_encode(suffixes)
+        assert fs.compression.front_decode(encoded) == suffixes
+        assert len(encoded) < sum(len(suffix) for suffix in suffixes)
+
+    @pytest.mark.parametrize("codec", ["front", "front+zlib"])
+    def test_roundtrip(self, tmp_dir, many_abs, codec):
+        test_path = os.path.join(tmp_dir["flists"], f"{codec}.zz")
+        fs.Filelist(many_abs).save(test_path, compressed=codec, block_size=32)
+        assert fs.read_filelist(test_path, compressed=codec).to_list() == many_abs
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert flist[200] == many_abs[200]
+        assert many_abs[77] in flist
+
+    def test_unknown_codec(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "unknown_codec.zz")
+        with pytest.raises(ValueError, match=r"Unknown compression"):
+            fs.Filelist(data_abs).save(test_path, compressed="rar")
+        assert not os.path.exists(test_path)
+
+
+class TestCodecs:
+    """
+    tests for pluggable compression codecs
+    """
+
+    @pytest.mark.parametrize(
+        "codec", ["zlib:9", "lzma", "bz2:1", "none", "front+lzma", "front+bz2"]
+    )
+    def test_roundtrip_detects_codec(self, tmp_dir, many_abs, codec):
+        test_path = os.path.join(tmp_dir["flists"], f"codec_{codec}.txt")
+        fs.Filelist(many_abs).save(test_path, compressed=codec)
+        assert fs.read_filelist(test_path).to_list() == many_abs
+
+    @pytest.mark.parametrize("codec", ["zstd", "lz4"])
+    def test_optional_codecs(self, tmp_dir, many_abs, codec):
+        if codec not in fs.compression.CODECS:
+            with pytest.raises(ValueError, match=r"not installed"):
+                fs.Filelist(many_abs).save(
+                    os.path.join(tmp_dir["flists"], f"{codec}.zz"), compressed=codec
+                )
+            return
+        test_path = os.path.join(tmp_dir["flists"], f"{codec}.zz")
+        fs.Filelist(many_abs).save(test_path, compressed=codec)
+        assert fs.read_filelist(test_path).to_list() == many_abs
+
+    def test_parse_codec(self):
+        codec, level, front_coded = fs.compression.parse_codec("front+zlib:6")
+        assert (codec.name, level, front_coded) == ("zlib", 6, True)
+        codec, level, front_coded = fs.compression.parse_codec(True)
+        assert (codec.name, level, front_coded) == ("zlib", 1, False)
+        with pytest.raises(ValueError, match=r"Invalid compression level"):
+            fs.compression.parse_codec("lzma:high")
+
+    @pytest.mark.parametrize("codec", ["zlib:42", "bz2:0", "front+lzma:10", "none:1"])
+    def test_invalid_level(self, tmp_dir, data_abs, codec):
+        test_path = os.path.join(tmp_dir["flists"], "invalid_level.zz")
+        with pytest.raises(ValueError, match=r"Invalid compression level"):
+            fs.Filelist(data_abs).save(test_path, compressed=codec)
+        assert not os.path.exists(test_path)
+
+    def test_legacy_stream_detected_by_extension(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "legacy_stream.zz")
+        fs.Filelist(data_abs).save(test_path, compressed="stream")
+        assert fs.read_filelist(test_path).to_list() == data_abs
+
+
+filelist_module = sys.modules["filelister.Filelist"]
+path_array_module = sys.modules["filelister.PathArray"]
+vectorized_modes = [
+    False,
+    pytest.param(
+        True, marks=pytest.mark.skipif(not HAS_NUMPY, reason="numpy not installed")
+    ),
+]
+
+
+class TestVectorized:
+    """
+    tests that numpy-backed bulk operations match the per-path fallbacks
+    """
+
+    @pytest.mark.parametrize("vectorized", vectorized_modes)
+    def test_filter_exts(self, monkeypatch, data_abs, many_abs, vectorized):
+        monkeypatch.setattr(filelist_module, "HAS_NUMPY", vectorized)
+        flist = fs.Filelist(data_abs + many_abs)
+        assert flist.filter_exts({".jpg"}).to_list() == many_abs
+        assert flist.filter_exts([".txt", ".png"]).to_list() == data_abs
+
+    @pytest.mark.parametrize("vectorized", vectorized_modes)
+    def test_sorted(self, monkeypatch, data_rel, many_abs, vectorized):
+        monkeypatch.setattr(filelist_module, "HAS_NUMPY", vectorized)
+        flist = fs.Filelist(data_rel[::-1])
+        assert flist.sorted().to_list() == sorted(data_rel)
+        assert flist.sorted(reverse=True).to_list() == sorted(data_rel, reverse=True)
+        assert flist.sorted().is_rel()
+        assert fs.Filelist(many_abs).sorted().to_list() == sorted(many_abs)
+
+    @pytest.mark.skipif(not HAS_NUMPY, reason="numpy not installed")
+    @pytest.mark.parametrize("output_type", ["abs", "rel", "na"])
+    @pytest.mark.parametrize("chunk", [7, 1 << 14])
+    def test_save_matches_loop(
+        self, monkeypatch, tmp_dir, many_abs, output_type, chunk
+    ):
+        monkeypatch.setattr(path_array_module, "SAVE_CHUNK", chunk)
+        fast = os.path.join(tmp_dir["flists"], f"vectorized_{output_type}.txt")
+        slow = os.path.join(tmp_dir["flists"], f"looped_{output_type}.txt")
+        fs.Filelist(many_abs).save(fast, output_type=output_type)
+        monkeypatch.setattr(filelist_module, "HAS_NUMPY", False)
+        fs.Filelist(many_abs).save(slow, output_type=output_type)
+        with open(fast, "rb") as f_fast, open(slow, "rb") as f_slow:
+            assert f_fast.read() == f_slow.read()
+
+    @pytest.mark.skipif(not HAS_NUMPY, reason="numpy not installed")
+    def test_save_memory_is_bounded(self, monkeypatch, tmp_dir):
+        monkeypatch.setattr(path_array_module, "SAVE_CHUNK", 1000)
+        flist = fs.Filelist(
+            [f"/data/dir_{idx // 100}/{idx}.jpg" for idx in range(10**5)]
+        )
+        tracemalloc.start()
+        flist.save(os.path.join(tmp_dir["flists"], "bounded.txt"))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert peak < len(flist.storage.buffer) / 2
+
+
+class TestSetOperations:
+    """
+    tests for set algebra between Filelists
+    """
+
+    @pytest.fixture
+    def halves(self, many_abs):
+        return many_abs[:150], many_abs[100:]
+
+    def test_same_prefix(self, halves):
+        left, right = halves
+        flist_l, flist_r = fs.Filelist(left), fs.Filelist(right)
+        assert (flist_l | flist_r).to_list() == left + right[50:]
+        assert (flist_l & flist_r).to_list() == left[100:]
+        assert (flist_l - flist_r).to_list() == left[:100]
+        assert (flist_l ^ flist_r).to_list() == left[:100] + right[50:]
+        assert (
+            flist_l.symmetric_difference(flist_r).to_list()
+            == (flist_l ^ flist_r).to_list()
+        )
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_lazy_operands(self, tmp_dir, halves, binary):
+        left, right = halves
+        paths = []
+        for idx, half in enumerate(halves):
+            ext = ".flb" if binary else ".txt"
+            paths.append(os.path.join(tmp_dir["flists"], f"lazy_half_{idx}{ext}"))
+            fs.Filelist(half).save(paths[-1], binary=binary)
+        flist_l, flist_r = (fs.read_filelist(path, lazy=True) for path in paths)
+        assert (flist_l | flist_r).to_list() == left + right[50:]
+        assert (flist_l & flist_r).to_list() == left[100:]
+        assert (flist_l ^ flist_r).to_list() == left[:100] + right[50:]
+
+    def test_operands_unchanged(self, halves):
+        left, right = halves
+        flist_l, flist_r = fs.Filelist(left), fs.Filelist(right)
+        flist_l | flist_r
+        flist_l - flist_r
+        assert flist_l.to_list() == left
+        assert flist_r.to_list() == right
+
+    def test_different_prefixes(self, many_abs):
+        nested = [path for path in many_abs if "dir_3" in path]
+        outer = fs.Filelist(many_abs[:20])
+        inner = fs.Filelist(nested)
+        assert (outer & inner).to_list() == [
+            path for path in many_abs[:20] if path in nested
+        ]
+        assert (inner & outer).to_list() == [
+            path for path in nested if path in many_abs[:20]
+        ]
+        assert (outer | inner).to_list() == many_abs[:20] + [
+            path for path in nested if path not in many_abs[:20]
+        ]
+        assert (inner | outer).to_list() == nested + [
+            path for path in many_abs[:20] if path not in nested
+        ]
+        assert (inner - outer).to_list() == [
+            path for path in nested if path not in many_abs[:20]
+        ]
+        assert set((inner ^ outer).to_list()) == set(nested) ^ set(many_abs[:20])
+
+    def test_sibling_prefixes(self, many_abs):
+        first = [path for path in many_abs if "dir_1" in path]
+        second = [path for path in many_abs if "dir_2" in path]
+        union = fs.Filelist(first) | fs.Filelist(second)
+        assert union.to_list() == first + second
+        assert union.is_abs()
+        assert (fs.Filelist(first) & fs.Filelist(second)).to_list() == []
+
+    def test_relative(self, data_rel, data_abs):
+        flist = fs.Filelist(data_rel[:3]) | fs.Filelist(data_abs[2:])
+        assert flist.is_rel()
+        assert flist.to_list() == data_rel
+        assert (fs.Filelist(data_rel) - fs.Filelist(data_abs[1:])).to_list() == [
+            data_rel[0]
+        ]
+
+    def test_lazy(self, tmp_dir, halves):
+        left, right = halves
+        test_path = os.path.join(tmp_dir["flists"], "set_lazy.txt")
+        fs.Filelist(right).save(test_path)
+        lazy = fs.read_filelist(test_path, lazy=True)
+        assert (fs.Filelist(left) & lazy).to_list() == left[100:]
+        assert (lazy - fs.Filelist(left)).to_list() == right[50:]
+
+    def test_invalid_operand(self, data_abs):
+        with pytest.raises(TypeError):
+            fs.Filelist(data_abs) | data_abs
+
+
+class TestMutation:
+    """
+    tests for appending to and removing from Filelists
+    """
+
+    def test_append_within_prefix(self, many_abs):
+        flist = fs.Filelist(many_abs[:100])
+        flist.append(many_abs[100])
+        flist.extend(many_abs[101:])
+        assert flist.to_list() == many_abs
+        assert flist._prefixes["curr"] == fs.Filelist(many_abs[:100])._prefixes["curr"]
+
+    def test_append_outside_prefix(self, many_abs, tmp_dir):
+        nested = [path for path in many_abs if "dir_3" in path]
+        flist = fs.Filelist(nested)
+        outside = os.path.join(os.path.abspath(tmp_dir["data"]), "outside.jpg")
+        flist.append(outside)
+        assert flist.to_list() == nested + [outside]
+        assert flist._prefixes["abs"] == os.path.abspath(tmp_dir["data"])
+        assert outside in flist
+
+    def test_append_relative(self, data_rel, data_abs):
+        flist = fs.Filelist(data_rel[:2])
+        flist.append(data_rel[2])
+        flist.append(data_abs[3])
+        assert flist.is_rel()
+        assert flist.to_list() == data_rel[:4]
+
+    def test_append_relative_outside_prefix(self, data_abs, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        flist = fs.Filelist(data_abs[:2])
+        flist.append(os.path.join("rel", "q.jpg"))
+        assert flist.is_abs()
+        assert flist.to_list() == data_abs[:2] + [str(tmp_path / "rel" / "q.jpg")]
+        rel = fs.Filelist([os.path.join("rel", "a.jpg"), os.path.join("rel", "b.jpg")])
+        rel.append(data_abs[0])
+        rel.append(os.path.join("other", "c.jpg"))
+        assert rel.is_rel()
+        assert [os.path.abspath(path) for path in rel] == [
+            str(tmp_path / "rel" / "a.jpg"),
+            str(tmp_path / "rel" / "b.jpg"),
+            data_abs[0],
+            str(tmp_path / "other" / "c.jpg"),
+        ]
+
+    def test_append_to_empty(self, data_abs):
+        flist = fs.Filelist([])
+        flist.extend(data_abs)
+        assert flist.is_abs()
+        assert flist.to_list() == data_abs
+
+    def test_remove(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        for path in many_abs[::3]:
+            flist.remove(path)
+        kept = [path for idx, path in enumerate(many_abs) if idx % 3]
+        assert flist.to_list() == kept
+        assert flist[5] == kept[5]
+        assert flist[-1] == kept[-1]
+        assert many_abs[0] not in flist
+        with pytest.raises(ValueError, match="is not in Filelist"):
+            flist.remove(many_abs[0])
+        flist.compact()
+        assert flist.to_list() == kept
+
+    def test_mutate_lazy(self, tmp_dir, data_abs):
+        test_path = os.path.join(tmp_dir["flists"], "mutate_lazy.flb")
+        fs.Filelist(data_abs[:3]).save(test_path, binary=True)
+        flist = fs.read_filelist(test_path, lazy=True)
+        flist.remove(data_abs[0])
+        flist.append(data_abs[4])
+        assert flist.to_list() == data_abs[1:3] + data_abs[4:]
+
+    def test_set_operations_after_remove(self, many_abs):
+        flist = fs.Filelist(many_abs[:100])
+        flist.remove(many_abs[0])
+        assert (flist | fs.Filelist(many_abs[100:])).to_list() == many_abs[1:]
+        assert (flist - fs.Filelist(many_abs[50:])).to_list() == many_abs[1:50]
+
+
+class TestIndex:
+    """
+    tests for position lookups in Filelists
+    """
+
+    def test_index_abs_rel_suffix(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        prefix = flist._prefixes["abs"]
+        for idx in (0, 17, len(many_abs) - 1):
+            path = many_abs[idx]
+            assert flist.index(path) == idx
+            assert flist.index(os.path.relpath(path)) == idx
+            assert flist.index(os.path.relpath(path, prefix)) == idx
+            assert flist.count(path) == 1
+
+    def test_index_missing(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        assert flist.count("/not/a/stored/path.jpg") == 0
+        with pytest.raises(ValueError):
+            flist.index("/not/a/stored/path.jpg")
+
+    def test_index_after_remove(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        flist.remove(many_abs[3])
+        assert flist.index(many_abs[4]) == 3
+        assert flist.index(many_abs[-1]) == len(many_abs) - 2
+
+
+@pytest.fixture(params=[1, 10**9], ids=["scan", "lookup"])
+def batch_ratio(request, monkeypatch):
+    data_storage_module = sys.modules["filelister.DataStorage"]
+    monkeypatch.setattr(data_storage_module, "BATCH_RATIO", request.param)
+
+
+class TestContainsMany:
+    """
+    tests for batch membership queries
+    """
+
+    def test_forms(self, many_abs, batch_ratio):
+        flist = fs.Filelist(many_abs[:200])
+        prefix = flist._prefixes["abs"]
+        queries = [
+            many_abs[0],
+            os.path.relpath(many_abs[1]),
+            os.path.relpath(many_abs[2], prefix),
+            many_abs[220],
+            "/not/stored.jpg",
+        ]
+        assert flist.contains_many(queries) == [True, True, True, False, False]
+        assert flist.contains_many(iter(queries)) == [q in flist for q in queries]
+
+    @pytest.mark.skipif(not HAS_NUMPY, reason="numpy not installed")
+    def test_numpy_input(self, many_abs, batch_ratio):
+        import numpy as np
+
+        flist = fs.Filelist(many_abs[::2])
+        found = flist.contains_many(np.array(many_abs))
+        assert found == [idx % 2 == 0 for idx in range(len(many_abs))]
+
+    def test_as_filelist(self, many_abs):
+        flist = fs.Filelist(many_abs[:100])
+        queries = (path for path in reversed(many_abs) if many_abs.index(path) % 3)
+        sub = flist.contains_many(queries, as_filelist=True)
+        expected = [path for idx, path in enumerate(many_abs[:100]) if idx % 3]
+        assert sub.to_list() == expected
+
+    def test_lazy(self, many_abs, tmp_dir, batch_ratio):
+        test_path = os.path.join(tmp_dir["flists"], "contains_many.txt")
+        fs.Filelist(many_abs[:100]).save(test_path)
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert flist.contains_many(many_abs[95:105]) == [True] * 5 + [False] * 5
+        flist._data_storage.close()
+
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            ("small_batch.txt", {}),
+            ("small_batch.zz", {"compressed": True, "block_size": 16}),
+        ],
+    )
+    def test_lazy_small_batch(self, many_abs, tmp_dir, monkeypatch, name, options):
+        test_path = os.path.join(tmp_dir["flists"], name)
+        fs.Filelist(many_abs).save(test_path, **options)
+        flist = fs.read_filelist(test_path, lazy=True)
+        assert not flist.storage.has_index
+
+        def find(value):
+            raise AssertionError("an unindexed storage is scanned once per batch")
+
+        monkeypatch.setattr(flist.storage, "_find", find)
+        queries = [many_abs[7], "/not/stored.jpg", many_abs[-1]]
+        assert flist.contains_many(queries) == [True, False, True]
+        flist.storage.close()
+
+    def test_invalid_input(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        with pytest.raises(TypeError):
+            flist.contains_many(many_abs[0])
+        with pytest.raises(TypeError):
+            flist.contains_many([many_abs[0], 3])
+
+
+class TestViews:
+    """
+    tests for lazy slicing views
+    """
+
+    def test_slice_is_view(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        view = flist[10:200:3]
+        assert isinstance(view, fs.StorageView)
+        assert view.storage is flist._data_storage
+        assert len(view) == len(many_abs[10:200:3])
+        assert view == many_abs[10:200:3]
+        assert view[2] == many_abs[16]
+        assert view[-1] == many_abs[10:200:3][-1]
+        assert view[5:1:-2] == many_abs[10:200:3][5:1:-2]
+        assert list(view[::-1]) == many_abs[10:200:3][::-1]
+        with pytest.raises(IndexError):
+            view[len(view)]
+
+    def test_relative_view(self, data_rel):
+        flist = fs.Filelist(data_rel)
+        assert flist[1:] == data_rel[1:]
+        assert flist[1:].to_list() == data_rel[1:]
+
+    def test_shards(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        shards = [flist[start : start + 17] for start in range(0, len(flist), 17)]
+        assert [path for shard in shards for path in shard] == many_abs
+        assert fs.Filelist(shards[2]).to_list() == many_abs[34:51]
+
+    def test_view_after_remove(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        flist.remove(many_abs[1])
+        assert flist[:4] == [many_abs[0]] + many_abs[2:5]
+
+    def test_repr_tail(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        assert many_abs[-1] in repr(flist)
+        assert many_abs[-6] not in repr(flist)
+
+
+class TestIteration:
+    """
+    tests for independent iterators and chunked iteration
+    """
+
+    def test_nested_iteration(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        pairs = [(a, b) for a in flist[:3] for b in flist]
+        assert len(pairs) == 3 * len(many_abs)
+        assert list(zip(flist, flist)) == list(zip(many_abs, many_abs))
+
+    def test_iterates_by_type(self, data_rel):
+        assert list(fs.Filelist(data_rel)) == data_rel
+
+    def test_iter_chunks(self, many_abs):
+        flist = fs.Filelist(many_abs)
+        flist.remove(many_abs[0])
+        chunks = list(flist.iter_chunks(30))
+        assert all(len(chunk) == 30 for chunk in chunks[:-1])
+        assert [path for chunk in chunks for path in chunk] == many_abs[1:]
+        with pytest.raises(ValueError):
+            flist.iter_chunks(0)
+
+
+class TestStats:
+    """
+    tests for counting paths left out of a Filelist
+    """
+
+    def test_rejected_and_duplicates(self, many_abs, caplog):
+        paths = many_abs + [path + ".json" for path in many_abs] + many_abs[:3]
+        flist = fs.Filelist(paths, accepted_exts=[".txt", ".jpg", ".png"])
+        assert flist.to_list() == many_abs
+        stats = flist.stats
+        assert stats["rejected"]["count"] == len(many_abs)
+        assert stats["rejected"]["sample"] == [path + ".json" for path in many_abs[:5]]
+        assert stats["duplicate"]["count"] == 3
+        assert stats["skipped"] == {"count": 0, "sample": []}
+        assert len(caplog.records) == 2
+
+    def test_sample_size(self, many_abs, monkeypatch):
+        monkeypatch.setattr(sys.modules["filelister.Diagnostics"], "SAMPLE_SIZE", 0)
+        flist = fs.Filelist(many_abs + many_abs)
+        assert flist.stats["duplicate"] == {"count": len(many_abs), "sample": []}
+
+    def test_append_counts(self, data_abs, caplog):
+        flist = fs.Filelist(data_abs)
+        assert not caplog.records
+        flist.extend(data_abs[:2])
+        assert flist.stats["duplicate"]["count"] == 2
+        assert len(caplog.records) == 1
@@ -0,0 +1,159 @@
+"""Tests for hashing the contents of the files of a Filelist"""
+import hashlib
+import os
+
+import filelister as fs
+import pytest
+from filelister import hashing
+
+FILES = {
+    "a.txt": b"same",
+    "sub/b.txt": b"other",
+    "sub/c.txt": b"same",
+    "sub/deeper/d.bin": b"\x00" * (hashing.CHUNK_SIZE + 3),
+    "e.txt": b"other",
+    "f.txt": b"unique",
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / "tree")
+    for rel_path, data in FILES.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return root
+
+
+def blake2b(path):
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read()).digest()
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+@pytest.mark.parametrize("metadata", [False, True])
+def test_compute_hashes(tree, workers, metadata):
+    flist = fs.Filelist(tree, metadata=metadata)
+    assert not flist.has_hashes()
+    digests = flist.compute_hashes(workers=workers)
+    assert flist.has_hashes()
+    assert digests == [blake2b(path) for path in flist]
+    assert flist.column("digest") == digests
+
+
+def test_algo(tree):
+    flist = fs.Filelist(tree)
+    digests = flist.compute_hashes("sha256")
+    data = FILES[os.path.relpath(flist[0], tree)]
+    assert digests[0] == hashlib.sha256(data).digest()
+    for algo in ("shake_128", "not_an_algo"):
+        with pytest.raises(ValueError):
+            flist.compute_hashes(algo)
+
+
+def test_no_digests(tree):
+    with pytest.raises(ValueError):
+        fs.Filelist(tree).column("digest")
+
+
+def test_cache_skips_unchanged_files(tree, monkeypatch):
+    flist = fs.Filelist(tree)
+    flist.compute_hashes()
+    changed = os.path.join(tree, "f.txt")
+    with open(changed, "wb") as f:
+        f.write(b"changed!")
+    read = []
+    hash_file = hashing.hash_file
+
+    def counted(path, *args):
+        read.append(path)
+        return hash_file(path, *args)
+
+    monkeypatch.setattr(hashing, "hash_file", counted)
+    digests = flist.compute_hashes(workers=4)
+    assert read == [changed]
+    assert digests == [blake2b(path) for path in flist]
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_changed_file_with_metadata(tree, workers):
+    flist = fs.Filelist(tree, metadata=True)
+    flist.compute_hashes(workers=workers)
+    changed = os.path.join(tree, "f.txt")
+    mtime = os.stat(changed).st_mtime_ns
+    with open(changed, "wb") as f:
+        f.write(b"rewritten, longer")
+    os.utime(changed, ns=(mtime, mtime))
+    digests = flist.compute_hashes(workers=workers)
+    assert digests == [blake2b(path) for path in flist]
+
+
+def test_shared_cache(tree):
+    cache = {}
+    fs.Filelist(tree).compute_hashes(cache=cache)
+    assert len(cache) == len(FILES)
+    assert all(key[0] == "blake2b" for key in cache)
+
+
+def test_cache_is_bounded(tree):
+    flist = fs.Filelist(tree)
+    cache = {}
+    list(hashing.hash_files(flist, cache=cache, max_cached=2))
+    assert [key[1] for key in cache] == flist[-2:]
+    list(hashing.hash_files([flist[-2], flist[0]], cache=cache, max_cached=2))
+    assert [key[1] for key in cache] == [flist[-2], flist[0]]
+
+
+def test_unreadable_file_is_skipped(tree):
+    flist = fs.Filelist(tree)
+    missing = os.path.join(tree, "e.txt")
+    os.remove(missing)
+    digests = flist.compute_hashes()
+    assert digests[flist.index(missing)] is None
+    assert flist.stats["skipped"]["sample"] == [missing]
+    assert missing not in sum(flist.duplicates(), [])
+
+
+def test_duplicates(tree):
+    flist = fs.Filelist(tree)
+    groups = flist.duplicates()
+    assert flist.has_hashes()
+    expected = [["a.txt", "sub/c.txt"], ["e.txt", "sub/b.txt"]]
+    assert sorted(groups) == [
+        [os.path.join(tree, path) for path in group] for group in expected
+    ]
+    for group in groups:
+        assert group == [path for path in flist if path in group]
+
+
+class TestDigestsFollowPaths:
+    def test_remove_and_select(self, tree):
+        flist = fs.Filelist(tree)
+        flist.compute_hashes()
+        flist.remove(os.path.join(tree, "a.txt"))
+        assert flist.column("digest") == [blake2b(path) for path in flist]
+        flist.compact()
+        assert flist.column("digest") == [blake2b(path) for path in flist]
+
+    def test_sorted_by(self, tree):
+        flist = fs.Filelist(tree, metadata=True)
+        flist.compute_hashes()
+        by_size = flist.sorted_by("size")
+        assert by_size.column("digest") == [blake2b(path) for path in by_size]
+
+    def test_append_drops_digests(self, tree, tmp_path):
+        flist = fs.Filelist(tree)
+        flist.compute_hashes()
+        outside = tmp_path / "outside.txt"
+        outside.write_bytes(b"same")
+        flist.append(str(outside))
+        assert not flist.has_hashes()
+        assert str(outside) in sum(flist.duplicates(), [])
+
+    def test_refresh_drops_digests(self, tree):
+        flist = fs.Filelist(tree)
+        flist.compute_hashes()
+        flist.refresh()
+        assert not flist.has_hashes()
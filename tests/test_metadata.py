@@ -0,0 +1,143 @@
+"""Tests for stat metadata captured while crawling"""
+import os
+
+import filelister as fs
+import pytest
+
+from .conftest import OLD_TIME, write
+
+FILES = {
+    "a.txt": 5,
+    "sub/b.txt": 50,
+    "sub/c.jpg": 0,
+    "sub/deeper/d.txt": 500,
+    "other/e.txt": 20,
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / "tree")
+    for idx, (rel_path, size) in enumerate(FILES.items()):
+        write(root, rel_path, size, OLD_TIME + idx * 10**9)
+    for path, _, _ in os.walk(root):
+        os.utime(path, ns=(OLD_TIME, OLD_TIME))
+    return root
+
+
+def expected(flist, name):
+    stats = [os.stat(path) for path in flist]
+    key = {"size": "st_size", "mtime": "st_mtime_ns", "inode": "st_ino"}[name]
+    return [getattr(stat, key) for stat in stats]
+
+
+class TestCrawlMetadata:
+    @pytest.mark.parametrize("workers", [None, 4])
+    def test_columns_match_stat(self, tree, workers):
+        flist = fs.Filelist(tree, metadata=True, workers=workers)
+        assert flist.has_metadata()
+        for name in ("size", "mtime", "inode"):
+            assert list(flist.column(name)) == expected(flist, name)
+        assert flist.total_size() == sum(FILES.values())
+
+    def test_from_list(self, tree):
+        paths = [os.path.join(tree, rel_path) for rel_path in FILES]
+        flist = fs.Filelist(paths + [paths[0]], metadata=True)
+        assert list(flist.column("size")) == list(FILES.values())
+
+    def test_without_metadata(self, tree):
+        flist = fs.Filelist(tree)
+        assert not flist.has_metadata()
+        with pytest.raises(ValueError):
+            flist.total_size()
+        with pytest.raises(ValueError):
+            fs.Filelist(tree, metadata=True).column("owner")
+
+    def test_newer_than_and_sorted_by(self, tree):
+        flist = fs.Filelist(tree, metadata=True)
+        newer = flist.newer_than((OLD_TIME + 2 * 10**9) / 10**9)
+        names = [os.path.relpath(path, tree) for path in newer]
+        assert sorted(names) == sorted(list(FILES)[3:])
+        assert newer.total_size() == 520
+        by_size = flist.sorted_by("size")
+        assert list(by_size.column("size")) == sorted(FILES.values())
+        assert list(by_size.column("size")) == expected(by_size, "size")
+        descending = flist.sorted_by("size", reverse=True)
+        assert list(descending.column("size")) == sorted(FILES.values())[::-1]
+
+
+class TestMetadataChanges:
+    def test_remove_and_append(self, tree):
+        flist = fs.Filelist(tree, metadata=True)
+        flist.remove(os.path.join(tree, "sub", "b.txt"))
+        assert flist.total_size() == sum(FILES.values()) - 50
+        outside = write(os.path.dirname(tree), "outside.txt", 7)
+        flist.append(outside)
+        assert list(flist.column("size")) == expected(flist, "size")
+        flist.compact()
+        assert list(flist.column("size")) == expected(flist, "size")
+
+    def test_refresh(self, tree):
+        flist = fs.Filelist(tree, metadata=True)
+        write(tree, "sub/new.txt", 9)
+        os.remove(os.path.join(tree, "a.txt"))
+        flist.refresh()
+        assert list(flist.column("size")) == expected(flist, "size")
+        assert flist.total_size() == sum(FILES.values()) - 5 + 9
+
+
+class TestSavedMetadata:
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            ("paths.txt", {}),
+            ("paths.flb", {"binary": True}),
+            ("paths.zz", {"compressed": True}),
+            ("blocks.zz", {"compressed": True, "block_size": 2}),
+        ],
+    )
+    def test_round_trip(self, tree, tmp_path, name, options):
+        outfile = str(tmp_path / name)
+        flist = fs.Filelist(tree, metadata=True)
+        flist.save(outfile, **options)
+        read = fs.read_filelist(outfile)
+        assert read.to_list() == flist.to_list()
+        assert list(read.column("mtime")) == list(flist.column("mtime"))
+        assert read.sorted_by("size").to_list() == flist.sorted_by("size").to_list()
+
+    def test_lazy_read(self, tree, tmp_path):
+        outfile = str(tmp_path / "paths.txt")
+        fs.Filelist(tree, metadata=True).save(outfile)
+        flist = fs.read_filelist(outfile, lazy=True)
+        assert flist.total_size() == sum(FILES.values())
+        flist._data_storage.close()
+
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            ("paths.txt", {}),
+            ("paths.flb", {"binary": True}),
+            ("blocks.zz", {"compressed": True, "block_size": 2}),
+        ],
+    )
+    def test_lazy_select(self, tree, tmp_path, name, options):
+        outfile = str(tmp_path / name)
+        flist = fs.Filelist(tree, metadata=True)
+        flist.save(outfile, **options)
+        lazy = fs.read_filelist(outfile, lazy=True)
+        by_size = lazy.sorted_by("size", reverse=True)
+        assert by_size.to_list() == flist.sorted_by("size", reverse=True).to_list()
+        assert list(by_size.column("size")) == expected(by_size, "size")
+        timestamp = (OLD_TIME + 2 * 10**9) / 10**9
+        newer = lazy.newer_than(timestamp)
+        assert newer.to_list() == flist.newer_than(timestamp).to_list()
+        lazy._data_storage.close()
+
+    def test_stale_metadata(self, tree, tmp_path):
+        outfile = str(tmp_path / "paths.txt")
+        fs.Filelist(tree, metadata=True).save(outfile)
+        with open(outfile, "a", encoding="utf-8") as f:
+            f.write(os.linesep + os.path.join(tree, "missing.txt"))
+        assert not fs.read_filelist(outfile).has_metadata()
+        fs.Filelist(tree).save(outfile)
+        assert not os.path.exists(outfile + ".meta")
@@ -0,0 +1,76 @@
+import os
+
+import filelister as fs
+import pytest
+
+np = pytest.importorskip("numpy")
+
+test_suffixes = [
+    "dir/b.jpg",
+    "dir/a.png",
+    "dir/.hidden",
+    "dir/..jpg",
+    "dir/archive.tar.gz",
+    "dir/noext",
+    "dir/c.JPG",
+    "dir/ünïcode.jpg",
+    "a.jpg",
+]
+
+
+def make_paths(suffixes=test_suffixes):
+    return fs.PathArray.from_suffixes(suffixes)
+
+
+class TestPathArray:
+    def test_roundtrip(self):
+        assert list(make_paths().suffixes()) == test_suffixes
+
+    def test_from_storage(self):
+        storage = fs.DataStorage(iter(test_suffixes))
+        assert list(fs.PathArray.from_storage(storage).suffixes()) == test_suffixes
+
+    def test_empty(self):
+        paths = make_paths([])
+        assert len(paths) == 0
+        assert not paths.ext_mask({".jpg"}).any()
+        assert len(paths.argsort()) == 0
+        assert paths.join_lines("/root") == b""
+
+    @pytest.mark.parametrize(
+        "exts", [{".jpg"}, {".jpg", ".png"}, {".gz", ".hidden"}, {""}, {".tar.gz"}]
+    )
+    def test_ext_mask_matches_splitext(self, exts):
+        expected = [os.path.splitext(suffix)[1] in exts for suffix in test_suffixes]
+        assert make_paths().ext_mask(exts).tolist() == expected
+
+    def test_argsort_and_take(self):
+        paths = make_paths()
+        assert list(paths.take(paths.argsort()).suffixes()) == sorted(test_suffixes)
+
+    def test_unique(self):
+        paths = make_paths(["b", "a", "b", "c", "a"])
+        assert paths.unique().tolist() == [0, 1, 3]
+
+    def test_one_long_suffix(self):
+        suffixes = test_suffixes * 20 + ["dir/" + "x" * 4096]
+        paths = make_paths(suffixes)
+        assert paths._sort_keys().dtype == object
+        assert list(paths.take(paths.argsort()).suffixes()) == sorted(suffixes)
+        assert paths.unique().tolist() == list(range(len(test_suffixes))) + [
+            len(suffixes) - 1
+        ]
+
+    @pytest.mark.parametrize("prefix", ["", "/root", "/"])
+    @pytest.mark.parametrize("linesep", ["\n", "\r\n"])
+    def test_join_lines(self, prefix, linesep):
+        expected = linesep.join(
+            os.path.join(prefix, suffix) if prefix else suffix
+            for suffix in test_suffixes
+        )
+        assert make_paths().join_lines(prefix, linesep).decode("utf-8") == expected
+
+    def test_to_storage(self):
+        storage = make_paths().to_storage()
+        assert list(storage.suffixes()) == test_suffixes
+        assert storage.index("dir/a.png") == 1
@@ -0,0 +1,134 @@
+"""Tests for filtering paths while building and reading Filelists"""
+import os
+
+import filelister as fs
+import pytest
+
+from .conftest import write
+
+NAMES = [
+    "train/a.jpg",
+    "train/b.png",
+    "train/b.json",
+    "val/c.jpg",
+    "val/.cache/d.jpg",
+    "test/e.JPG",
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / "tree")
+    for idx, name in enumerate(NAMES):
+        write(root, name, size=idx * 10, mtime=(1_000_000 + idx * 100) * 10**9)
+    return root
+
+
+class TestPathFilter:
+    def test_exts(self):
+        path_filter = fs.PathFilter(exts={".jpg", ".png"})
+        assert list(path_filter.apply(NAMES)) == [
+            "train/a.jpg",
+            "train/b.png",
+            "val/c.jpg",
+            "val/.cache/d.jpg",
+        ]
+
+    def test_globs(self):
+        path_filter = fs.PathFilter(globs=["train/*", "*.JPG"])
+        assert list(path_filter.apply(NAMES)) == NAMES[:3] + ["test/e.JPG"]
+
+    def test_include_exclude(self):
+        path_filter = fs.PathFilter(include=r"\.jpg$", exclude=[r"/\.", "^train/"])
+        assert list(path_filter.apply(NAMES)) == ["val/c.jpg"]
+
+    def test_combine(self):
+        combined = fs.PathFilter(globs="val/*") & fs.PathFilter(exclude=r"/\.")
+        assert list(combined.apply(NAMES)) == ["val/c.jpg"]
+        assert combined("val/c.jpg")
+        assert not combined("train/a.jpg")
+        assert not fs.PathFilter()
+        assert list(fs.PathFilter().apply(NAMES)) == NAMES
+
+    def test_size_and_mtime(self, tree):
+        by_size = fs.PathFilter(min_size=20, max_size=40)
+        assert list(by_size.apply(NAMES, tree)) == NAMES[2:5]
+        by_mtime = fs.PathFilter(modified_after=1_000_250)
+        assert list(by_mtime.apply(NAMES, tree)) == NAMES[3:]
+        assert not by_size("missing.jpg", tree)
+
+    def test_rejected_are_counted(self):
+        diagnostics = fs.Diagnostics()
+        kept = list(fs.PathFilter(exts=".png").apply(NAMES, None, diagnostics))
+        assert kept == ["train/b.png"]
+        assert diagnostics.counts["rejected"] == len(NAMES) - 1
+
+    def test_specs_round_trip(self):
+        path_filter = fs.PathFilter(exts=[".png", ".jpg"]) & fs.PathFilter(max_size=5)
+        rebuilt = fs.PathFilter.from_specs(path_filter.specs)
+        assert rebuilt.specs == [{"exts": [".jpg", ".png"]}, {"max_size": 5}]
+
+
+class TestFilelistFilter:
+    def test_from_list(self, tree):
+        paths = [os.path.join(tree, name) for name in NAMES]
+        flist = fs.Filelist(
+            paths, accepted_exts=[".jpg"], path_filter=fs.PathFilter(exclude=r"/\.")
+        )
+        assert flist.to_list() == [paths[0], paths[3]]
+        assert flist.stats["rejected"]["count"] == 4
+
+    def test_from_dir_and_refresh(self, tree):
+        flist = fs.Filelist(tree, path_filter=fs.PathFilter(globs="*.jpg", min_size=1))
+        assert sorted(flist) == sorted(os.path.join(tree, name) for name in NAMES[3:5])
+        write(tree, "val/new.jpg", size=3)
+        write(tree, "val/empty.jpg")
+        added, _ = flist.refresh()
+        assert added == [os.path.join(tree, "val", "new.jpg")]
+
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            ("paths.txt", {}),
+            ("paths.flb", {"binary": True}),
+            ("paths.zz", {"compressed": True}),
+            ("blocks.zz", {"compressed": True, "block_size": 2}),
+        ],
+    )
+    def test_read_filelist(self, tree, name, options):
+        outfile = os.path.join(tree, name)
+        fs.Filelist([os.path.join(tree, name) for name in NAMES]).save(
+            outfile, output_type="rel", **options
+        )
+        path_filter = fs.PathFilter(include="train/", max_size=15)
+        flist = fs.read_filelist(outfile, path_filter=path_filter)
+        assert [os.path.relpath(path, tree) for path in flist.to_list()] == NAMES[:2]
+        assert flist.stats["rejected"]["count"] == 4
+        if not options.get("compressed") or "block_size" in options:
+            with pytest.raises(ValueError):
+                fs.read_filelist(outfile, lazy=True, path_filter=path_filter)
+
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            ("paths.txt", {}),
+            ("paths.flb", {"binary": True}),
+            ("paths.zz", {"compressed": True}),
+            ("blocks.zz", {"compressed": True, "block_size": 2}),
+        ],
+    )
+    def test_read_filelist_sidecars(self, tree, tmp_path, name, options):
+        outfile = str(tmp_path / name)
+        fs.Filelist(tree, metadata=True).save(outfile, **options)
+        path_filter = fs.PathFilter(exts=[".jpg"])
+        flist = fs.read_filelist(outfile, path_filter=path_filter)
+        assert len(flist) == 3
+        assert list(flist.column("size")) == [os.path.getsize(path) for path in flist]
+        mtimes = [os.stat(path).st_mtime_ns for path in flist]
+        assert list(flist.column("mtime")) == mtimes
+        # refreshing from the scan state would bring back the dropped paths
+        with pytest.raises(ValueError):
+            flist.refresh()
+        unfiltered = fs.read_filelist(outfile)
+        unfiltered.refresh()
+        assert unfiltered.to_list() == fs.Filelist(tree).to_list()
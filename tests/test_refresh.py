@@ -0,0 +1,195 @@
+"""Tests for incremental refreshes of crawled Filelists"""
+import os
+import shutil
+import sys
+
+import filelister as fs
+import pytest
+
+from .conftest import OLD_TIME, age, write
+
+crawler = sys.modules["filelister.crawler"]
+scan_state = sys.modules["filelister.scan_state"]
+
+
+@pytest.fixture
+def tree(make_tree):
+    return make_tree(
+        [
+            "a.txt",
+            "sub/b.txt",
+            "sub/c.jpg",
+            "sub/deeper/d.txt",
+            "other/e.txt",
+            "skip/f.txt",
+        ]
+    )
+
+
+def modify(root):
+    write(root, "sub/new.txt")
+    os.remove(os.path.join(root, "sub", "b.txt"))
+    shutil.rmtree(os.path.join(root, "other"))
+    write(root, "added/g.txt")
+
+
+class TestRecrawl:
+    def test_reuses_unchanged_dirs(self, tree):
+        listings = list(crawler.crawl_dirs(tree))
+        dirs = {rel_dir: mtime for rel_dir, mtime, _ in listings}
+        write(tree, "sub/deeper/new.txt")
+        recrawled = list(crawler.recrawl_dirs(tree, dirs, OLD_TIME + 10**10))
+        assert [rel_dir for rel_dir, _, _ in recrawled] == list(dirs)
+        relisted = [rel_dir for rel_dir, _, files in recrawled if files is not None]
+        assert relisted == [os.path.join("sub", "deeper")]
+
+    def test_racy_dirs_are_relisted(self, tree):
+        dirs = {rel_dir: mtime for rel_dir, mtime, _ in crawler.crawl_dirs(tree)}
+        recrawled = list(crawler.recrawl_dirs(tree, dirs, OLD_TIME))
+        assert all(files is not None for _, _, files in recrawled)
+
+
+class TestRefresh:
+    def test_matches_fresh_crawl(self, tree):
+        flist = fs.Filelist(tree)
+        modify(tree)
+        added, removed = flist.refresh()
+        assert flist.to_list() == fs.Filelist(tree).to_list()
+        assert sorted(added) == [
+            os.path.join(tree, "added", "g.txt"),
+            os.path.join(tree, "sub", "new.txt"),
+        ]
+        assert sorted(removed) == [
+            os.path.join(tree, "other", "e.txt"),
+            os.path.join(tree, "sub", "b.txt"),
+        ]
+        assert os.path.join(tree, "sub", "new.txt") in flist
+        assert os.path.join(tree, "sub", "b.txt") not in flist
+        assert flist.refresh() == ([], [])
+
+    def test_decodes_only_changed_dirs(self, monkeypatch, tree):
+        flist = fs.Filelist(tree)
+        storage = flist._data_storage
+        unchanged = [
+            flist.index(os.path.join(tree, "sub", "deeper", "d.txt")),
+            flist.index(os.path.join(tree, "skip", "f.txt")),
+        ]
+        modify(tree)
+        decoded = []
+        suffix = storage.suffix
+        monkeypatch.setattr(
+            storage, "suffix", lambda idx: decoded.append(idx) or suffix(idx)
+        )
+        monkeypatch.setattr(
+            storage, "suffixes", lambda: pytest.fail("decoded every suffix")
+        )
+        flist.refresh()
+        monkeypatch.undo()
+        assert storage._lookup is None
+        assert decoded and not set(decoded).intersection(unchanged)
+        assert flist.to_list() == fs.Filelist(tree).to_list()
+
+    def test_unchanged(self, tree):
+        flist = fs.Filelist(tree)
+        storage = flist._data_storage
+        assert flist.refresh() == ([], [])
+        assert flist._data_storage is storage
+
+    def test_keeps_filters(self, tree):
+        flist = fs.Filelist(tree, accepted_exts=[".txt"], prune=["skip"])
+        write(tree, "sub/h.jpg")
+        write(tree, "skip/i.txt")
+        write(tree, "sub/j.txt")
+        added, _ = flist.refresh()
+        assert added == [os.path.join(tree, "sub", "j.txt")]
+        assert (
+            flist.to_list()
+            == fs.Filelist(tree, accepted_exts=[".txt"], prune=["skip"]).to_list()
+        )
+
+    def test_relative(self, tree):
+        flist = fs.Filelist(os.path.relpath(tree))
+        modify(tree)
+        added, _ = flist.refresh()
+        assert flist.is_rel()
+        assert os.path.relpath(os.path.join(tree, "sub", "new.txt")) in added
+
+    @pytest.mark.parametrize(
+        "ext, save_kwargs",
+        [(".txt", {}), (".flb", {"binary": True}), (".zz", {"compressed": True})],
+    )
+    def test_saved_scan_state(self, tree, tmp_path, ext, save_kwargs):
+        outfile = str(tmp_path / f"flist{ext}")
+        fs.Filelist(tree).save(outfile, **save_kwargs)
+        assert os.path.exists(outfile + ".scan")
+        modify(tree)
+        flist = fs.read_filelist(outfile)
+        added, removed = flist.refresh()
+        assert flist.to_list() == fs.Filelist(tree).to_list()
+        assert len(added) == 2 and len(removed) == 2
+
+    def test_saved_below_root(self, tmp_path):
+        root = str(tmp_path / "single")
+        write(root, "only/a.txt")
+        write(root, "only/b.txt")
+        age(root)
+        outfile = str(tmp_path / "single.txt")
+        fs.Filelist(root).save(outfile)
+        write(root, "c.txt")
+        flist = fs.read_filelist(outfile, lazy=True)
+        assert flist.refresh() == ([os.path.join(root, "c.txt")], [])
+        assert flist.to_list() == fs.Filelist(root).to_list()
+
+    def test_stale_scan_state_is_ignored(self, tree, tmp_path):
+        outfile = str(tmp_path / "stale.txt")
+        fs.Filelist(tree).save(outfile)
+        fs.Filelist([os.path.join(tree, "a.txt")]).save(outfile)
+        with pytest.raises(ValueError):
+            fs.read_filelist(outfile).refresh()
+
+    def test_scan_state_of_an_overwritten_filelist(self, tree, tmp_path):
+        outfile = str(tmp_path / "reused.txt")
+        crawled = fs.Filelist(tree)
+        crawled.save(outfile)
+        elsewhere = [f"/elsewhere/p{idx}" for idx in range(len(crawled))]
+        fs.Filelist(elsewhere).save(outfile)
+        assert not os.path.exists(outfile + ".scan")
+        crawled.save(outfile)
+        crawled.save(outfile, output_type="na")
+        assert not os.path.exists(outfile + ".scan")
+
+    def test_scan_state_of_a_rewritten_file(self, tree, tmp_path):
+        outfile = str(tmp_path / "rewritten.txt")
+        crawled = fs.Filelist(tree)
+        crawled.save(outfile)
+        with open(outfile, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"/elsewhere/p{idx}" for idx in range(len(crawled))))
+        with pytest.raises(ValueError):
+            fs.read_filelist(outfile).refresh()
+
+    def test_not_crawled(self, tree):
+        with pytest.raises(ValueError):
+            fs.Filelist([os.path.join(tree, "a.txt")]).refresh()
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32" or os.geteuid() == 0,
+    reason="needs a directory the user cannot list",
+)
+class TestSkipped:
+    def test_unreadable_dirs_are_counted(self, tree):
+        locked = os.path.join(tree, "sub", "deeper")
+        os.chmod(locked, 0)
+        try:
+            listings = list(crawler.crawl_dirs(tree))
+            flist = fs.Filelist(tree)
+        finally:
+            os.chmod(locked, 0o755)
+        assert (os.path.join("sub", "deeper"), None, []) in listings
+        assert flist.stats["skipped"] == {
+            "count": 1,
+            "sample": [os.path.join("sub", "deeper")],
+        }
+        assert flist._scan["dirs"][os.path.join("sub", "deeper")][0] is None
+        added, _ = flist.refresh()
+        assert added == [os.path.join(tree, "sub", "deeper", "d.txt")]
@@ -0,0 +1,192 @@
+"""Tests for the persistent cache of crawled directories"""
+import os
+import sys
+import threading
+
+import filelister as fs
+import pytest
+
+from .conftest import OLD_TIME, age, write
+
+filelist_module = sys.modules["filelister.Filelist"]
+NAMES = ["a.txt", "sub/b.txt", "sub/c.jpg", "sub/deeper/d.txt"]
+
+
+@pytest.fixture
+def tree(make_tree):
+    return make_tree(NAMES, size=4)
+
+
+@pytest.fixture
+def crawls(monkeypatch):
+    """Counts the full crawls of every Filelist built"""
+    calls = []
+    crawl_dirs = filelist_module.crawl_dirs
+
+    def counted(root, *args, **kwargs):
+        calls.append(root)
+        return crawl_dirs(root, *args, **kwargs)
+
+    monkeypatch.setattr(filelist_module, "crawl_dirs", counted)
+    return calls
+
+
+def test_second_build_loads_the_cache(tree, tmp_path, crawls):
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    first = fs.Filelist(tree, cache=cache)
+    second = fs.Filelist(tree, cache=cache)
+    assert len(crawls) == 1
+    assert second.to_list() == first.to_list() == fs.Filelist(tree).to_list()
+    assert len(cache.entries()) == 1
+
+
+def test_cache_directory_and_relative_root(tree, tmp_path, monkeypatch, crawls):
+    monkeypatch.chdir(tmp_path)
+    cache = str(tmp_path / "cache")
+    fs.Filelist(tree, cache=cache)
+    cached = fs.Filelist("tree", cache=cache)
+    assert len(crawls) == 1
+    assert cached.is_rel()
+    assert cached.to_list() == fs.Filelist("tree").to_list()
+
+
+def test_changes_are_picked_up(tree, tmp_path, crawls):
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    fs.Filelist(tree, cache=cache)
+    added = write(tree, "sub/new.txt")
+    assert added in fs.Filelist(tree, cache=cache)
+    os.remove(added)
+    assert added not in fs.Filelist(tree, cache=cache)
+    assert len(crawls) == 1
+
+
+def test_without_validation(tree, tmp_path, crawls):
+    cache = fs.ScanCache(str(tmp_path / "cache"), validate=False)
+    fs.Filelist(tree, cache=cache)
+    added = write(tree, "sub/new.txt")
+    assert added not in fs.Filelist(tree, cache=cache)
+    assert len(crawls) == 1
+
+
+def test_max_age(tree, tmp_path, crawls):
+    cache = fs.ScanCache(str(tmp_path / "cache"), max_age=-1)
+    fs.Filelist(tree, cache=cache)
+    fs.Filelist(tree, cache=cache)
+    assert len(crawls) == 2
+
+
+def test_options_are_cached_apart(tree, tmp_path, crawls):
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    fs.Filelist(tree, cache=cache)
+    txt = fs.Filelist(tree, accepted_exts=[".txt"], cache=cache)
+    with_metadata = fs.Filelist(tree, metadata=True, cache=cache)
+    assert len(crawls) == 3
+    assert len(cache.entries()) == 3
+    assert len(txt) == 3
+    assert fs.Filelist(tree, metadata=True, cache=cache).total_size() == 16
+    assert with_metadata.has_metadata()
+    assert len(crawls) == 3
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda data: b"garbage",
+        lambda data: b"garbage!" * 64,
+        lambda data: data[:200],
+        lambda data: b"\x00FLX" + data[4:],
+    ],
+    ids=["short", "bad magic", "truncated", "wrong magic"],
+)
+def test_corrupt_entry_is_rebuilt(tree, tmp_path, crawls, corrupt):
+    for idx in range(20):
+        write(tree, f"more/file_{idx}.txt")
+    age(tree)
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    fs.Filelist(tree, cache=cache)
+    [(_, _, path)] = cache.entries()
+    with open(path, "rb") as f:
+        data = f.read()
+    assert len(data) > 200
+    with open(path, "wb") as f:
+        f.write(corrupt(data))
+    assert len(fs.Filelist(tree, cache=cache)) == 24
+    assert len(crawls) == 2
+    assert len(fs.Filelist(tree, cache=cache)) == 24
+    assert len(crawls) == 2
+
+
+def test_failed_write_keeps_the_old_entry(tree, tmp_path, monkeypatch):
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    fs.Filelist(tree, cache=cache)
+    [(_, size, path)] = cache.entries()
+    write_binary = filelist_module.write_binary
+
+    def crash(outfile, *args, **kwargs):
+        with open(outfile, "wb") as f:
+            f.write(b"\x00FLB partial")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(filelist_module, "write_binary", crash)
+    with pytest.raises(KeyboardInterrupt):
+        fs.Filelist(tree, cache=fs.ScanCache(cache.directory, max_age=-1))
+    assert cache.entries()[0][1:] == (size, path)
+    assert sorted(os.listdir(cache.directory)) == sorted(
+        os.path.basename(path) + suffix for suffix in ("", ".lock", ".scan")
+    )
+    monkeypatch.setattr(filelist_module, "write_binary", write_binary)
+    assert len(fs.Filelist(tree, cache=cache)) == 4
+
+
+def entry(cache, root):
+    """Returns the path of the entry of a crawl of root without options"""
+    options = {"root": root, "accepted_exts": None, "filter": None, "prune": None}
+    return cache.entry_path(dict(options, metadata=False))
+
+
+def test_eviction(make_tree, tmp_path):
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    roots = [make_tree(NAMES, f"tree_{idx}") for idx in range(3)]
+    for idx, root in enumerate(roots):
+        fs.Filelist(root, cache=cache)
+        used = OLD_TIME + idx * 10**9
+        os.utime(entry(cache, root) + ".lock", ns=(used, used))
+    cache.max_size = cache.size() - 1
+    fs.Filelist(roots[0], cache=cache)
+    # tree_1 was used least recently
+    assert [path for _, _, path in cache.entries()] == [
+        entry(cache, roots[2]),
+        entry(cache, roots[0]),
+    ]
+    cache.max_size = 0
+    fs.Filelist(roots[2], cache=cache)
+    assert [path for _, _, path in cache.entries()] == [entry(cache, roots[2])]
+    cache.clear()
+    assert cache.size() == 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="locking needs fcntl")
+def test_concurrent_builds_crawl_once(tree, tmp_path, crawls):
+    cache = fs.ScanCache(str(tmp_path / "cache"))
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(fs.Filelist(tree, cache=cache).to_list())
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(crawls) == 1
+    assert len(results) == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_invalid_use(tree, tmp_path):
+    cache = str(tmp_path / "cache")
+    with pytest.raises(ValueError):
+        fs.Filelist([os.path.join(tree, "a.txt")], cache=cache)
+    with pytest.raises(ValueError):
+        fs.Filelist(tree, prune=lambda entry: False, cache=cache)
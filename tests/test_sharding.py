@@ -0,0 +1,136 @@
+"""Tests for sharding, partitioning and saving shards of a Filelist"""
+import os
+import sys
+
+import filelister as fs
+import pytest
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return [
+        os.path.join(str(tmp_path), f"dir_{idx % 3}", f"sample_{idx}.{ext}")
+        for idx in range(60)
+        for ext in (("jpg",) if idx % 2 else ("png",))
+    ]
+
+
+class TestShard:
+    @pytest.mark.parametrize("by", ["hash", "range"])
+    def test_shards_cover_filelist(self, paths, by):
+        flist = fs.Filelist(paths)
+        shards = [flist.shard(4, idx, by=by) for idx in range(4)]
+        assert sum(len(shard) for shard in shards) == len(flist)
+        assert sorted(path for shard in shards for path in shard) == sorted(paths)
+
+    def test_range_shards_are_contiguous(self, paths):
+        flist = fs.Filelist(paths)
+        assert list(flist.shard(3, 1, by="range")) == paths[20:40]
+
+    def test_hash_shards_are_stable(self, paths):
+        shard = fs.Filelist(paths).shard(5, 2)
+        reordered = fs.Filelist(paths[::-1] + [paths[0] + ".extra"]).shard(5, 2)
+        assert set(shard) <= set(reordered)
+        for path in shard:
+            assert fs.stable_hash(path) % 5 == 2
+
+    def test_invalid_shard(self, paths):
+        flist = fs.Filelist(paths)
+        with pytest.raises(IndexError):
+            flist.shard(4, 4)
+        with pytest.raises(ValueError):
+            flist.shard(4, 0, by="size")
+
+
+class TestPartition:
+    def test_by_hash(self, paths):
+        parts = fs.Filelist(paths).partition(num_parts=7)
+        assert sorted(parts) == list(range(7))
+        assert sum(len(part) for part in parts.values()) == len(paths)
+        for part, flist in parts.items():
+            assert list(flist) == [
+                path for path in paths if fs.stable_hash(path) % 7 == part
+            ]
+
+    def test_by_dir_and_ext(self, paths, tmp_path):
+        flist = fs.Filelist(paths)
+        by_dir = flist.partition("dir")
+        assert sorted(by_dir) == ["dir_0", "dir_1", "dir_2"]
+        assert list(by_dir["dir_1"]) == [path for path in paths if "dir_1" in path]
+        by_ext = flist.partition("ext")
+        assert sorted(by_ext) == [".jpg", ".png"]
+        assert len(by_ext[".jpg"]) == 30
+        assert by_ext[".png"].is_abs()
+        assert os.path.join(str(tmp_path), "dir_0", "sample_0.png") in by_ext[".png"]
+
+    def test_by_function(self, paths):
+        parts = fs.Filelist(paths).partition(lambda path: path.endswith("0.png"))
+        assert len(parts[True]) == 6
+        assert len(parts[True]) + len(parts[False]) == len(paths)
+
+    def test_invalid_key(self, paths):
+        flist = fs.Filelist(paths)
+        with pytest.raises(ValueError):
+            flist.partition("size")
+        with pytest.raises(ValueError):
+            flist.partition("hash")
+
+
+class TestSaveShards:
+    def test_matches_partition(self, paths, tmp_path):
+        flist = fs.Filelist(paths)
+        pattern = os.path.join(str(tmp_path), "shard_{}.txt")
+        outfiles = flist.save_shards(pattern, num_parts=4)
+        assert outfiles == {part: pattern.format(part) for part in range(4)}
+        parts = flist.partition(num_parts=4)
+        for part, outfile in outfiles.items():
+            assert list(fs.read_filelist(outfile)) == list(parts[part])
+
+    def test_by_dir_relative(self, paths, tmp_path):
+        flist = fs.Filelist(paths)
+        pattern = os.path.join(str(tmp_path), "dir_shard_{}.txt")
+        outfiles = flist.save_shards(pattern, key="dir", output_type="rel")
+        assert list(outfiles) == ["dir_0", "dir_1", "dir_2"]
+        assert outfiles["dir_2"] == pattern.format(2)
+        with open(outfiles["dir_1"], encoding="utf-8") as f:
+            lines = [os.path.normpath(line) for line in f.read().splitlines()]
+        assert lines == [
+            os.path.relpath(path, str(tmp_path)) for path in paths if "dir_1" in path
+        ]
+
+    def test_small_flushes(self, paths, tmp_path, monkeypatch):
+        monkeypatch.setattr("filelister.sharding.FLUSH_SIZE", 10)
+        flist = fs.Filelist(paths)
+        pattern = os.path.join(str(tmp_path), "ext_shard_{}.txt")
+        outfiles = flist.save_shards(pattern, key="ext")
+        for ext, outfile in outfiles.items():
+            with open(outfile, encoding="utf-8") as f:
+                assert f.read() == os.linesep.join(
+                    path for path in paths if path.endswith(ext)
+                )
+
+    def test_small_total_buffer(self, paths, tmp_path, monkeypatch):
+        monkeypatch.setattr("filelister.sharding.MAX_BUFFERED", 100)
+        flist = fs.Filelist(paths)
+        pattern = os.path.join(str(tmp_path), "hash_shard_{}.txt")
+        outfiles = flist.save_shards(pattern, num_parts=7)
+        parts = flist.partition(num_parts=7)
+        for part, outfile in outfiles.items():
+            assert list(fs.read_filelist(outfile)) == list(parts[part])
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs resource limits")
+    def test_more_parts_than_open_files(self, tmp_path):
+        import resource  # pylint: disable=import-outside-toplevel
+
+        paths = [str(tmp_path / f"dir_{idx}" / "file.txt") for idx in range(300)]
+        flist = fs.Filelist(paths)
+        pattern = os.path.join(str(tmp_path), "many_{}.txt")
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(128, hard), hard))
+        try:
+            outfiles = flist.save_shards(pattern, key="dir")
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        assert len(outfiles) == 300
+        with open(outfiles["dir_42"], encoding="utf-8") as f:
+            assert f.read() == paths[42]